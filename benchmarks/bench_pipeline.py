@@ -0,0 +1,256 @@
+"""
+End-to-end benchmark suite
+
+Measures every pipeline stage on deterministic fixtures (see fixtures.py):
+
+    extract        AudioExtractor.extract (WAV file)
+    extract_pipe   AudioExtractor.extract_array (ffmpeg pipe)
+    transcribe     Transcriber.transcribe
+    translate      Translator.translate_batch
+    subtitles      SubtitleGenerator.generate_srt
+    mux            VideoProcessor.add_subtitles
+
+Each measurement runs in a fresh process, so peak RSS belongs to that stage
+alone. Results are written as JSON; with --baseline, the run fails when a
+stage is slower or larger than the baseline by more than the ratio in
+thresholds.json.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--stages extract,translate] [--full]
+    python benchmarks/bench_pipeline.py --baseline output/bench/baseline.json
+    python benchmarks/bench_pipeline.py --save-baseline output/bench/baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from settings import OUTPUT_DIR, TEMP_DIR, TRANSLATION_MODEL
+from utils.logger import Logger
+from utils.metrics import Metrics, peak_rss_mb
+import fixtures
+
+STAGES = ["extract", "extract_pipe", "transcribe", "translate", "subtitles", "mux"]
+THRESHOLDS = Path(__file__).resolve().parent / "thresholds.json"
+
+# Fixtures of each stage: media names or segment counts
+QUICK_PLAN = {
+    'extract': ["tone-10s", "noise-60s", "silence-60s"],
+    'extract_pipe': ["tone-10s", "noise-60s", "silence-60s"],
+    'transcribe': ["tone-10s", "noise-60s"],
+    'translate': [20, 200],
+    'subtitles': [1000, 100_000],
+    'mux': ["tone-10s", "noise-60s"]
+}
+FULL_PLAN = {
+    **QUICK_PLAN,
+    'extract': [*QUICK_PLAN['extract'], "tone-300s"],
+    'extract_pipe': [*QUICK_PLAN['extract_pipe'], "tone-300s"],
+    'transcribe': [*QUICK_PLAN['transcribe'], "tone-300s"],
+    'translate': [*QUICK_PLAN['translate'], 1000],
+    'mux': [*QUICK_PLAN['mux'], "tone-300s"]
+}
+
+
+def run_stage(stage: str, fixture, options: dict) -> dict:
+    """Run one stage on one fixture; executed in a fresh process"""
+    metrics = {}
+
+    if stage in ("extract", "extract_pipe"):
+        from core.audio_extractor import AudioExtractor
+
+        video = str(fixtures.media(fixture))
+        start = time.perf_counter()
+        audio = AudioExtractor.extract(video) if stage == "extract" else AudioExtractor.extract_array(video)
+        metrics['seconds'] = time.perf_counter() - start
+        metrics['rtf'] = metrics['seconds'] / fixtures.duration(fixture)
+        AudioExtractor.cleanup(audio)
+
+    elif stage == "transcribe":
+        from core.audio_extractor import AudioExtractor
+        from core.transcriber import Transcriber
+
+        audio = AudioExtractor.extract_array(str(fixtures.media(fixture)))
+        transcriber = Transcriber(options['whisper_model'])
+
+        start = time.perf_counter()
+        transcriber.load_model()
+        metrics['load_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = transcriber.transcribe(audio)
+        metrics['seconds'] = time.perf_counter() - start
+        metrics['rtf'] = metrics['seconds'] / fixtures.duration(fixture)
+        metrics['segments'] = len(result['segments'])
+
+    elif stage == "translate":
+        from core.translator import Translator
+
+        texts = [segment['text'] for segment in fixtures.segments(fixture)]
+        translator = Translator(options['translation_model'])
+        translator.cache = None
+
+        start = time.perf_counter()
+        translator.load_model()
+        metrics['load_seconds'] = time.perf_counter() - start
+
+        # Generated token ids, as counted by the translator itself
+        recorder = Metrics()
+        recorder.enabled = True
+        recorder.reset()
+
+        start = time.perf_counter()
+        translator.translate_batch(texts)
+        metrics['seconds'] = time.perf_counter() - start
+
+        tokens = sum(counter['value'] for counter in recorder.counters if counter['name'] == "tokens_out")
+        metrics['output_tokens'] = tokens
+        metrics['tokens_per_second'] = tokens / metrics['seconds']
+
+    elif stage == "subtitles":
+        from core.subtitle_generator import SubtitleGenerator
+
+        segments = fixtures.segments(fixture)
+        path = TEMP_DIR / f"bench_{fixture}.srt"
+
+        start = time.perf_counter()
+        SubtitleGenerator().generate_srt(segments, str(path))
+        metrics['seconds'] = time.perf_counter() - start
+        metrics['cues_per_second'] = fixture / metrics['seconds']
+        path.unlink()
+
+    elif stage == "mux":
+        from core.subtitle_generator import SubtitleGenerator
+        from core.video_processor import VideoProcessor
+
+        video = fixtures.media(fixture)
+        segments = fixtures.segments(int(fixtures.duration(fixture) // 3))
+        generator = SubtitleGenerator()
+        subtitle_paths = {
+            'eng': generator.generate(segments, str(TEMP_DIR / "bench_en.srt"), language="en"),
+            'per': generator.generate(segments, str(TEMP_DIR / "bench_fa.srt"), language="fa")
+        }
+
+        start = time.perf_counter()
+        output = Path(VideoProcessor.add_subtitles(str(video), subtitle_paths, f"bench_{fixture}.mkv"))
+        metrics['seconds'] = time.perf_counter() - start
+        metrics['mb_per_second'] = output.stat().st_size / (1024 * 1024) / metrics['seconds']
+
+        for path in [output, *map(Path, subtitle_paths.values())]:
+            path.unlink()
+
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    return {name: round(value, 4) if isinstance(value, float) else value for name, value in metrics.items()}
+
+
+def measure(stage: str, fixture, options: dict) -> dict:
+    """Run a stage in its own spawned process; missing dependencies mark it skipped"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context,
+                             initializer=Logger.connect, initargs=(Logger().process_queue(),)) as executor:
+        try:
+            return executor.submit(run_stage, stage, fixture, options).result()
+        except ImportError as e:
+            return {'skipped': f"missing dependency: {e.name}"}
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}"}
+
+
+def compare(results: dict, baseline: dict, thresholds: dict) -> list:
+    """Metrics that grew past their allowed ratio against the baseline"""
+    regressions = []
+    for key, metrics in results.items():
+        previous = baseline.get(key)
+        if not previous or 'seconds' not in metrics or 'seconds' not in previous:
+            continue
+
+        stage = key.split("/")[0]
+        limits = {**thresholds.get('default', {}), **thresholds.get('stages', {}).get(stage, {})}
+        for metric, ratio in limits.items():
+            if metrics.get(metric) is None or not previous.get(metric):
+                continue
+            if metrics[metric] > previous[metric] * ratio:
+                regressions.append(f"{key} {metric}: {previous[metric]} -> {metrics[metric]} (limit x{ratio})")
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic fixtures")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--full", action="store_true", help="Also run the long fixtures")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--translation-model", default=TRANSLATION_MODEL)
+    parser.add_argument("--output", type=Path, help="Results file (default: output/bench/results-<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Fail when results regress against this file")
+    parser.add_argument("--save-baseline", type=Path, help="Also write the results as the new baseline")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS)
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    plan = FULL_PLAN if args.full else QUICK_PLAN
+    options = {'whisper_model': args.whisper_model, 'translation_model': args.translation_model}
+
+    results = {}
+    print(f"{'stage/fixture':<28}{'seconds':>10}{'rtf':>8}{'peak MB':>10}  other")
+    for stage in stages:
+        for fixture in plan[stage]:
+            key = f"{stage}/{fixture}"
+            metrics = measure(stage, fixture, options)
+            results[key] = metrics
+
+            if 'seconds' not in metrics:
+                print(f"{key:<28}  {metrics.get('skipped') or metrics.get('error')}")
+                continue
+
+            other = ", ".join(
+                f"{name}={value}" for name, value in metrics.items()
+                if name not in ('seconds', 'rtf', 'peak_rss_mb')
+            )
+            print(f"{key:<28}{metrics['seconds']:>10.3f}{metrics.get('rtf', '-'):>8}"
+                  f"{metrics['peak_rss_mb'] or '-':>10}  {other}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': options,
+        'results': results
+    }
+
+    output = args.output or OUTPUT_DIR / "bench" / f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    for path in filter(None, [output, args.save_baseline]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+
+    failed = any('error' in metrics for metrics in results.values())
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))['results']
+        thresholds = json.loads(args.thresholds.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, thresholds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Quality/speed comparison of the float32 and int8 translation models
+
+Translates a fixed English sample with both models on CPU and reports load
+time, translation time, weight size and how close the int8 output is to the
+float32 output (character n-gram F-score, 100 = identical).
+
+Usage:
+    python benchmarks/bench_quantization.py [--model facebook/m2m100_418M] [--repeat 3] [--report out.json]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from settings import TRANSLATION_MODEL
+from core.model_registry import ModelRegistry
+from core.translator import Translator
+from fixtures import SENTENCES
+
+SAMPLE = SENTENCES
+
+
+def chrf(hypothesis: str, reference: str, max_order: int = 6, beta: float = 2.0) -> float:
+    """Character n-gram F-score (chrF) of one sentence, 0-100"""
+    hypothesis, reference = hypothesis.replace(" ", ""), reference.replace(" ", "")
+    if hypothesis == reference:
+        return 100.0
+
+    precisions, recalls = [], []
+    for n in range(1, max_order + 1):
+        hyp = Counter(hypothesis[i:i + n] for i in range(len(hypothesis) - n + 1))
+        ref = Counter(reference[i:i + n] for i in range(len(reference) - n + 1))
+        if not hyp or not ref:
+            continue
+        matches = sum((hyp & ref).values())
+        precisions.append(matches / sum(hyp.values()))
+        recalls.append(matches / sum(ref.values()))
+
+    if not precisions:
+        return 0.0
+
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if precision + recall == 0:
+        return 0.0
+
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def measure(model_name: str, quantize: bool, repeat: int) -> dict:
+    """Load a model on CPU and translate the sample `repeat` times"""
+    translator = Translator(model_name, quantize=quantize, device="cpu")
+    translator.cache = None
+
+    start = time.perf_counter()
+    model, _ = translator.load_model()
+    load_seconds = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        translations = translator.translate_batch(SAMPLE)
+        times.append(time.perf_counter() - start)
+
+    result = {
+        'dtype': translator.dtype,
+        'load_seconds': round(load_seconds, 2),
+        'translate_seconds': round(min(times), 2),
+        'weights_mb': round(ModelRegistry.measure(model) / (1024 * 1024), 1),
+        'translations': translations
+    }
+
+    ModelRegistry().clear()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare float32 and int8 translation on CPU")
+    parser.add_argument("--model", default=TRANSLATION_MODEL)
+    parser.add_argument("--repeat", type=int, default=3, help="Translation runs per model (best is kept)")
+    parser.add_argument("--report", type=Path, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    baseline = measure(args.model, quantize=False, repeat=max(1, args.repeat))
+    quantized = measure(args.model, quantize=True, repeat=max(1, args.repeat))
+
+    scores = [chrf(q, b) for q, b in zip(quantized['translations'], baseline['translations'])]
+    report = {
+        'model': args.model,
+        'sentences': len(SAMPLE),
+        'float32': baseline,
+        'qint8': quantized,
+        'speedup': round(baseline['translate_seconds'] / max(quantized['translate_seconds'], 1e-9), 2),
+        'memory_ratio': round(quantized['weights_mb'] / max(baseline['weights_mb'], 1e-9), 2),
+        'chrf_vs_float32': round(sum(scores) / len(scores), 1),
+        'identical': sum(score == 100.0 for score in scores)
+    }
+
+    print(f"Model: {args.model} ({len(SAMPLE)} sentences, CPU)")
+    print(f"{'':<10}{'load':>10}{'translate':>12}{'weights':>12}")
+    for name in ("float32", "qint8"):
+        r = report[name]
+        print(f"{name:<10}{r['load_seconds']:>9.2f}s{r['translate_seconds']:>11.2f}s{r['weights_mb']:>9.1f} MB")
+    print(f"Speed-up: {report['speedup']}x, memory: {report['memory_ratio']}x, "
+          f"chrF vs float32: {report['chrf_vs_float32']} ({report['identical']}/{len(SAMPLE)} identical)")
+
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
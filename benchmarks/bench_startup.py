@@ -0,0 +1,86 @@
+"""
+Startup benchmark
+
+Times how long importing the entry modules takes in a fresh interpreter and
+checks that none of the heavy ML libraries are pulled in at import time.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--max-seconds 2.0]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = ["core.pipeline", "ui.main_window"]
+HEAVY_MODULES = ["torch", "whisper", "transformers"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    """Median import time of a module over several fresh interpreters"""
+    times = []
+    heavy = set()
+    error = None
+
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+            break
+
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        heavy.update(result['heavy'])
+
+    return {
+        'module': module,
+        'median_seconds': round(statistics.median(times), 3) if times else None,
+        'heavy_imports': sorted(heavy),
+        'error': error
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the entry modules")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="Fail when a median exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [measure(module, max(1, args.runs)) for module in MODULES]
+
+    failed = False
+    for result in results:
+        if result['error'] or result['heavy_imports'] or result['median_seconds'] > args.max_seconds:
+            failed = True
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            if result['error']:
+                print(f"{result['module']:<20} error: {result['error']}")
+                continue
+            heavy = ", ".join(result['heavy_imports']) or "none"
+            print(f"{result['module']:<20} {result['median_seconds']:.3f}s  heavy imports: {heavy}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
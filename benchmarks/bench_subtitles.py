@@ -0,0 +1,88 @@
+"""
+Subtitle writer benchmark
+
+Writes the same synthetic cues (100k by default) with every subtitle format
+and reports throughput and peak Python memory. The writers stream to disk,
+so peak memory should stay flat as the number of cues grows.
+
+Usage:
+    python benchmarks/bench_subtitles.py [--cues 100000] [--output-dir output/bench]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from settings import OUTPUT_DIR
+from core.subtitle_writers import WRITERS, get_writer
+
+WORDS = ["the", "model", "subtitle", "video", "translation", "sound", "really", "نمونه", "زیرنویس", "ترجمه"]
+
+
+def make_cues(count: int):
+    """Deterministic two-line cues, 2.5 s each"""
+    for i in range(count):
+        first = " ".join(WORDS[(i + k) % len(WORDS)] for k in range(6))
+        second = " ".join(WORDS[(i * 7 + k) % len(WORDS)] for k in range(5))
+        yield {'text': f"{first}\n{second}", 'start': i * 2.5, 'end': i * 2.5 + 2.2}
+
+
+def write(subtitle_format: str, count: int, path: Path) -> float:
+    start = time.perf_counter()
+    with get_writer(str(path), language="fa", subtitle_format=subtitle_format) as writer:
+        for cue in make_cues(count):
+            writer.write(cue['start'], cue['end'], cue['text'])
+    return time.perf_counter() - start
+
+
+def measure(subtitle_format: str, count: int, output_dir: Path) -> dict:
+    path = output_dir / f"bench.{subtitle_format}"
+
+    seconds = write(subtitle_format, count, path)
+    size = path.stat().st_size
+
+    # Separate run: tracing allocations slows writing down several times
+    tracemalloc.start()
+    write(subtitle_format, count, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    path.unlink()
+
+    return {
+        'format': subtitle_format,
+        'cues': count,
+        'seconds': round(seconds, 3),
+        'cues_per_second': round(count / seconds),
+        'mb_per_second': round(size / (1024 * 1024) / seconds, 1),
+        'file_mb': round(size / (1024 * 1024), 1),
+        'peak_memory_kb': round(peak / 1024)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure subtitle writer throughput")
+    parser.add_argument("--cues", type=int, default=100_000)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR / "bench")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    results = [measure(subtitle_format, args.cues, args.output_dir) for subtitle_format in WRITERS]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'format':<8}{'cues':>10}{'seconds':>10}{'cues/s':>12}{'MB/s':>8}{'peak KB':>10}")
+        for r in results:
+            print(f"{r['format']:<8}{r['cues']:>10}{r['seconds']:>10.3f}{r['cues_per_second']:>12}"
+                  f"{r['mb_per_second']:>8}{r['peak_memory_kb']:>10}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
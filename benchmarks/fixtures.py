@@ -0,0 +1,89 @@
+"""
+Deterministic benchmark inputs
+
+Media files are generated locally with ffmpeg's lavfi sources (test pattern
+video with a tone, pink noise or silence), so every machine benchmarks the
+same bytes without downloading anything. Segment lists are built from a
+fixed set of English sentences, numbered so that every cue is unique and the
+translator's deduplication can't shrink the workload.
+"""
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+from settings import OUTPUT_DIR
+
+FIXTURE_DIR = OUTPUT_DIR / "bench" / "fixtures"
+
+# name: (duration in seconds, lavfi audio source)
+MEDIA = {
+    'tone-10s': (10, "sine=frequency=440:sample_rate=48000"),
+    'noise-60s': (60, "anoisesrc=color=pink:amplitude=0.3:seed=42:sample_rate=48000"),
+    'silence-60s': (60, "anullsrc=channel_layout=stereo:sample_rate=48000"),
+    'tone-300s': (300, "sine=frequency=220:beep_factor=4:sample_rate=48000"),
+}
+
+SENTENCES = [
+    "Hello everyone, and welcome back to the channel.",
+    "Today we are going to talk about how neural networks learn.",
+    "Before we start, make sure you have Python installed on your computer.",
+    "The first step is to download the dataset from the website.",
+    "I think this is the most important part of the whole video.",
+    "Don't worry if it doesn't make sense yet.",
+    "We will come back to this example later.",
+    "As you can see, the loss goes down after every epoch.",
+    "The weather in the mountains was colder than we expected.",
+    "She told me that the meeting had been moved to Thursday afternoon.",
+    "Could you please turn off the lights when you leave the room?",
+    "The museum is closed on Mondays, but it opens early on weekends.",
+    "He has been working at the hospital for more than ten years.",
+    "Thank you so much for watching, and see you in the next one.",
+    "If you have any questions, leave them in the comments below.",
+    "Prices went up again this month because of the high demand.",
+    "The children were playing in the garden when it started to rain.",
+    "This function returns a list of all the files in the folder.",
+    "We need to find a better solution before the deadline.",
+    "Honestly, I did not expect the ending of the movie at all.",
+]
+
+
+def media(name: str) -> Path:
+    """Path of a media fixture, generated on first use"""
+    duration, audio_source = MEDIA[name]
+    path = FIXTURE_DIR / f"{name}.mp4"
+    if path.exists():
+        return path
+
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp.mp4")
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=15:duration={duration}",
+         "-f", "lavfi", "-i", audio_source,
+         "-t", str(duration), "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+         "-c:a", "aac", "-b:a", "96k", "-shortest", str(temp_path)],
+        check=True
+    )
+    temp_path.replace(path)
+    return path
+
+
+def duration(name: str) -> float:
+    return float(MEDIA[name][0])
+
+
+def text(index: int) -> str:
+    """A distinct line for every index, cycling through SENTENCES"""
+    return f"Part {index + 1}. {SENTENCES[index % len(SENTENCES)]}"
+
+
+def segments(count: int, cue_seconds: float = 3.0) -> List[Dict]:
+    """`count` cues with distinct texts, back to back"""
+    return [
+        {
+            'text': text(i),
+            'start': i * cue_seconds,
+            'end': i * cue_seconds + cue_seconds - 0.2
+        }
+        for i in range(count)
+    ]
@@ -1,19 +1,28 @@
+import threading
+import wave
 from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
 
 import ffmpeg
+import numpy as np
 
-from settings import AUDIO_FORMAT, AUDIO_CODEC, AUDIO_RATE, TEMP_DIR
+from settings import (
+    AUDIO_FORMAT, AUDIO_CODEC, AUDIO_RATE, AUDIO_MEMMAP_THRESHOLD, TEMP_DIR, STREAM_WINDOW, STREAM_OVERLAP
+)
 from exceptions.audio_extractor_exc import *
 
+# Bytes read from the ffmpeg pipe at once (~2 s of 16 kHz mono s16le)
+PIPE_CHUNK_BYTES = 1 << 16
+
 
 class AudioExtractor:
     """Extract audio from video with ffmpeg"""
 
     @staticmethod
-    def extract(video_path: str) -> str:
-        """Extract audio from video"""
+    def extract(video_path: str, work_dir: Optional[Path] = None) -> str:
+        """Extract audio from video into a WAV file in `work_dir` (default: TEMP_DIR)"""
         try:
-            audio_path = TEMP_DIR / f"{Path(video_path).stem}_audio.{AUDIO_FORMAT}"
+            audio_path = Path(work_dir or TEMP_DIR) / f"{Path(video_path).stem}_audio.{AUDIO_FORMAT}"
             audio_path = str(audio_path)
 
             stream = ffmpeg.input(video_path)
@@ -33,6 +42,164 @@ class AudioExtractor:
             error_message = e.stderr.decode() if e.stderr else str(e)
             raise AudioExtractionError(f"Error extracting audio: {error_message}")
 
+    @staticmethod
+    def _allocate(video_path: str, samples: int, memmap: bool, work_dir: Optional[Path] = None) -> np.ndarray:
+        """Allocate a float32 buffer in memory or backed by a raw file in `work_dir` (default: TEMP_DIR)"""
+        if not memmap:
+            return np.empty(samples, dtype=np.float32)
+
+        buffer_path = Path(work_dir or TEMP_DIR) / f"{Path(video_path).stem}_audio.f32"
+        return np.memmap(buffer_path, dtype=np.float32, mode="w+", shape=(samples,))
+
+    @staticmethod
+    def _grow(buffer: np.ndarray, samples: int) -> np.ndarray:
+        """Enlarge a buffer when ffmpeg delivers more audio than probed"""
+        if not isinstance(buffer, np.memmap):
+            return np.resize(buffer, samples)
+
+        buffer.flush()
+        with open(buffer.filename, "r+b") as f:
+            f.truncate(samples * np.dtype(np.float32).itemsize)
+        return np.memmap(buffer.filename, dtype=np.float32, mode="r+", shape=(samples,))
+
+    @staticmethod
+    def _iter_pcm(video_path: str) -> Iterator[np.ndarray]:
+        """Decode audio through an ffmpeg pipe, yielding 16 kHz mono float32 chunks"""
+        try:
+            process = (
+                ffmpeg
+                .input(video_path)
+                .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=AUDIO_RATE, loglevel="error")
+                .run_async(pipe_stdout=True, pipe_stderr=True)
+            )
+        except (ffmpeg.Error, OSError) as e:
+            raise AudioExtractionError(f"Error extracting audio: {e}")
+
+        # Drain stderr so a chatty ffmpeg never blocks on a full pipe
+        stderr = []
+        stderr_thread = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        stderr_thread.start()
+
+        leftover = b""
+        try:
+            while True:
+                chunk = process.stdout.read(PIPE_CHUNK_BYTES)
+                if not chunk:
+                    break
+
+                chunk = leftover + chunk
+                usable = len(chunk) - len(chunk) % 2
+                leftover = chunk[usable:]
+
+                yield np.frombuffer(chunk[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+            process.wait()
+            stderr_thread.join()
+
+        finally:
+            # Also reached when the consumer stops early
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        if process.returncode != 0:
+            error_message = stderr[0].decode(errors="replace") if stderr and stderr[0] else "ffmpeg failed"
+            raise AudioExtractionError(f"Error extracting audio: {error_message}")
+
+    @staticmethod
+    def extract_array(video_path: str, work_dir: Optional[Path] = None,
+                      duration: Optional[float] = None) -> np.ndarray:
+        """
+        Decode audio straight from the ffmpeg pipe into a float32 array
+
+        The result is 16 kHz mono in [-1, 1], the format Whisper expects, so no
+        intermediate WAV is written and the audio is decoded only once. Inputs
+        longer than AUDIO_MEMMAP_THRESHOLD seconds are buffered in a memory-mapped
+        file in `work_dir` instead of RAM; release it with `AudioExtractor.cleanup`.
+        Pass the probed `duration`, if known, to skip probing the file again.
+        """
+        if duration is None:
+            try:
+                duration = AudioExtractor.get_video_duration(video_path)
+            except VideoProbeError:
+                duration = 0.0
+
+        # One second of slack so the buffer rarely has to grow
+        samples = int(duration * AUDIO_RATE) + AUDIO_RATE
+        buffer = AudioExtractor._allocate(video_path, samples, duration > AUDIO_MEMMAP_THRESHOLD, work_dir)
+
+        position = 0
+        try:
+            for pcm in AudioExtractor._iter_pcm(video_path):
+                if position + len(pcm) > len(buffer):
+                    buffer = AudioExtractor._grow(buffer, max(2 * len(buffer), position + len(pcm)))
+
+                buffer[position:position + len(pcm)] = pcm
+                position += len(pcm)
+
+        except Exception:
+            AudioExtractor.cleanup(buffer)
+            raise
+
+        return buffer[:position]
+
+    @staticmethod
+    def iter_windows(audio: Union[str, np.ndarray],
+                     window: float = STREAM_WINDOW,
+                     overlap: float = STREAM_OVERLAP) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Yield (offset in seconds, samples) windows of `window` seconds
+
+        Consecutive windows share `overlap` seconds. A video path is decoded
+        through the ffmpeg pipe on the fly, so memory stays bounded by one
+        window regardless of the duration.
+        """
+        window_samples = int(window * AUDIO_RATE)
+        step = window_samples - int(overlap * AUDIO_RATE)
+        if step <= 0:
+            raise ValueError("Window overlap must be shorter than the window")
+
+        if isinstance(audio, np.ndarray):
+            for start in range(0, max(len(audio) - int(overlap * AUDIO_RATE), 1), step):
+                yield start / AUDIO_RATE, audio[start:start + window_samples]
+            return
+
+        pending = np.empty(0, dtype=np.float32)
+        offset = 0
+        for pcm in AudioExtractor._iter_pcm(audio):
+            pending = np.concatenate((pending, pcm))
+
+            while len(pending) >= window_samples:
+                yield offset / AUDIO_RATE, pending[:window_samples]
+                pending = pending[step:]
+                offset += step
+
+        # Tail that is not already covered by the previous window
+        if offset == 0 or len(pending) > window_samples - step:
+            yield offset / AUDIO_RATE, pending
+
+    @staticmethod
+    def audio_seconds(audio: Union[str, np.ndarray]) -> float:
+        """Length of extracted audio (a 16 kHz array or WAV file) without decoding it"""
+        if isinstance(audio, str):
+            with wave.open(audio, "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+
+        return len(audio) / AUDIO_RATE
+
+    @staticmethod
+    def cleanup(audio: Union[str, np.ndarray, None]):
+        """Delete the temporary file behind extracted audio, if any"""
+        if isinstance(audio, str):
+            Path(audio).unlink(missing_ok=True)
+
+        elif isinstance(audio, np.memmap) and audio.filename:
+            try:
+                Path(audio.filename).unlink(missing_ok=True)
+            except PermissionError:
+                # Windows keeps mapped files locked; Workspace.remove_stale deletes it later
+                pass
+
     @staticmethod
     def get_video_duration(video_path: str) -> float:
         """Get video length in seconds"""
@@ -0,0 +1,172 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from settings import (
+    MAX_SUBTITLE_LENGTH, SUBTITLE_MAX_LINES, SUBTITLE_MIN_DURATION, SUBTITLE_MAX_DURATION, SUBTITLE_BREAK_GAP
+)
+from core.sentence_merger import SentenceMerger
+
+
+class CueSegmenter:
+    """
+    Re-cut transcribed segments into readable subtitle cues
+
+    Cues hold at most `max_lines` lines of `max_chars` characters and last
+    between `min_duration` and `max_duration` seconds. Every word is visited
+    once (plus one cue of lookahead), so long files are processed in linear time.
+    """
+
+    def __init__(self,
+                 max_chars: int = MAX_SUBTITLE_LENGTH,
+                 max_lines: int = SUBTITLE_MAX_LINES,
+                 min_duration: float = SUBTITLE_MIN_DURATION,
+                 max_duration: float = SUBTITLE_MAX_DURATION,
+                 break_gap: float = SUBTITLE_BREAK_GAP):
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.break_gap = break_gap
+
+    @staticmethod
+    def words(segment: Dict) -> List[Dict]:
+        """
+        Timed words of a segment
+
+        Word timestamps from Whisper are used when present; otherwise the
+        segment time is shared between its words in proportion to their length.
+        """
+        if segment.get('words'):
+            return [
+                {'word': word['word'].strip(), 'start': word['start'], 'end': word['end']}
+                for word in segment['words'] if word['word'].strip()
+            ]
+
+        texts = segment['text'].split()
+        total = sum(len(text) + 1 for text in texts)
+        duration = max(segment['end'] - segment['start'], 0.0)
+
+        words = []
+        position = 0
+        for text in texts:
+            start = segment['start'] + duration * position / total
+            position += len(text) + 1
+            words.append({'word': text, 'start': start, 'end': segment['start'] + duration * position / total})
+
+        return words
+
+    def wrap(self, text: str) -> str:
+        """
+        Break a text into lines of at most `max_chars`
+
+        Two-line texts are split at the space closest to the middle so both
+        lines have a similar length; longer texts are wrapped greedily.
+        """
+        words = text.split()
+        text = " ".join(words)
+        if len(text) <= self.max_chars:
+            return text
+
+        if len(text) <= 2 * self.max_chars + 1:
+            best = None
+            position = 0
+            for word in words[:-1]:
+                position += len(word)
+                first, second = position, len(text) - position - 1
+                if first <= self.max_chars and second <= self.max_chars:
+                    if best is None or abs(first - second) < abs(best - (len(text) - best - 1)):
+                        best = position
+                position += 1
+
+            if best is not None:
+                return f"{text[:best]}\n{text[best + 1:]}"
+
+        lines = []
+        line = ""
+        for word in words:
+            if line and len(line) + 1 + len(word) > self.max_chars:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+
+        return "\n".join(lines)
+
+    def _fits(self, text: str) -> bool:
+        return self.wrap(text).count("\n") < self.max_lines
+
+    def _cut(self, segments: Iterable[Dict]) -> Iterator[Dict]:
+        """Group words greedily into cues that respect the line, length and gap limits"""
+        words = []
+        line_length = 0
+        lines = 1
+
+        for segment in segments:
+            for word in self.words(segment):
+                if words:
+                    new_line = line_length + 1 + len(word['word']) > self.max_chars
+                    if ((new_line and lines >= self.max_lines)
+                            or word['end'] - words[0]['start'] > self.max_duration
+                            or word['start'] - words[-1]['end'] > self.break_gap):
+                        yield self._cue(words)
+                        words, line_length, lines = [], 0, 1
+                    elif new_line:
+                        lines += 1
+                        line_length = len(word['word'])
+                    else:
+                        line_length += 1 + len(word['word'])
+
+                if not words:
+                    line_length = len(word['word'])
+                words.append(word)
+
+                # Prefer to end a cue with its sentence
+                if SentenceMerger.is_sentence_end(word['word']):
+                    yield self._cue(words)
+                    words, line_length, lines = [], 0, 1
+
+        if words:
+            yield self._cue(words)
+
+    @staticmethod
+    def _cue(words: List[Dict]) -> Dict:
+        return {
+            'text': " ".join(word['word'] for word in words),
+            'start': words[0]['start'],
+            'end': words[-1]['end']
+        }
+
+    def iter_cues(self, segments: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield cues as soon as they are final
+
+        A cue shorter than `min_duration` is merged into the next one when
+        the result still fits, otherwise it is extended up to the next cue.
+        """
+        pending: Optional[Dict] = None
+
+        for cue in self._cut(segments):
+            if pending is not None:
+                merged_text = f"{pending['text']} {cue['text']}"
+                if (pending['end'] - pending['start'] < self.min_duration
+                        and cue['end'] - pending['start'] <= self.max_duration
+                        and self._fits(merged_text)):
+                    pending = {'text': merged_text, 'start': pending['start'], 'end': cue['end']}
+                    continue
+
+                yield self._finish(pending, cue['start'])
+            pending = cue
+
+        if pending is not None:
+            yield self._finish(pending, None)
+
+    def _finish(self, cue: Dict, next_start: Optional[float]) -> Dict:
+        """Wrap the text and stretch a short cue without overlapping the next one"""
+        end = max(cue['end'], cue['start'] + self.min_duration)
+        if next_start is not None:
+            end = max(min(end, next_start), cue['end'])
+
+        return {'text': self.wrap(cue['text']), 'start': cue['start'], 'end': end}
+
+    def resegment(self, segments: Iterable[Dict]) -> List[Dict]:
+        return list(self.iter_cues(segments))
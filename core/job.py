@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from settings import JOBS_DIR
+from exceptions.pipeline_exc import JobNotFoundError
+
+
+class JobManifest:
+    """
+    Job-specific directory with a manifest of completed stages and their artifacts
+
+    Layout:
+        jobs/<job id>/manifest.json      video, status and per-stage artifacts
+        jobs/<job id>/<artifact>.json    stage outputs such as the segments
+
+    The directory is deleted once the job finishes, so only jobs that can be
+    resumed are kept.
+    """
+
+    FILE_NAME = "manifest.json"
+
+    def __init__(self, directory: Union[str, Path], data: Dict):
+        self.directory = Path(directory)
+        self.data = data
+
+    @classmethod
+    def create(cls, video_path: str, options: Optional[Dict] = None, jobs_dir: Path = JOBS_DIR) -> "JobManifest":
+        """Create a new job directory for a video"""
+        job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        directory = Path(jobs_dir) / job_id
+        directory.mkdir(parents=True, exist_ok=False)
+
+        manifest = cls(directory, {
+            'id': job_id,
+            'video': str(Path(video_path).resolve()),
+            'status': "running",
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'updated': None,
+            'options': options or {},
+            'stages': {},
+            'error': None
+        })
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def load(cls, job: Union[str, Path], jobs_dir: Path = JOBS_DIR) -> "JobManifest":
+        """Open a job by id or directory"""
+        directory = Path(job)
+        if not (directory / cls.FILE_NAME).exists():
+            directory = Path(jobs_dir) / str(job)
+
+        try:
+            with open(directory / cls.FILE_NAME, encoding="utf-8") as f:
+                return cls(directory, json.load(f))
+        except (OSError, ValueError) as e:
+            raise JobNotFoundError(f"Job not found or unreadable: {job} ({e})")
+
+    @classmethod
+    def find(cls, status: Optional[str] = None, jobs_dir: Path = JOBS_DIR) -> List["JobManifest"]:
+        """All jobs, oldest first, optionally filtered by status"""
+        manifests = []
+        for path in sorted(Path(jobs_dir).glob(f"*/{cls.FILE_NAME}")):
+            try:
+                manifest = cls.load(path.parent)
+            except JobNotFoundError:
+                continue
+            if status is None or manifest.status == status:
+                manifests.append(manifest)
+
+        return manifests
+
+    @property
+    def id(self) -> str:
+        return self.data['id']
+
+    @property
+    def video(self) -> str:
+        return self.data['video']
+
+    @property
+    def status(self) -> str:
+        return self.data['status']
+
+    def save(self):
+        """Write the manifest atomically"""
+        self.data['updated'] = datetime.now().isoformat(timespec="seconds")
+        temp_path = self.directory / f"{self.FILE_NAME}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.directory / self.FILE_NAME)
+
+    def is_completed(self, stage: str) -> bool:
+        return stage in self.data['stages']
+
+    def complete(self, stage: str, artifacts: Optional[Dict] = None):
+        """
+        Record a finished stage
+
+        List and dict artifacts (such as segments) are written to
+        `<name>.json` in the job directory; other values (paths) are kept
+        in the manifest itself.
+        """
+        record = {'completed': datetime.now().isoformat(timespec="seconds")}
+
+        for name, value in (artifacts or {}).items():
+            if isinstance(value, (list, dict)):
+                temp_path = self.directory / f"{name}.json.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f, ensure_ascii=False)
+                os.replace(temp_path, self.directory / f"{name}.json")
+                record[name] = {'file': f"{name}.json"}
+            else:
+                record[name] = value
+
+        self.data['stages'][stage] = record
+        self.data['status'] = "running"
+        self.data['error'] = None
+        self.save()
+
+    def artifacts(self, stage: str) -> Dict:
+        """Load the artifacts of a completed stage"""
+        loaded = {}
+        for name, value in self.data['stages'].get(stage, {}).items():
+            if name == 'completed':
+                continue
+            if isinstance(value, dict) and 'file' in value:
+                with open(self.directory / value['file'], encoding="utf-8") as f:
+                    loaded[name] = json.load(f)
+            else:
+                loaded[name] = value
+
+        return loaded
+
+    def fail(self, stage: str, error: Exception):
+        self.data['status'] = "failed"
+        self.data['error'] = {'stage': stage, 'message': f"{type(error).__name__}: {error}"}
+        self.save()
+
+    def finish(self):
+        """Delete the job directory; a finished job has nothing left to resume"""
+        shutil.rmtree(self.directory, ignore_errors=True)
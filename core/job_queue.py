@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from settings import SERVICE_QUEUE_PATH
+
+
+class JobQueue:
+    """
+    Persistent first-in first-out queue of service jobs in SQLite
+
+    Jobs go from queued to running to done, failed or cancelled. Jobs that
+    were running when the service stopped are queued again on the next start,
+    so nothing submitted is lost.
+    """
+
+    FINISHED = ("done", "failed", "cancelled")
+
+    def __init__(self, path: Path = SERVICE_QUEUE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT, video TEXT, options TEXT, "
+            "created REAL, started REAL, finished REAL, "
+            "progress REAL, message TEXT, result TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+        self._db.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL, progress = 0, message = 'Queued again after restart' "
+            "WHERE status = 'running'"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['options'] = json.loads(job['options'] or "{}")
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def submit(self, video_path: str, options: Optional[Dict] = None) -> Dict:
+        """Add a job at the end of the queue"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, video, options, created, progress, message) "
+                "VALUES (?, 'queued', ?, ?, ?, 0, 'Queued')",
+                (job_id, str(video_path), json.dumps(options or {}), time.time())
+            )
+            self._db.commit()
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Most recent jobs first, optionally filtered by status"""
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def take(self) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created, rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started = ?, message = 'Starting' WHERE id = ?",
+                (time.time(), row['id'])
+            )
+            self._db.commit()
+
+        return self.get(row['id'])
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None,
+               message: Optional[str] = None, progress: Optional[float] = None):
+        """Record the end of a job: done with a result, failed with an error, or cancelled"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, result = ?, error = ?, "
+                "message = COALESCE(?, message), progress = COALESCE(?, progress) WHERE id = ?",
+                (status, time.time(), json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, message, progress, job_id)
+            )
+            self._db.commit()
+
+    def requeue(self, job_id: str, message: str = "Queued again"):
+        """Put a running job back at the front of the queue"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL, progress = 0, message = ? "
+                "WHERE id = ? AND status = 'running'",
+                (message, job_id)
+            )
+            self._db.commit()
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a queued job at once
+
+        Returns:
+            the status of the job afterwards (running jobs must be stopped by
+            their worker first), or None for an unknown job
+        """
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+
+            if row['status'] != "queued":
+                return row['status']
+
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ?, message = 'Cancelled' WHERE id = ?",
+                (time.time(), job_id)
+            )
+            self._db.commit()
+
+        return "cancelled"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
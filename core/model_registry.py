@@ -0,0 +1,150 @@
+import gc
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from settings import MODEL_REGISTRY_MAX_MODELS, MODEL_REGISTRY_MAX_MB
+from utils.logger import Logger
+from utils.metrics import Metrics
+
+
+class ModelRegistry:
+    """
+    Process-wide pool of loaded models
+
+    Models are keyed by (kind, name, device, dtype) so a different model
+    name always loads a different model. Least recently used models are
+    unloaded once more than MODEL_REGISTRY_MAX_MODELS are resident or their
+    weights exceed MODEL_REGISTRY_MAX_MB. Callers fetch the model from the
+    registry on every use instead of keeping a reference, so an evicted
+    model is really freed.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.max_models = MODEL_REGISTRY_MAX_MODELS
+        self.max_bytes = int(MODEL_REGISTRY_MAX_MB * 1024 * 1024)
+
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self._loading = {}
+
+        self.logger = Logger()
+        self.metrics = Metrics()
+        self._initialized = True
+
+    @staticmethod
+    def measure(model) -> int:
+        """Bytes used by the weights of a torch model (first item of a tuple)"""
+        if isinstance(model, tuple):
+            model = model[0]
+
+        state_dict = getattr(model, "state_dict", None)
+        if state_dict is None:
+            return 0
+
+        # The state dict also holds packed int8 weights, which are not parameters;
+        # tied weights appear under several names but are counted once
+        size = 0
+        seen = set()
+        pending = list(state_dict().values())
+        while pending:
+            value = pending.pop()
+            if isinstance(value, (tuple, list)):
+                pending.extend(value)
+            elif hasattr(value, "element_size") and value.data_ptr() not in seen:
+                seen.add(value.data_ptr())
+                size += value.numel() * value.element_size()
+
+        return size
+
+    def get(self, key: Tuple[Hashable, ...], loader: Callable[[], object]):
+        """Return the model for `key`, loading it with `loader` on first use"""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+            # One loader per key; other keys keep being served meanwhile
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            self.logger.info(f"Loading model {key}")
+            with self.metrics.span("model.load", model="/".join(map(str, key))) as span:
+                model = loader()
+                size = self.measure(model)
+                span['size_mb'] = round(size / (1024 * 1024), 1)
+
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = size
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+
+            return model
+
+    def _evict(self, keep: Hashable):
+        """Unload least recently used models until both limits are respected"""
+        while len(self._models) > 1:
+            over_count = len(self._models) > self.max_models
+            over_size = self.max_bytes > 0 and sum(self._sizes.values()) > self.max_bytes
+            if not (over_count or over_size):
+                break
+
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            self.release(oldest)
+
+    def release(self, key: Hashable):
+        """Unload one model and return its memory"""
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return
+            size = self._sizes.pop(key, 0)
+
+        self.logger.info(f"Unloading model {key} ({size / (1024 * 1024):.0f} MB)")
+        gc.collect()
+
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def clear(self):
+        """Unload every model"""
+        with self._lock:
+            keys = list(self._models)
+        for key in keys:
+            self.release(key)
+
+    def stats(self) -> Dict:
+        """Resident models, most recently used last, with their sizes"""
+        with self._lock:
+            return {
+                'models': [{'key': list(key), 'mb': round(self._sizes[key] / (1024 * 1024), 1)}
+                           for key in self._models],
+                'total_mb': round(sum(self._sizes.values()) / (1024 * 1024), 1),
+                'max_models': self.max_models,
+                'max_mb': MODEL_REGISTRY_MAX_MB
+            }
@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from settings import (
+    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_LANGUAGE, AUDIO_RATE,
+    PARALLEL_TRANSCRIBE_WORKERS, PARALLEL_TRANSCRIBE_THREADS, PARALLEL_CHUNK_SECONDS
+)
+from core.transcriber import Transcriber
+from core.vad import VoiceActivityDetector
+from exceptions.transcriber_exc import *
+from utils.logger import Logger
+
+# Transcriber preloaded once in every worker process
+_worker_transcriber = None
+_worker_vad = None
+_worker_word_timestamps = False
+
+
+def _init_worker(model_name: str, device: str, threads: int, use_vad: bool, word_timestamps: bool = False,
+                 log_queue=None):
+    """Load the model once per worker and cap its intra-op threads"""
+    global _worker_transcriber, _worker_vad, _worker_word_timestamps
+
+    Logger.connect(log_queue)
+
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel operation
+        pass
+
+    _worker_transcriber = Transcriber(model_name, device)
+    _worker_transcriber.load_model()
+    _worker_vad = VoiceActivityDetector() if use_vad else None
+    _worker_word_timestamps = word_timestamps
+
+
+def _transcribe_chunk(offset: float, samples: np.ndarray, language: str) -> List[Dict]:
+    """Transcribe one chunk and move its segments to the original timeline"""
+    result = _worker_transcriber.transcribe(samples, language=language, vad=_worker_vad,
+                                            word_timestamps=_worker_word_timestamps)
+    chunk_end = offset + len(samples) / AUDIO_RATE
+
+    segments = []
+    for segment in _worker_transcriber.get_segments(result):
+        if not segment['text']:
+            continue
+
+        item = {
+            'text': segment['text'],
+            'start': offset + segment['start'],
+            'end': min(offset + segment['end'], chunk_end)
+        }
+        if 'words' in segment:
+            item['words'] = [
+                {**word, 'start': offset + word['start'], 'end': min(offset + word['end'], chunk_end)}
+                for word in segment['words']
+            ]
+
+        segments.append(item)
+
+    return segments
+
+
+class ParallelTranscriber:
+    """Transcribe long audio in worker processes, split at silences"""
+
+    def __init__(self,
+                 model_name: str = WHISPER_MODEL,
+                 device: str = WHISPER_DEVICE,
+                 workers: int = PARALLEL_TRANSCRIBE_WORKERS,
+                 threads_per_worker: int = PARALLEL_TRANSCRIBE_THREADS,
+                 chunk_seconds: float = PARALLEL_CHUNK_SECONDS,
+                 vad: bool = False,
+                 word_timestamps: bool = False):
+        self.model_name = model_name
+        self.device = device
+        self.threads_per_worker = max(1, threads_per_worker)
+        # 0 means one worker per `threads_per_worker` cores
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        self.chunk_seconds = chunk_seconds
+        self.use_vad = vad
+        self.word_timestamps = word_timestamps
+        self.detector = VoiceActivityDetector()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker pool once; workers keep their model between files"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Fresh interpreters: forking a process with torch threads running can deadlock
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.device, self.threads_per_worker, self.use_vad, self.word_timestamps,
+                          Logger().process_queue())
+            )
+        return self._executor
+
+    def split(self, audio: np.ndarray) -> List[Tuple[float, float]]:
+        """
+        Cut the audio into chunks of about `chunk_seconds` at silences
+
+        Each cut is placed in the middle of the longest pause within half a chunk
+        of the target position; audio without pauses is cut at the target.
+        Detected speech only chooses the cuts: all audio is kept, unless `vad`
+        was enabled, which drops chunks without any detected speech.
+        """
+        duration = len(audio) / AUDIO_RATE
+        regions = self.detector.detect(audio)
+        if self.use_vad and not regions:
+            return []
+
+        # (middle, length) of every pause between speech regions
+        pauses = [((end + start) / 2, start - end) for (_, end), (start, _) in zip(regions, regions[1:])]
+
+        chunks = []
+        chunk_start = 0.0
+        index = 0
+        while duration - chunk_start > 1.5 * self.chunk_seconds:
+            target = chunk_start + self.chunk_seconds
+            low, high = target - self.chunk_seconds / 2, target + self.chunk_seconds / 2
+
+            while index < len(pauses) and pauses[index][0] < low:
+                index += 1
+
+            best = None
+            scan = index
+            while scan < len(pauses) and pauses[scan][0] <= high:
+                if best is None or pauses[scan][1] > best[1]:
+                    best = pauses[scan]
+                scan += 1
+
+            cut = best[0] if best is not None else target
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+
+        chunks.append((chunk_start, duration))
+        if not self.use_vad:
+            return chunks
+
+        # Keep only chunks that overlap speech
+        return [
+            (start, end) for start, end in chunks
+            if any(r_start < end and r_end > start for r_start, r_end in regions)
+        ]
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = WHISPER_LANGUAGE) -> Dict:
+        """
+        Transcribe chunks concurrently and stitch the segments back together
+
+        Returns:
+            a Whisper-like result with 'text', 'segments' and 'language'
+        """
+        try:
+            if isinstance(audio, str):
+                import whisper
+                audio = whisper.load_audio(audio)
+
+            executor = self._get_executor()
+            futures = []
+            for start, end in self.split(audio):
+                samples = np.ascontiguousarray(audio[int(start * AUDIO_RATE):int(end * AUDIO_RATE)])
+                futures.append(executor.submit(_transcribe_chunk, start, samples, language))
+
+            segments = []
+            for future in futures:
+                for segment in future.result():
+                    # Chunks do not overlap, but keep the timeline monotonic anyway
+                    if segments and segment['start'] < segments[-1]['end']:
+                        segment['start'] = segments[-1]['end']
+                        segment['end'] = max(segment['end'], segment['start'])
+                    segments.append(segment)
+
+        except TranscriptionError:
+            raise
+        except Exception as e:
+            raise TranscriptionError(f"Parallel transcription failed with error: {e}")
+
+        return {
+            'text': " ".join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': language
+        }
+
+    def close(self):
+        """Stop the worker processes and free their models"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,1025 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from settings import (
+    OUTPUT_DIR, METRICS_DIR, WHISPER_MODEL, WHISPER_LANGUAGE, WORD_TIMESTAMPS, TRANSLATION_MODEL, AUDIO_MODE, VAD_ENABLED,
+    AUDIO_RATE, AUDIO_MEMMAP_THRESHOLD, WORKSPACE_TMPFS,
+    SUBTITLE_FORMAT, SUBTITLE_RESEGMENT, SUBTITLE_IMPORT, MUX_CONTAINER,
+    BURN_CODEC, BURN_PRESET, BURN_CRF, BURN_THREADS, BURN_PARALLEL_SEGMENTS,
+    TRANSCRIPTION_CACHE_ENABLED, SENTENCE_MERGE_ENABLED, TRANSLATION_PROFILES, TRANSLATION_PROFILE, TRANSLATION_QUANTIZE, JOB_CHECKPOINTS,
+    PIPELINE_STAGE_WORKERS, PIPELINE_QUEUE_SIZE
+)
+from core.audio_extractor import AudioExtractor
+from core.cue_segmenter import CueSegmenter
+from core.job import JobManifest
+from core.parallel_transcriber import ParallelTranscriber
+from core.scheduler import Stage, StageScheduler
+from core.sentence_merger import SentenceMerger
+from core.subtitle_generator import SubtitleGenerator
+from core.subtitle_reader import SubtitleReader
+from core.subtitle_writers import WRITERS
+from core.transcriber import Transcriber
+from core.transcription_cache import TranscriptionCache
+from core.translator import Translator
+from core.vad import VoiceActivityDetector
+from core.video_processor import VideoProcessor
+from core.workspace import Workspace
+from exceptions.audio_extractor_exc import VideoProbeError
+from exceptions.pipeline_exc import *
+from exceptions.subtitle_reader_exc import SubtitleReadError
+from utils.file_handler import FileHandler
+from utils.logger import Logger
+from utils.metrics import Metrics
+from utils.validators import Validators
+
+ProgressCallback = Callable[[str, float], None]
+
+
+class Pipeline:
+    """Full subtitle pipeline that keeps the models warm across many videos"""
+
+    # Job state saved after each stage, restored when a job is resumed. The audio
+    # lives in the job workspace, which is deleted when the job stops, so
+    # extraction is always run again unless the transcription was saved.
+    CHECKPOINT_ARTIFACTS = {
+        'extract': (),
+        'transcribe': ('segments_en', 'srt_en'),
+        'translate': ('segments_fa', 'srt_fa', 'srt_bilingual'),
+        'mux': ('output_video',)
+    }
+
+    # Recorded options that change a job's outputs, with the constructor argument of each
+    JOB_OPTIONS = {
+        'whisper_model': 'whisper_model',
+        'translation_model': 'translation_model',
+        'quantize': 'quantize',
+        'merge_sentences': 'merge_sentences',
+        'word_timestamps': 'word_timestamps',
+        'resegment': 'resegment',
+        'import_subtitles': 'import_subtitles',
+        'subtitle_format': 'subtitle_format',
+        'bilingual': 'bilingual',
+        'embed_subtitles': 'embed_subtitles',
+        'container': 'container',
+        'burn_in': 'burn_in',
+        'burn_options': 'burn_options',
+        'audio_mode': 'audio_mode',
+        'vad': 'vad'
+    }
+
+    def __init__(self,
+                 whisper_model: str = WHISPER_MODEL,
+                 translation_model: str = TRANSLATION_MODEL,
+                 quantize: bool = TRANSLATION_QUANTIZE,
+                 decoding: str = TRANSLATION_PROFILE,
+                 merge_sentences: bool = SENTENCE_MERGE_ENABLED,
+                 subtitle_dir: Optional[Path] = None,
+                 bilingual: bool = False,
+                 embed_subtitles: bool = True,
+                 stage_workers: Dict[str, int] = None,
+                 audio_mode: str = AUDIO_MODE,
+                 vad: bool = VAD_ENABLED,
+                 parallel_workers: Optional[int] = None,
+                 transcription_cache: bool = TRANSCRIPTION_CACHE_ENABLED,
+                 word_timestamps: bool = WORD_TIMESTAMPS,
+                 resegment: bool = SUBTITLE_RESEGMENT,
+                 subtitle_format: str = SUBTITLE_FORMAT,
+                 import_subtitles: bool = SUBTITLE_IMPORT,
+                 container: str = MUX_CONTAINER,
+                 burn_in: bool = False,
+                 burn_options: Optional[Dict] = None,
+                 checkpoints: bool = JOB_CHECKPOINTS,
+                 tmpfs: bool = WORKSPACE_TMPFS):
+        self.audio_extractor = AudioExtractor()
+        self.transcriber = Transcriber(whisper_model)
+        self.translator = Translator(translation_model, quantize=quantize, profile=decoding)
+        self.subtitle_gen = SubtitleGenerator(subtitle_format)
+        self.subtitle_reader = SubtitleReader()
+        self.import_subtitles = import_subtitles
+        self.video_processor = VideoProcessor()
+        self.sentence_merger = SentenceMerger() if merge_sentences else None
+        self.cue_segmenter = CueSegmenter() if resegment else None
+        self.word_timestamps = word_timestamps
+
+        # None keeps subtitle files in the job workspace, deleted with it
+        self.subtitle_dir = Path(subtitle_dir) if subtitle_dir else None
+        self.tmpfs = tmpfs
+        self.decoding = decoding
+        self.bilingual = bilingual
+        self.embed_subtitles = embed_subtitles
+        self.container = container
+        # Hard subtitles instead of subtitle tracks; options go to VideoProcessor.burn_subtitles
+        self.burn_in = burn_in
+        self.burn_options = burn_options or {}
+        self.stage_workers = {**PIPELINE_STAGE_WORKERS, **(stage_workers or {})}
+        self.audio_mode = audio_mode
+        self.vad = VoiceActivityDetector() if vad else None
+
+        # Multi-process transcription of long files (None keeps it in this process)
+        self.parallel_transcriber = None
+        if parallel_workers is not None and audio_mode == "stream":
+            Logger().warning("Parallel transcription is not used with streaming audio")
+        elif parallel_workers is not None:
+            self.parallel_transcriber = ParallelTranscriber(whisper_model, workers=parallel_workers, vad=vad,
+                                                            word_timestamps=word_timestamps)
+
+        self.transcription_cache = TranscriptionCache() if transcription_cache else None
+        self.checkpoints = checkpoints
+
+        # A single model instance is shared by all jobs, so calls are serialized
+        # even when a model stage has more than one worker
+        self._transcriber_lock = threading.Lock()
+        self._translator_lock = threading.Lock()
+
+        self.logger = Logger()
+        self.metrics = Metrics()
+
+        removed = Workspace.remove_stale()
+        if removed:
+            self.logger.info(f"Removed {removed} stale job workspace(s)")
+
+    @contextmanager
+    def _timed(self, job: Dict, stage: str):
+        """Record the wall time of a stage in seconds, and a metrics span of it"""
+        start = time.perf_counter()
+        try:
+            with self.metrics.span(stage, job=job['name']) as span:
+                yield span
+        finally:
+            job['timings'][stage] = round(time.perf_counter() - start, 3)
+
+    def new_job(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                manifest: Optional[JobManifest] = None, decoding: Optional[str] = None,
+                subtitles: Optional[str] = None) -> Dict:
+        """Create the state that is passed from stage to stage"""
+        if progress is None:
+            progress = lambda message, value: None
+
+        return {
+            'video': str(video_path),
+            'name': Path(video_path).stem,
+            'progress': progress,
+            'timings': {},
+            'workspace': None,
+            'manifest': manifest,
+            'decoding': decoding or self.decoding,
+            'subtitles': subtitles
+        }
+
+    @property
+    def job_options(self) -> Dict:
+        """Options of this pipeline that are recorded with each job (see JOB_OPTIONS)"""
+        return {
+            'whisper_model': self.transcriber.model_name,
+            'translation_model': self.translator.model_name,
+            'quantize': self.translator.quantize,
+            'merge_sentences': self.sentence_merger is not None,
+            'word_timestamps': self.word_timestamps,
+            'resegment': self.cue_segmenter is not None,
+            'import_subtitles': self.import_subtitles,
+            'subtitle_format': self.subtitle_gen.subtitle_format,
+            'bilingual': self.bilingual,
+            'embed_subtitles': self.embed_subtitles,
+            'container': self.container,
+            'burn_in': self.burn_in,
+            'burn_options': self.burn_options,
+            'audio_mode': self.audio_mode,
+            'vad': self.vad is not None
+        }
+
+    @classmethod
+    def options_from_manifest(cls, manifest: JobManifest) -> Dict:
+        """Constructor arguments that reproduce the options a job was started with"""
+        options = manifest.data['options']
+        return {argument: options[name] for name, argument in cls.JOB_OPTIONS.items() if name in options}
+
+    def _create_manifest(self, video_path: str, decoding: Optional[str] = None,
+                         subtitles: Optional[str] = None) -> Optional[JobManifest]:
+        """Start a checkpointed job directory, if checkpoints are enabled"""
+        if not self.checkpoints:
+            return None
+
+        return JobManifest.create(video_path, {
+            **self.job_options,
+            'decoding': decoding or self.decoding,
+            'subtitles': str(Path(subtitles).resolve()) if subtitles else None
+        })
+
+    def load_job(self, manifest: JobManifest, progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Rebuild the state of a checkpointed job from its completed stages
+
+        Raises:
+            JobOptionsError: the job was started with other options than this pipeline's
+        """
+        options = manifest.data['options']
+        current = self.job_options
+        changed = [
+            f"{name}={options[name]!r} (now {current[name]!r})"
+            for name in self.JOB_OPTIONS if name in options and options[name] != current[name]
+        ]
+        if changed:
+            raise JobOptionsError(f"Job {manifest.id} was started with other options: {', '.join(changed)}")
+
+        job = self.new_job(manifest.video, progress, manifest=manifest,
+                           decoding=options.get('decoding'), subtitles=options.get('subtitles'))
+
+        for stage in self.CHECKPOINT_ARTIFACTS:
+            if manifest.is_completed(stage):
+                job.update(manifest.artifacts(stage))
+
+        return job
+
+    def _checkpointed(self, stage: str, func: Callable[[Dict], Dict]) -> Callable[[Dict], Dict]:
+        """Wrap a stage so its outputs are recorded in the job manifest"""
+        def run(job: Dict) -> Dict:
+            manifest = job.get('manifest')
+            if manifest is None:
+                return func(job)
+
+            try:
+                job = func(job)
+            except Exception as e:
+                manifest.fail(stage, e)
+                raise
+
+            manifest.complete(stage, {
+                name: job[name] for name in self.CHECKPOINT_ARTIFACTS[stage] if job.get(name) is not None
+            })
+            if stage == 'mux':
+                manifest.finish()
+
+            return job
+
+        return run
+
+    def _find_subtitles(self, job: Dict) -> Optional[Dict]:
+        """Subtitles given for the job, or found next to / inside the video when importing is enabled"""
+        if job.get('subtitles'):
+            return {'path': job['subtitles'], 'stream': None}
+
+        if not self.import_subtitles:
+            return None
+
+        try:
+            return self.subtitle_reader.find(job['video'])
+        except SubtitleReadError as e:
+            self.logger.warning(f"{job['name']}: {e}")
+            return None
+
+    def _transcription_key(self, video_path: str) -> str:
+        """Cache key of a video under the current transcription settings"""
+        options = {
+            'vad': self.vad is not None,
+            'streaming': self.audio_mode == "stream",
+            'parallel': self.parallel_transcriber is not None,
+            'word_timestamps': self.word_timestamps
+        }
+        return TranscriptionCache.make_key(
+            FileHandler.fingerprint(video_path), self.transcriber.model_name, WHISPER_LANGUAGE, options
+        )
+
+    def stage_extract(self, job: Dict) -> Dict:
+        """1. Sound extraction (0-20%)"""
+        job['started'] = time.perf_counter()
+        job['progress']("Extracting audio ...", 0.0)
+
+        # Resumed after transcription
+        if 'segments_en' in job:
+            return job
+
+        # Existing subtitles make extraction and speech recognition unnecessary
+        source = self._find_subtitles(job)
+        if source is not None:
+            with self._timed(job, 'import_subtitles'):
+                segments = self.subtitle_reader.load(source)
+
+            if segments:
+                job['segments_en'] = segments
+                job['progress']("Subtitles imported", 0.2)
+                return job
+            self.logger.warning(f"{job['name']}: no cues in {source['path']}, transcribing instead")
+
+        # A cached transcription makes extraction and speech recognition unnecessary
+        if self.transcription_cache is not None:
+            with self._timed(job, 'cache_lookup'):
+                job['cache_key'] = self._transcription_key(job['video'])
+                segments = self.transcription_cache.get(job['cache_key'])
+
+            if segments is not None:
+                job['segments_en'] = self._to_cues(segments)
+                job['progress']("Transcription loaded from cache", 0.2)
+                return job
+
+        with self._timed(job, 'extract') as span:
+            try:
+                job['duration'] = self.audio_extractor.get_video_duration(job['video'])
+            except VideoProbeError:
+                # Streaming needs the length; the other modes decode whatever is there
+                if self.audio_mode == "stream":
+                    raise
+                job['duration'] = None
+
+            self._check_space(job)
+            work_dir = self._workspace(job).directory
+
+            if self.audio_mode == "stream":
+                # Decoded window by window while transcribing
+                job['audio_seconds'] = job['duration']
+            else:
+                if self.audio_mode == "pipe":
+                    job['audio'] = self.audio_extractor.extract_array(job['video'], work_dir, job['duration'])
+                else:
+                    job['audio'] = self.audio_extractor.extract(job['video'], work_dir)
+                job['audio_seconds'] = self.audio_extractor.audio_seconds(job['audio'])
+            span['audio_seconds'] = job['audio_seconds']
+        job['progress']("Audio extracted", 0.2)
+        return job
+
+    def _transcribe_streaming(self, job: Dict) -> Dict:
+        """Transcribe window by window, writing English cues as they are produced"""
+        srt_en_path = self._subtitle_path(job, "en")
+        duration = job.pop('duration') or 1.0
+        segments = []
+        segments_en = []
+
+        def collect(stream):
+            # Raw segments go to the transcription cache, cues to the SRT
+            for segment in stream:
+                segments.append(segment)
+                yield segment
+
+        with self._transcriber_lock:
+            with self._timed(job, 'load_transcriber'):
+                self.transcriber.load_model()
+            with self._timed(job, 'transcribe'):
+                self.metrics.add('audio_seconds', job['audio_seconds'])
+                windows = self.audio_extractor.iter_windows(job['video'])
+                stream = collect(self.transcriber.transcribe_stream(
+                    windows, vad=self.vad, word_timestamps=self.word_timestamps
+                ))
+                if self.cue_segmenter is not None:
+                    stream = self.cue_segmenter.iter_cues(stream)
+
+                for cue in self.subtitle_gen.stream(stream, str(srt_en_path), language=WHISPER_LANGUAGE):
+                    segments_en.append({'text': cue['text'], 'start': cue['start'], 'end': cue['end']})
+                    job['progress']("Converting speech to text ...", 0.2 + 0.3 * min(cue['end'] / duration, 1.0))
+
+        job['segments_en'] = segments_en
+        job['srt_en'] = str(srt_en_path)
+        self._store_transcription(job, segments)
+        job['progress']("Transcription completed", 0.5)
+        return job
+
+    def stage_transcribe(self, job: Dict) -> Dict:
+        """2. Transcription (20-50%) and English subtitles"""
+        job['progress']("Converting speech to text ...", 0.2)
+        if 'segments_en' in job:
+            return self._write_english(job)
+
+        if self.audio_mode == "stream":
+            return self._transcribe_streaming(job)
+
+        try:
+            with self._transcriber_lock:
+                if self.parallel_transcriber is not None:
+                    # The worker pool already uses every core, one file at a time
+                    with self._timed(job, 'transcribe'):
+                        self.metrics.add('audio_seconds', job['audio_seconds'])
+                        transcription = self.parallel_transcriber.transcribe(job['audio'])
+                        self.metrics.add('segments', len(transcription['segments']))
+                else:
+                    with self._timed(job, 'load_transcriber'):
+                        self.transcriber.load_model()
+                    with self._timed(job, 'transcribe'):
+                        self.metrics.add('audio_seconds', job['audio_seconds'])
+                        transcription = self.transcriber.transcribe(
+                            job['audio'], vad=self.vad, word_timestamps=self.word_timestamps
+                        )
+        finally:
+            self.audio_extractor.cleanup(job.pop('audio'))
+
+        segments = self.transcriber.get_segments(transcription)
+        self._store_transcription(job, segments)
+        job['segments_en'] = self._to_cues(segments)
+        job['progress']("Transcription completed", 0.5)
+
+        return self._write_english(job)
+
+    def _subtitle_path(self, job: Dict, suffix: str) -> Path:
+        """Subtitle file of a job in the selected format, e.g. name_fa.vtt"""
+        directory = self.subtitle_dir or self._workspace(job).directory
+        return directory / f"{job['name']}_{suffix}.{self.subtitle_gen.subtitle_format}"
+
+    def _workspace(self, job: Dict, size: int = 0) -> Workspace:
+        """Private scratch directory of a job, created on first use"""
+        if job['workspace'] is None:
+            job['workspace'] = Workspace.create(job['name'], size, tmpfs=self.tmpfs)
+        return job['workspace']
+
+    def _check_space(self, job: Dict):
+        """
+        Estimate what a job writes from its duration and fail before starting if a disk is too full
+
+        WAV audio takes 2 bytes per sample, a memory-mapped buffer 4; the output
+        video and the chunks of parallel burn-in are about the size of the input.
+        """
+        duration = job.get('duration') or 0.0
+        video_size = Path(job['video']).stat().st_size
+
+        scratch = 0
+        if self.audio_mode == "wav":
+            scratch += int(duration * AUDIO_RATE * 2)
+        elif self.audio_mode == "pipe" and duration > AUDIO_MEMMAP_THRESHOLD:
+            scratch += int(duration * AUDIO_RATE * 4)
+        if self.burn_in and self.burn_options.get('parallel_segments', BURN_PARALLEL_SEGMENTS) > 1:
+            scratch += video_size
+
+        needs = {self._workspace(job, scratch).directory: scratch}
+        if self.burn_in or self.embed_subtitles:
+            OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            needs[OUTPUT_DIR] = needs.get(OUTPUT_DIR, 0) + video_size
+
+        Workspace.check_space(needs)
+
+    def _release(self, job: Dict):
+        """Delete the audio and workspace of a finished or failed job"""
+        self.audio_extractor.cleanup(job.pop('audio', None))
+        if job.get('workspace') is not None:
+            job['workspace'].cleanup()
+            job['workspace'] = None
+
+    def _store_transcription(self, job: Dict, segments: List[Dict]):
+        """Keep the segments so reruns of the same video skip speech recognition"""
+        if self.transcription_cache is not None and 'cache_key' in job:
+            self.transcription_cache.put(job['cache_key'], segments)
+
+    def _to_cues(self, segments: List[Dict]) -> List[Dict]:
+        """Subtitle cues of transcribed segments, re-cut to the subtitle limits if enabled"""
+        if self.cue_segmenter is not None:
+            return self.cue_segmenter.resegment(segments)
+
+        return [{'text': seg['text'], 'start': seg['start'], 'end': seg['end']} for seg in segments]
+
+    def _write_english(self, job: Dict) -> Dict:
+        """3. Save English subtitles"""
+        srt_en_path = self._subtitle_path(job, "en")
+        with self.metrics.span('subtitles', job=job['name'], language=WHISPER_LANGUAGE):
+            self.metrics.add('cues', len(job['segments_en']))
+            job['srt_en'] = self.subtitle_gen.generate(job['segments_en'], str(srt_en_path),
+                                                       language=WHISPER_LANGUAGE)
+        return job
+
+    def _translate_sentences(self, segments: List[Dict], decoding: str) -> List[str]:
+        """Translate whole sentences and split each translation over its original cues"""
+        groups = self.sentence_merger.group(
+            segments,
+            self.translator.count_tokens([segment['text'] for segment in segments])
+        )
+
+        sentences = [self.sentence_merger.merge_text(segments, group) for group in groups]
+        translations = self.translator.translate_batch(sentences, profile=decoding)
+
+        texts = []
+        for group, translation in zip(groups, translations):
+            texts.extend(self.sentence_merger.split(
+                translation,
+                [len(segments[i]['text'].strip()) for i in group]
+            ))
+
+        return texts
+
+    def stage_translate(self, job: Dict) -> Dict:
+        """4. Translation (50-80%) and Persian subtitles"""
+        job['progress']("Translating into Persian ...", 0.5)
+        segments_en = job['segments_en']
+
+        # Resumed jobs may already have the translation
+        if 'segments_fa' not in job:
+            texts_en = [seg['text'] for seg in segments_en]
+
+            with self._translator_lock:
+                with self._timed(job, 'load_translator'):
+                    self.translator.load_model()
+                with self._timed(job, 'translate'):
+                    if self.sentence_merger is None:
+                        texts_fa = self.translator.translate_batch(texts_en, profile=job['decoding'])
+                    else:
+                        texts_fa = self._translate_sentences(segments_en, job['decoding'])
+
+            # Creating Persian segments
+            segments_fa = []
+            for seg_en, text_fa in zip(segments_en, texts_fa):
+                if self.cue_segmenter is not None:
+                    text_fa = self.cue_segmenter.wrap(text_fa)
+
+                segments_fa.append({
+                    'text': text_fa,
+                    'start': seg_en['start'],
+                    'end': seg_en['end']
+                })
+
+            job['segments_fa'] = segments_fa
+
+        segments_fa = job['segments_fa']
+        job['progress']("Translation completed", 0.8)
+
+        # 5. Save Persian subtitles
+        srt_fa_path = self._subtitle_path(job, "fa")
+        with self.metrics.span('subtitles', job=job['name'], language=self.translator.target_language):
+            self.metrics.add('cues', len(segments_fa))
+            job['srt_fa'] = self.subtitle_gen.generate(segments_fa, str(srt_fa_path),
+                                                       language=self.translator.target_language)
+
+        # 6. Bilingual subtitles (optional)
+        if self.bilingual:
+            srt_bilingual_path = self._subtitle_path(job, "bilingual")
+            job['srt_bilingual'] = self.subtitle_gen.create_bilingual(
+                segments_en,
+                segments_fa,
+                str(srt_bilingual_path),
+                language=self.translator.target_language
+            )
+
+        return job
+
+    def stage_mux(self, job: Dict) -> Dict:
+        """7. Add subtitles to the video (80-100%)"""
+        # Resumed jobs may already have the output
+        done = job.get('output_video') and Path(job['output_video']).exists()
+
+        if self.burn_in and not done:
+            job['progress']("Burning subtitles into video ...", 0.8)
+
+            with self._timed(job, 'mux'):
+                stats = self.video_processor.burn_subtitles(
+                    job['video'],
+                    job.get('srt_bilingual') or job['srt_fa'],
+                    f"{job['name']}_hardsub.mp4",
+                    work_dir=self._workspace(job).directory,
+                    **self.burn_options
+                )
+                self.metrics.add('output_bytes', Path(stats['path']).stat().st_size)
+            job['output_video'] = stats['path']
+            job['mux_mb_per_second'] = stats['mb_per_second']
+
+        elif self.embed_subtitles and not done:
+            job['progress']("Adding subtitles to video ...", 0.8)
+
+            # Cues are piped straight into ffmpeg; the SRT files are not read back
+            subtitles = {
+                'eng': job['segments_en'],
+                'per': job['segments_fa']
+            }
+
+            with self._timed(job, 'mux'):
+                stats = self.video_processor.mux(
+                    job['video'],
+                    subtitles,
+                    f"{job['name']}_subtitled.{self.container}",
+                    container=self.container,
+                    subtitle_format=self.subtitle_gen.subtitle_format,
+                    work_dir=self._workspace(job).directory
+                )
+                self.metrics.add('output_bytes', Path(stats['path']).stat().st_size)
+            job['output_video'] = stats['path']
+            job['mux_mb_per_second'] = stats['mb_per_second']
+
+        job['timings']['total'] = round(time.perf_counter() - job['started'], 3)
+        job['progress']("Processing complete! ✓", 1.0)
+        return job
+
+    def warm_up(self, on_done: Optional[Callable[[Optional[Exception]], None]] = None) -> threading.Thread:
+        """
+        Load the selected models on a background thread
+
+        Jobs started meanwhile wait in the model registry for the same model
+        instead of loading it twice. `on_done` receives the error, if any.
+        """
+        def load():
+            error = None
+            try:
+                if self.parallel_transcriber is None:
+                    self.transcriber.load_model()
+                self.translator.load_model()
+            except Exception as e:
+                error = e
+                self.logger.warning(f"Model warm-up failed: {e}")
+
+            if on_done is not None:
+                on_done(error)
+
+        thread = threading.Thread(target=load, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def export_metrics(self, directory: Path = METRICS_DIR) -> Dict[str, str]:
+        """
+        Write the metrics recorded so far and start a new run
+
+        Returns:
+            paths of the JSON-lines report, Prometheus textfile and Chrome trace
+        """
+        paths = self.metrics.export(directory)
+        self.metrics.reset()
+        return paths
+
+    def close(self):
+        """Release resources held outside this process"""
+        if self.parallel_transcriber is not None:
+            self.parallel_transcriber.close()
+
+    @property
+    def stages(self) -> List[Stage]:
+        """Stages in execution order, with their configured concurrency"""
+        return [
+            Stage('extract', self._checkpointed('extract', self.stage_extract), self.stage_workers['extract']),
+            Stage('transcribe', self._checkpointed('transcribe', self.stage_transcribe), self.stage_workers['transcribe']),
+            Stage('translate', self._checkpointed('translate', self.stage_translate), self.stage_workers['translate']),
+            Stage('mux', self._checkpointed('mux', self.stage_mux), self.stage_workers['mux'])
+        ]
+
+    @staticmethod
+    def _result(job: Dict) -> Dict:
+        """Public outputs of a finished job"""
+        return {
+            'video': job['video'],
+            'srt_en': job.get('srt_en'),
+            'srt_fa': job.get('srt_fa'),
+            'srt_bilingual': job.get('srt_bilingual'),
+            'output_video': job.get('output_video'),
+            'mux_mb_per_second': job.get('mux_mb_per_second'),
+            'job_id': job['manifest'].id if job.get('manifest') else None,
+            'timings': job['timings']
+        }
+
+    def process(self, video_path: str, progress: Optional[ProgressCallback] = None,
+                decoding: Optional[str] = None, subtitles: Optional[str] = None) -> Dict:
+        """
+        Run every stage on a single video
+
+        Args:
+            video_path: path to the original video
+            progress: optional callback receiving (message, progress 0..1)
+            decoding: translation decoding profile of this video (default: the pipeline's)
+            subtitles: existing English subtitles (.srt, .vtt, ...) to translate instead of transcribing
+
+        Returns:
+            dictionary with the produced files and per-stage timings
+        """
+        job = self.new_job(video_path, progress, manifest=self._create_manifest(video_path, decoding, subtitles),
+                           decoding=decoding, subtitles=subtitles)
+        try:
+            for stage in self.stages:
+                job = stage.func(job)
+        finally:
+            self._release(job)
+
+        return self._result(job)
+
+    def _run_jobs(self, jobs: List[Optional[Dict]], errors: Dict[int, Dict], queue_size: int) -> List[Dict]:
+        """Push prepared jobs through the stage pipeline; `errors` holds results of jobs that could not start"""
+        # Failed jobs free their audio and workspace right away, not at the end of the batch
+        scheduler = StageScheduler(self.stages, queue_size=queue_size,
+                                   on_error=lambda job, stage, e: self._release(job))
+        records = iter(scheduler.run([job for job in jobs if job is not None]))
+
+        results = []
+        for index, job in enumerate(jobs):
+            if job is None:
+                results.append(errors[index])
+                continue
+
+            record = next(records)
+            job = record['item']
+            name = Path(job['video']).name
+            self._release(job)
+
+            if record['error'] is not None:
+                e = record['error']
+                self.logger.error(f"{name} failed at {record['stage']}: {type(e).__name__}: {e}")
+                results.append({
+                    'video': job['video'],
+                    'job_id': job['manifest'].id if job.get('manifest') else None,
+                    'error': f"{type(e).__name__}: {e}",
+                    'stage': record['stage'],
+                    'timings': job['timings']
+                })
+                continue
+
+            result = self._result(job)
+            result['queue_wait'] = record['queue_wait']
+            for stage, seconds in record['queue_wait'].items():
+                self.metrics.add('queue_wait_seconds', seconds, stage=stage)
+            self.logger.info(f"{name} done in {result['timings']['total']}s {result['timings']}")
+            results.append(result)
+
+        failed = sum(1 for r in results if 'error' in r)
+        self.logger.info(f"Batch finished: {len(results) - failed} succeeded, {failed} failed")
+
+        return results
+
+    def run(self, video_paths: List[str], queue_size: int = PIPELINE_QUEUE_SIZE) -> List[Dict]:
+        """
+        Process many videos with a shared set of models, in input order
+
+        Stages overlap across videos: while one video is translated, the next one
+        is transcribed and the audio of the one after is extracted.
+        """
+        self.logger.info(f"Batch started: {len(video_paths)} video(s), stage workers {self.stage_workers}")
+
+        jobs = []
+        errors = {}
+        for index, video_path in enumerate(video_paths):
+            try:
+                Validators.validate_video_file(video_path)
+                jobs.append(self.new_job(video_path, manifest=self._create_manifest(video_path)))
+            except (FileNotFoundError, ValueError, PermissionError) as e:
+                self.logger.error(f"{Path(video_path).name} skipped: {e}")
+                jobs.append(None)
+                errors[index] = {'video': str(video_path), 'error': f"{type(e).__name__}: {e}"}
+
+        return self._run_jobs(jobs, errors, queue_size)
+
+    def resume(self, job_refs: List[str], queue_size: int = PIPELINE_QUEUE_SIZE) -> List[Dict]:
+        """
+        Continue checkpointed jobs from their last completed stage
+
+        Args:
+            job_refs: job ids or job directories
+        """
+        self.logger.info(f"Resuming {len(job_refs)} job(s)")
+
+        jobs = []
+        errors = {}
+        for index, job_ref in enumerate(job_refs):
+            try:
+                jobs.append(self.load_job(JobManifest.load(job_ref)))
+            except (JobNotFoundError, JobOptionsError, OSError, ValueError) as e:
+                self.logger.error(f"Job {job_ref} cannot be resumed: {e}")
+                jobs.append(None)
+                errors[index] = {'video': str(job_ref), 'job_id': str(job_ref), 'error': f"{type(e).__name__}: {e}"}
+
+        return self._run_jobs(jobs, errors, queue_size)
+
+    @staticmethod
+    def read_manifest(manifest_path: str) -> List[str]:
+        """Read video paths from a manifest (.json list or one path per line)"""
+        path = Path(manifest_path)
+
+        try:
+            if path.suffix.lower() == ".json":
+                entries = json.loads(path.read_text(encoding="utf-8"))
+                if not isinstance(entries, list):
+                    raise ManifestError(f"Manifest must contain a list of paths: {manifest_path}")
+            else:
+                entries = [
+                    line.strip()
+                    for line in path.read_text(encoding="utf-8").splitlines()
+                    if line.strip() and not line.strip().startswith("#")
+                ]
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"Error reading manifest {manifest_path}: {e}")
+
+        # Relative entries are resolved against the manifest location
+        return [str((path.parent / str(entry)).resolve()) for entry in entries]
+
+    @staticmethod
+    def collect_videos(inputs: List[str], recursive: bool = False) -> List[str]:
+        """Expand files, directories and manifests into a list of video paths"""
+        videos = []
+
+        for item in inputs:
+            path = Path(item)
+
+            if path.is_dir():
+                pattern = "**/*" if recursive else "*"
+                videos.extend(
+                    str(p) for p in sorted(path.glob(pattern))
+                    if p.is_file() and p.suffix.lower() in Validators.SUPPORTED_VIDEO_FORMATS
+                )
+            elif path.suffix.lower() in (".txt", ".json"):
+                videos.extend(Pipeline.read_manifest(item))
+            else:
+                videos.append(str(path))
+
+        # Drop duplicates while keeping the order
+        return list(dict.fromkeys(videos))
+
+
+def decoding_profile(value: str) -> str:
+    """argparse type that rejects unknown decoding profiles"""
+    try:
+        Translator.resolve_profile(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def print_report(results: List[Dict], summary: Optional[Dict] = None):
+    """Print per-file stage timings and, if given, the run metrics summary"""
+    stages = ['extract', 'load_transcriber', 'transcribe', 'load_translator', 'translate', 'mux', 'total']
+
+    print(f"{'video':<40}" + "".join(f"{stage:>18}" for stage in stages))
+    for result in results:
+        name = Path(result['video']).name[:39]
+        if 'error' in result:
+            job = f" (job {result['job_id']})" if result.get('job_id') else ""
+            print(f"{name:<40}  ERROR{job}: {result['error']}")
+            continue
+
+        timings = result['timings']
+        throughput = result.get('mux_mb_per_second')
+        print(f"{name:<40}" + "".join(f"{timings.get(stage, '-'):>18}" for stage in stages)
+              + (f"{throughput:>12} MB/s" if throughput else ""))
+
+    if summary is not None:
+        print(f"RTF {summary['rtf'] or '-'}, {summary['tokens_per_second'] or '-'} tokens/s, "
+              f"peak RSS {summary['peak_rss_mb'] or '-'} MB")
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        prog="python -m core.pipeline",
+        description="Generate subtitles for many videos without the GUI"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by run and resume
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--jobs", type=int, help="concurrent ffmpeg jobs (extract and mux stages)")
+    common.add_argument("--workers", action="append", default=[], metavar="STAGE=N",
+                        help="workers of one stage (extract, transcribe, translate, mux)")
+    common.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="videos waiting between two stages")
+    common.add_argument("--audio-mode", choices=["pipe", "wav", "stream"], default=AUDIO_MODE,
+                        help="decode audio into memory, through a temporary WAV file, "
+                             "or window by window with incremental English SRT output")
+    common.add_argument("--vad", action="store_true", default=VAD_ENABLED,
+                        help="skip silence and music before speech recognition")
+    common.add_argument("--parallel-transcribe", type=int, metavar="WORKERS", nargs="?", const=0,
+                        help="transcribe each file in worker processes split at silences "
+                             "(0 or no value: one worker per PARALLEL_TRANSCRIBE_THREADS cores)")
+    common.add_argument("--word-timestamps", action="store_true", default=WORD_TIMESTAMPS,
+                        help="cut subtitles at exact word times (slower transcription)")
+    common.add_argument("--no-resegment", action="store_true",
+                        help="keep Whisper segments as they are instead of re-cutting them into cues")
+    common.add_argument("--import-subtitles", action="store_true", default=SUBTITLE_IMPORT,
+                        help="translate existing English subtitles (video.en.srt, video.srt or embedded) "
+                             "instead of transcribing")
+    common.add_argument("--no-cache", action="store_true",
+                        help="always transcribe, ignoring cached transcriptions")
+    common.add_argument("--whisper-model", default=WHISPER_MODEL)
+    common.add_argument("--translation-model", default=TRANSLATION_MODEL)
+    common.add_argument("--decoding", type=decoding_profile, default=TRANSLATION_PROFILE,
+                        help=f"translation decoding profile: {', '.join(TRANSLATION_PROFILES)}, greedy or beam-N")
+    common.add_argument("--no-merge", action="store_true",
+                        help="translate every subtitle line on its own instead of whole sentences")
+    common.add_argument("--quantize", action="store_true", default=TRANSLATION_QUANTIZE,
+                        help="int8 translation model on CPU (less memory, faster, slightly different output)")
+    common.add_argument("--subtitle-format", choices=sorted(WRITERS), default=SUBTITLE_FORMAT)
+    common.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help="where SRT files are written")
+    common.add_argument("--tmpfs", action="store_true", default=WORKSPACE_TMPFS,
+                        help="keep job intermediates in RAM (/dev/shm) when they fit")
+    common.add_argument("--bilingual", action="store_true", help="also write bilingual subtitles")
+    common.add_argument("--container", choices=["mkv", "mp4"], default=MUX_CONTAINER,
+                        help="output video container; mp4 uses mov_text subtitles and +faststart")
+    common.add_argument("--burn-in", action="store_true",
+                        help="render the Persian (or bilingual) subtitles into the picture instead of adding tracks")
+    common.add_argument("--burn-codec", choices=["libx264", "libx265"], default=BURN_CODEC)
+    common.add_argument("--burn-preset", default=BURN_PRESET, help="x264/x265 preset, e.g. ultrafast, veryfast, medium")
+    common.add_argument("--burn-crf", type=int, default=BURN_CRF)
+    common.add_argument("--burn-threads", type=int, default=BURN_THREADS, help="encoder threads, 0 = all cores")
+    common.add_argument("--burn-segments", type=int, default=BURN_PARALLEL_SEGMENTS, metavar="N",
+                        help="encode N keyframe-aligned chunks in parallel")
+    common.add_argument("--no-embed", action="store_true", help="do not add subtitles to the videos")
+    common.add_argument("--report", type=Path, help="write the results as JSON")
+    common.add_argument("--metrics", type=Path, nargs="?", const=METRICS_DIR, metavar="DIR",
+                        help=f"write a JSON-lines run report, Prometheus textfile and Chrome trace "
+                             f"(default directory: {METRICS_DIR})")
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="process videos, directories or manifests")
+    run_parser.add_argument("inputs", nargs="+", help="video files, directories or manifests (.txt/.json)")
+    run_parser.add_argument("--recursive", action="store_true", help="search directories recursively")
+    run_parser.add_argument("--no-checkpoints", action="store_true",
+                            help="do not save stage outputs for resuming")
+
+    resume_parser = subparsers.add_parser("resume", parents=[common],
+                                          help="continue jobs from their last completed stage")
+    resume_parser.add_argument("job_ids", nargs="*", help="job ids or job directories")
+    resume_parser.add_argument("--failed", action="store_true", help="resume every failed job")
+
+    args = parser.parse_args(argv)
+
+    stage_workers = {}
+    if args.jobs:
+        stage_workers.update(extract=args.jobs, mux=args.jobs)
+
+    for value in args.workers:
+        stage, _, count = value.partition("=")
+        if stage not in PIPELINE_STAGE_WORKERS or not count.isdigit():
+            parser.error(f"invalid --workers value: {value}")
+        stage_workers[stage] = int(count)
+
+    if args.parallel_transcribe is not None and args.audio_mode == "stream":
+        parser.error("--parallel-transcribe cannot be used with --audio-mode stream")
+
+    if args.command == "run":
+        try:
+            videos = Pipeline.collect_videos(args.inputs, recursive=args.recursive)
+        except ManifestError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+        if not videos:
+            print("Error: no videos found", file=sys.stderr)
+            return 2
+    else:
+        job_ids = list(args.job_ids)
+        if args.failed:
+            job_ids.extend(manifest.id for manifest in JobManifest.find(status="failed"))
+
+        if not job_ids:
+            print("Error: no jobs to resume", file=sys.stderr)
+            return 2
+
+    options = dict(
+        whisper_model=args.whisper_model,
+        translation_model=args.translation_model,
+        quantize=args.quantize,
+        decoding=args.decoding,
+        merge_sentences=SENTENCE_MERGE_ENABLED and not args.no_merge,
+        subtitle_dir=args.output_dir,
+        bilingual=args.bilingual,
+        embed_subtitles=not args.no_embed,
+        stage_workers=stage_workers,
+        audio_mode=args.audio_mode,
+        vad=args.vad,
+        parallel_workers=args.parallel_transcribe,
+        transcription_cache=TRANSCRIPTION_CACHE_ENABLED and not args.no_cache,
+        word_timestamps=args.word_timestamps,
+        resegment=SUBTITLE_RESEGMENT and not args.no_resegment,
+        subtitle_format=args.subtitle_format,
+        import_subtitles=args.import_subtitles,
+        container=args.container,
+        burn_in=args.burn_in,
+        burn_options={
+            'codec': args.burn_codec,
+            'preset': args.burn_preset,
+            'crf': args.burn_crf,
+            'threads': args.burn_threads,
+            'parallel_segments': args.burn_segments
+        },
+        checkpoints=JOB_CHECKPOINTS and not getattr(args, "no_checkpoints", False),
+        tmpfs=args.tmpfs
+    )
+
+    if args.command == "run":
+        batches = [(options, videos)]
+    else:
+        # Jobs continue with the options they were started with, one pipeline per distinct set
+        groups = {}
+        for job_id in job_ids:
+            try:
+                recorded = Pipeline.options_from_manifest(JobManifest.load(job_id))
+            except JobNotFoundError:
+                recorded = {}
+            key = json.dumps(recorded, sort_keys=True)
+            groups.setdefault(key, ({**options, **recorded}, []))[1].append(job_id)
+        batches = list(groups.values())
+
+    # Every batch records into the shared collector; report and export all of them once
+    metrics = Metrics()
+    results = []
+    for batch_options, inputs in batches:
+        pipeline = Pipeline(**batch_options)
+        try:
+            if args.command == "run":
+                results += pipeline.run(inputs, queue_size=args.queue_size)
+            else:
+                results += pipeline.resume(inputs, queue_size=args.queue_size)
+        finally:
+            pipeline.close()
+
+    print_report(results, metrics.summary() if metrics.enabled else None)
+
+    if args.metrics:
+        for kind, path in metrics.export(args.metrics).items():
+            print(f"Metrics {kind}: {path}")
+
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    return 1 if any('error' in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+_STOP = object()
+
+
+class Stage:
+    """A pipeline stage: a function applied to each item by a pool of worker threads"""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+class StageScheduler:
+    """
+    Push items through a chain of stages connected by bounded queues
+
+    Every stage has its own worker threads, so different items are in different
+    stages at the same time. A full queue blocks the stage in front of it, which
+    keeps at most `queue_size` items waiting between two stages (back-pressure).
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2,
+                 on_error: Optional[Callable[[object, str, Exception], None]] = None):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+
+    def run(self, items: Iterable) -> List[Dict]:
+        """
+        Process all items and wait until they leave the last stage
+
+        Returns:
+            one dictionary per item, in input order, with 'item' (the output of the
+            last stage, or the input of the failed stage), 'error', 'stage' and
+            'queue_wait' (seconds spent waiting in front of each stage)
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = {}
+        results_lock = threading.Lock()
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def finish(index: int, record: Dict):
+            with results_lock:
+                results[index] = record
+
+        def worker(stage_index: int):
+            stage = self.stages[stage_index]
+            in_queue = queues[stage_index]
+            is_last = stage_index == len(self.stages) - 1
+
+            while True:
+                entry = in_queue.get()
+                if entry is _STOP:
+                    break
+
+                index, item, record, queued_at = entry
+                record['queue_wait'][stage.name] = round(time.perf_counter() - queued_at, 3)
+
+                try:
+                    item = stage.func(item)
+                except Exception as e:
+                    record.update(item=item, error=e, stage=stage.name)
+                    if self.on_error is not None:
+                        self.on_error(item, stage.name, e)
+                    finish(index, record)
+                    continue
+
+                if is_last:
+                    record['item'] = item
+                    finish(index, record)
+                else:
+                    # Blocks while the next stage is saturated
+                    queues[stage_index + 1].put((index, item, record, time.perf_counter()))
+
+            # The last worker of a stage closes the next one
+            with remaining_lock:
+                remaining[stage_index] -= 1
+                closing = remaining[stage_index] == 0
+
+            if closing and not is_last:
+                for _ in range(self.stages[stage_index + 1].workers):
+                    queues[stage_index + 1].put(_STOP)
+
+        threads = []
+        for stage_index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=worker,
+                    args=(stage_index,),
+                    name=f"{stage.name}-{n}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        # Feed the first stage from the caller thread
+        count = 0
+        for index, item in enumerate(items):
+            record = {'item': item, 'error': None, 'stage': None, 'queue_wait': {}}
+            queues[0].put((index, item, record, time.perf_counter()))
+            count += 1
+
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+        return [results[index] for index in range(count)]
@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional
+
+from settings import SENTENCE_MERGE_MAX_TOKENS, SENTENCE_MERGE_MAX_GAP
+
+# End of a sentence, optionally followed by closing quotes or brackets
+SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]*$")
+
+
+class SentenceMerger:
+    """
+    Merge subtitle fragments into full sentences for translation
+
+    Whisper often splits one sentence over two or three segments. Translating
+    the whole sentence once is faster (fewer generate calls) and more coherent;
+    the translation is then spread back over the original time spans.
+    """
+
+    def __init__(self, max_tokens: int = SENTENCE_MERGE_MAX_TOKENS, max_gap: float = SENTENCE_MERGE_MAX_GAP):
+        self.max_tokens = max_tokens
+        self.max_gap = max_gap
+
+    @staticmethod
+    def is_sentence_end(text: str) -> bool:
+        return bool(SENTENCE_END.search(text.rstrip()))
+
+    def group(self, segments: List[Dict], lengths: Optional[List[int]] = None) -> List[List[int]]:
+        """
+        Indices of consecutive segments that form one sentence
+
+        A group is closed after a segment ending a sentence, before a pause
+        longer than `max_gap` and before it would exceed `max_tokens`.
+
+        Args:
+            segments: segments with 'text', 'start' and 'end'
+            lengths: token count of every segment (default: number of words)
+        """
+        if lengths is None:
+            lengths = [len(segment['text'].split()) for segment in segments]
+
+        groups = []
+        current = []
+        tokens = 0
+        for i, segment in enumerate(segments):
+            if current:
+                gap = segment['start'] - segments[current[-1]]['end']
+                if gap > self.max_gap or tokens + lengths[i] > self.max_tokens:
+                    groups.append(current)
+                    current, tokens = [], 0
+
+            current.append(i)
+            tokens += lengths[i]
+
+            if self.is_sentence_end(segment['text']):
+                groups.append(current)
+                current, tokens = [], 0
+
+        if current:
+            groups.append(current)
+
+        return groups
+
+    @staticmethod
+    def merge_text(segments: List[Dict], group: List[int]) -> str:
+        return " ".join(segments[i]['text'].strip() for i in group if segments[i]['text'].strip())
+
+    @staticmethod
+    def split(text: str, weights: List[int]) -> List[str]:
+        """
+        Cut a translation into len(weights) parts proportional to the weights
+
+        Cuts are made between words, at the word boundary closest to each
+        proportional position; every part gets at least one word when there
+        are enough words.
+        """
+        parts = len(weights)
+        words = text.split()
+        if parts == 1 or not words:
+            return [" ".join(words)] + [""] * (parts - 1)
+
+        # Character offset after every word (spaces included)
+        ends = []
+        position = 0
+        for word in words:
+            position += len(word) + (1 if ends else 0)
+            ends.append(position)
+
+        # Equal parts when no weight is known
+        if not sum(weights):
+            weights = [1] * parts
+        total_weight = sum(weights)
+
+        pieces = []
+        start = 0
+        cumulative = 0
+        for k in range(parts - 1):
+            cumulative += weights[k]
+            target = ends[-1] * cumulative / total_weight
+
+            # Leave at least one word for each remaining part while words last
+            last = min(len(words), max(start + 1, len(words) - (parts - 1 - k)))
+            cut = min(start + 1, len(words))
+            while cut < last and abs(ends[cut] - target) <= abs(ends[cut - 1] - target):
+                cut += 1
+
+            pieces.append(" ".join(words[start:cut]))
+            start = cut
+
+        pieces.append(" ".join(words[start:]))
+        return pieces
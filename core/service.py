@@ -0,0 +1,553 @@
+"""
+Local HTTP job service
+
+Other tools submit videos over HTTP; worker processes that keep their models
+loaded run them through the pipeline one after another. The queue is stored
+in SQLite, so queued and interrupted jobs continue after a restart.
+
+    POST   /jobs                {"video": path, "decoding": ..., "subtitles": ...}
+    GET    /jobs[?status=...]   recent jobs
+    GET    /jobs/<id>           status and progress
+    GET    /jobs/<id>/result    output files and timings of a finished job
+    GET    /jobs/<id>/events    progress as server-sent events until the job ends
+    POST   /jobs/<id>/cancel    (or DELETE /jobs/<id>)
+    GET    /health              workers, model preload errors and queue size
+
+Usage:
+    python -m core.service [--workers 2] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from settings import (
+    OUTPUT_DIR, WHISPER_MODEL, TRANSLATION_MODEL, TRANSLATION_PROFILES, TRANSLATION_PROFILE, TRANSLATION_QUANTIZE,
+    SUBTITLE_FORMAT, MUX_CONTAINER, SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_THREADS_PER_WORKER,
+    SERVICE_QUEUE_PATH, SERVICE_MAX_BODY_KB
+)
+from core.job_queue import JobQueue
+from core.pipeline import decoding_profile
+from core.subtitle_writers import WRITERS
+from exceptions.pipeline_exc import JobCancelledError
+from utils.logger import Logger
+from utils.validators import Validators
+
+# Longest job id the server can pass to a worker to cancel
+_CANCEL_ID_SIZE = 64
+
+HTTP_STATUS = {
+    200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"
+}
+
+
+def _worker_main(index: int, tasks, events, cancel_id, pipeline_options: Dict, threads: int, log_queue=None):
+    """
+    Worker process: load the models once, then run jobs from its own `tasks` queue until None arrives
+
+    Every job reports 'started', 'progress' and finally 'done', 'failed' or
+    'cancelled' on `events`. A job is cancelled when the server writes its id
+    into `cancel_id`; the pipeline stops at its next progress update. Log
+    records go to the server's `log_queue`.
+    """
+    Logger.connect(log_queue)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from core.pipeline import Pipeline
+
+    pipeline = Pipeline(**pipeline_options)
+    try:
+        pipeline.transcriber.load_model()
+        pipeline.translator.load_model()
+        events.put((index, None, "ready", None))
+    except Exception as e:
+        # Models are loaded again by the first job; report why warm-up failed
+        events.put((index, None, "ready", f"{type(e).__name__}: {e}"))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        job_id = task['id']
+
+        def progress(message: str, value: float):
+            if cancel_id.value.decode() == job_id:
+                raise JobCancelledError(f"Job {job_id} was cancelled")
+            events.put((index, job_id, "progress", {'message': message, 'progress': round(value, 4)}))
+
+        events.put((index, job_id, "started", None))
+        try:
+            result = pipeline.process(task['video'], progress=progress,
+                                      decoding=task['options'].get('decoding'),
+                                      subtitles=task['options'].get('subtitles'))
+            events.put((index, job_id, "done", result))
+        except JobCancelledError:
+            events.put((index, job_id, "cancelled", None))
+        except Exception as e:
+            events.put((index, job_id, "failed", f"{type(e).__name__}: {e}"))
+
+    pipeline.close()
+
+
+class _Worker:
+    """Server-side handle of a worker process"""
+
+    def __init__(self, index: int, process, tasks, cancel_id):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.cancel_id = cancel_id
+        self.ready = False
+        # Why the models could not be preloaded, if they could not
+        self.error: Optional[str] = None
+        # Job handed to this worker, and whether the worker reported starting it
+        self.job_id: Optional[str] = None
+        self.started = False
+
+
+class JobService:
+    """
+    Asyncio HTTP server in front of a pool of pipeline worker processes
+
+    Each request is answered on its own connection (Connection: close); the
+    event loop only handles HTTP and bookkeeping, the work happens in the
+    worker processes.
+    """
+
+    def __init__(self,
+                 workers: int = SERVICE_WORKERS,
+                 pipeline_options: Optional[Dict] = None,
+                 host: str = SERVICE_HOST,
+                 port: int = SERVICE_PORT,
+                 queue_path: Path = SERVICE_QUEUE_PATH,
+                 threads_per_worker: int = SERVICE_THREADS_PER_WORKER):
+        self.workers_count = max(1, workers)
+        self.pipeline_options = pipeline_options or {}
+        self.host = host
+        self.port = port
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers_count)
+        self.queue = JobQueue(queue_path)
+
+        self.logger = Logger()
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._workers: List[_Worker] = []
+
+        self._cancelling: Set[str] = set()
+        self._progress: Dict[str, Dict] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Workers
+
+    def _start_worker(self, index: int) -> _Worker:
+        # Each worker has its own task queue, so the server always knows which job a worker holds
+        tasks = self._context.Queue()
+        cancel_id = self._context.Array("c", _CANCEL_ID_SIZE, lock=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, tasks, self._events, cancel_id, self.pipeline_options, self.threads_per_worker,
+                  self.logger.process_queue()),
+            name=f"service-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return _Worker(index, process, tasks, cancel_id)
+
+    def _read_events(self):
+        """Forward worker events to the event loop (runs on its own thread)"""
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            try:
+                self._loop.call_soon_threadsafe(self._on_event, *event)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                break
+
+    def _idle_workers(self) -> List[_Worker]:
+        return [worker for worker in self._workers if worker.ready and worker.job_id is None]
+
+    def _dispatch(self):
+        """Hand queued jobs to free workers"""
+        for worker in self._idle_workers():
+            job = self.queue.take()
+            if job is None:
+                break
+
+            worker.job_id = job['id']
+            worker.started = False
+            worker.cancel_id.value = job['id'].encode() if job['id'] in self._cancelling else b""
+            worker.tasks.put({'id': job['id'], 'video': job['video'], 'options': job['options']})
+            self._publish(job['id'], {'status': "running", 'message': "Starting", 'progress': 0.0})
+
+    def _on_event(self, index: int, job_id: Optional[str], kind: str, payload):
+        worker = self._workers[index]
+
+        if kind == "ready":
+            worker.ready = True
+            worker.error = payload
+            if payload:
+                self.logger.warning(f"Worker {index} could not preload models: {payload}")
+            else:
+                self.logger.info(f"Worker {index} ready")
+
+        elif kind == "started":
+            worker.started = True
+
+        elif kind == "progress":
+            self._progress[job_id] = payload
+            self._publish(job_id, {'status': "running", **payload})
+
+        else:
+            worker.job_id = None
+            worker.started = False
+            self._cancelling.discard(job_id)
+            progress = self._progress.pop(job_id, {})
+
+            if kind == "done":
+                self.queue.finish(job_id, "done", result=payload, message="Done", progress=1.0)
+            elif kind == "cancelled":
+                self.queue.finish(job_id, "cancelled", message="Cancelled", progress=progress.get('progress'))
+            else:
+                self.queue.finish(job_id, "failed", error=payload, message=progress.get('message'),
+                                  progress=progress.get('progress'))
+                self.logger.error(f"Job {job_id} failed: {payload}")
+
+            job = self.queue.get(job_id)
+            self._publish(job_id, self._public(job), final=True)
+
+        self._dispatch()
+
+    async def _watch_workers(self):
+        """
+        Replace worker processes that died
+
+        A job the worker had not started yet is queued again; a job it was
+        running is failed, so a video that crashes workers cannot do it forever.
+        """
+        while True:
+            await asyncio.sleep(2.0)
+            for i, worker in enumerate(self._workers):
+                if worker.process.is_alive():
+                    continue
+
+                exitcode = worker.process.exitcode
+                self.logger.error(f"Worker {i} exited with code {exitcode}; restarting it")
+                self._workers[i] = self._start_worker(i)
+
+                if worker.job_id is not None and worker.started:
+                    self._on_event(i, worker.job_id, "failed", f"Worker exited with code {exitcode}")
+                elif worker.job_id is not None:
+                    self._progress.pop(worker.job_id, None)
+                    self.queue.requeue(worker.job_id, f"Queued again after worker {i} exited")
+                    self._publish(worker.job_id, self._public(self.queue.get(worker.job_id)))
+                    self._dispatch()
+
+    # Jobs
+
+    def _public(self, job: Dict) -> Dict:
+        """Job as returned by the API, with the live progress of running jobs"""
+        public = {name: job[name] for name in ('id', 'status', 'video', 'options', 'created', 'started',
+                                               'finished', 'progress', 'message', 'error')}
+        if job['id'] in self._progress:
+            public.update(self._progress[job['id']])
+        return public
+
+    def _publish(self, job_id: str, event: Dict, final: bool = False):
+        for subscriber in self._subscribers.get(job_id, ()):
+            subscriber.put_nowait((event, final))
+
+    def submit(self, request: Dict) -> Tuple[int, Dict]:
+        video = request.get('video')
+        if not isinstance(video, str) or not video:
+            return 400, {'error': "'video' must be the path of a video file"}
+
+        try:
+            Validators.validate_video_file(video)
+        except (FileNotFoundError, ValueError, PermissionError) as e:
+            return 400, {'error': str(e)}
+
+        decoding = request.get('decoding')
+        if decoding is not None:
+            from core.translator import Translator
+            try:
+                Translator.resolve_profile(decoding)
+            except ValueError as e:
+                return 400, {'error': str(e)}
+
+        subtitles = request.get('subtitles')
+        if subtitles is not None and (not isinstance(subtitles, str) or not subtitles):
+            return 400, {'error': "'subtitles' must be the path of a subtitle file"}
+        if subtitles is not None and not Path(subtitles).is_file():
+            return 400, {'error': f"Subtitle file not found: {subtitles}"}
+
+        job = self.queue.submit(str(Path(video).resolve()), {'decoding': decoding, 'subtitles': subtitles})
+        self._dispatch()
+        return 201, self._public(self.queue.get(job['id']))
+
+    def cancel(self, job_id: str) -> Tuple[int, Dict]:
+        status = self.queue.cancel(job_id)
+        if status is None:
+            return 404, {'error': f"Job not found: {job_id}"}
+
+        if status == "cancelled":
+            job = self.queue.get(job_id)
+            self._publish(job_id, self._public(job), final=True)
+            return 200, self._public(job)
+
+        if status != "running":
+            return 409, {'error': f"Job is already {status}"}
+
+        # The worker stops at the next progress update and reports 'cancelled'
+        self._cancelling.add(job_id)
+        for worker in self._workers:
+            if worker.job_id == job_id:
+                worker.cancel_id.value = job_id.encode()
+        return 202, {**self._public(self.queue.get(job_id)), 'message': "Cancelling"}
+
+    # HTTP
+
+    async def _route(self, method: str, path: str, query: Dict, body: bytes,
+                     writer: asyncio.StreamWriter) -> Optional[Tuple[int, Dict]]:
+        """Response of a request, or None when the handler already streamed it"""
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            return 200, {
+                'workers': len(self._workers),
+                'ready': sum(1 for worker in self._workers if worker.ready and not worker.error),
+                'busy': sum(1 for worker in self._workers if worker.job_id is not None),
+                'errors': {worker.index: worker.error for worker in self._workers if worker.error},
+                'jobs': self.queue.counts()
+            }
+
+        if parts == ["jobs"]:
+            if method == "GET":
+                status = query.get('status', [None])[0]
+                return 200, {'jobs': [self._public(job) for job in self.queue.list(status)]}
+            if method == "POST":
+                try:
+                    request = json.loads(body or b"{}")
+                except ValueError as e:
+                    return 400, {'error': f"Invalid JSON: {e}"}
+                if not isinstance(request, dict):
+                    return 400, {'error': "Request body must be a JSON object"}
+                return self.submit(request)
+            return 405, {'error': f"{method} not allowed"}
+
+        if len(parts) < 2 or parts[0] != "jobs":
+            return 404, {'error': f"Not found: {path}"}
+
+        job = self.queue.get(parts[1])
+        if job is None:
+            return 404, {'error': f"Job not found: {parts[1]}"}
+        action = parts[2] if len(parts) > 2 else None
+
+        if action is None and method == "GET":
+            return 200, self._public(job)
+        if (action is None and method == "DELETE") or (action == "cancel" and method == "POST"):
+            return self.cancel(job['id'])
+        if action == "result" and method == "GET":
+            if job['status'] == "done":
+                return 200, {'id': job['id'], 'status': job['status'], 'result': job['result']}
+            if job['status'] in JobQueue.FINISHED:
+                return 409, {'id': job['id'], 'status': job['status'], 'error': job['error'] or job['message']}
+            return 202, self._public(job)
+        if action == "events" and method == "GET":
+            await self._stream_events(job, writer)
+            return None
+
+        if action in ("result", "events", "cancel"):
+            return 405, {'error': f"{method} not allowed"}
+        return 404, {'error': f"Not found: {path}"}
+
+    async def _stream_events(self, job: Dict, writer: asyncio.StreamWriter):
+        """Send the current state and then every update as server-sent events until the job ends"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+
+        def send(event: Dict):
+            writer.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        send(self._public(job))
+        if job['status'] in JobQueue.FINISHED:
+            await writer.drain()
+            return
+
+        subscriber = asyncio.Queue()
+        self._subscribers.setdefault(job['id'], set()).add(subscriber)
+        try:
+            while True:
+                await writer.drain()
+                event, final = await subscriber.get()
+                send(event)
+                if final:
+                    await writer.drain()
+                    break
+        finally:
+            self._subscribers[job['id']].discard(subscriber)
+            if not self._subscribers[job['id']]:
+                del self._subscribers[job['id']]
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: int, data: Dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length < 0:
+                    raise ValueError(f"negative Content-Length: {length}")
+            except ValueError:
+                self._respond(writer, 400, {'error': "Malformed request"})
+                return
+
+            if length > SERVICE_MAX_BODY_KB * 1024:
+                self._respond(writer, 413, {'error': "Request body too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            try:
+                response = await self._route(method.upper(), url.path, parse_qs(url.query), body, writer)
+            except Exception as e:
+                self.logger.error(f"{method} {url.path} failed: {type(e).__name__}: {e}")
+                response = 500, {'error': f"{type(e).__name__}: {e}"}
+
+            if response is not None:
+                self._respond(writer, *response)
+            await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Start the workers and answer requests until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._workers = [self._start_worker(i) for i in range(self.workers_count)]
+        reader = threading.Thread(target=self._read_events, name="service-events", daemon=True)
+        reader.start()
+
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.logger.info(f"Job service listening on http://{self.host}:{self.port} "
+                         f"with {self.workers_count} worker(s)")
+
+        watcher = asyncio.create_task(self._watch_workers())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop the workers; running jobs are queued again on the next start"""
+        for worker in self._workers:
+            worker.tasks.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        self._events.put(None)
+        self.queue.close()
+        self.logger.info("Job service stopped")
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        prog="python -m core.service",
+        description="Serve subtitle jobs over HTTP with warm models"
+    )
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS,
+                        help="worker processes, each with its own loaded models")
+    parser.add_argument("--threads", type=int, default=SERVICE_THREADS_PER_WORKER,
+                        help="torch threads per worker, 0 = cores / workers")
+    parser.add_argument("--whisper-model", default=WHISPER_MODEL)
+    parser.add_argument("--translation-model", default=TRANSLATION_MODEL)
+    parser.add_argument("--decoding", type=decoding_profile, default=TRANSLATION_PROFILE,
+                        help=f"default decoding profile: {', '.join(TRANSLATION_PROFILES)}, greedy or beam-N; "
+                             f"jobs may choose another one")
+    parser.add_argument("--quantize", action="store_true", default=TRANSLATION_QUANTIZE)
+    parser.add_argument("--subtitle-format", choices=sorted(WRITERS), default=SUBTITLE_FORMAT)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help="where subtitle files are written")
+    parser.add_argument("--bilingual", action="store_true", help="also write bilingual subtitles")
+    parser.add_argument("--container", choices=["mkv", "mp4"], default=MUX_CONTAINER)
+    parser.add_argument("--no-embed", action="store_true", help="do not add subtitles to the videos")
+    args = parser.parse_args(argv)
+
+    service = JobService(
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        threads_per_worker=args.threads,
+        pipeline_options={
+            'whisper_model': args.whisper_model,
+            'translation_model': args.translation_model,
+            'decoding': args.decoding,
+            'quantize': args.quantize,
+            'subtitle_format': args.subtitle_format,
+            'subtitle_dir': args.output_dir,
+            'bilingual': args.bilingual,
+            'container': args.container,
+            'embed_subtitles': not args.no_embed
+        }
+    )
+
+    async def run():
+        task = asyncio.current_task()
+        if os.name == "posix":
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                asyncio.get_running_loop().add_signal_handler(sig, task.cancel)
+        await service.serve()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,76 +1,71 @@
-from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
 
-from settings import SRT_ENCODING
+from settings import SUBTITLE_FORMAT
+from core.subtitle_writers import SrtWriter, get_writer, is_rtl
 
 
 class SubtitleGenerator:
-    """Generating SRT files"""
+    """Generating subtitle files (SRT, WebVTT, ASS)"""
+
+    def __init__(self, subtitle_format: str = SUBTITLE_FORMAT):
+        self.subtitle_format = subtitle_format
 
     @staticmethod
     def format_timestamp(seconds: float) -> str:
         """Convert seconds to SRT format: 00:00:00,000"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-    def generate_srt(self, segments: List[Dict], output_path: str) -> str:
-        """Generate SRT file"""
-        rtl, end = "\u202B", "\u202C"
-
-        srt_content = []
-
-        for i, segment in enumerate(segments, start=1):
-            # Subtitle number
-            srt_content.append(str(i))
-
-            # Scheduling
-            start_time = self.format_timestamp(segment['start'])
-            end_time = self.format_timestamp(segment['end'])
-            srt_content.append(f"{start_time} --> {end_time}")
-
-            # Text
-            srt_content.append(f"{rtl}{segment['text']}{end}")
+        return SrtWriter.timestamp(seconds)
 
-            # Blank line between subtitles
-            srt_content.append("")
+    def generate(self, segments: Iterable[Dict], output_path: str, language: Optional[str] = None) -> str:
+        """
+        Write a subtitle file in the format of its extension
 
-        # Writing a file
-        output_path = Path(output_path)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        Args:
+            segments: cues with 'text', 'start' and 'end'
+            output_path: .srt, .vtt or .ass file
+            language: text language; right-to-left languages get direction marks
+        """
+        with get_writer(output_path, language) as writer:
+            for segment in segments:
+                writer.write(segment['start'], segment['end'], segment['text'])
 
-        with open(output_path, 'w', encoding=SRT_ENCODING) as f:
-            f.write('\n'.join(srt_content))
+        return str(writer.path)
 
-        return str(output_path)
+    def generate_srt(self, segments: List[Dict], output_path: str, language: Optional[str] = "fa") -> str:
+        """Generate SRT file"""
+        return self.generate(segments, output_path, language)
+
+    def stream(self, segments: Iterable[Dict], output_path: str, language: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Append each segment to a subtitle file as soon as it arrives
+
+        Every cue is flushed before the segment is yielded back, so the file can
+        be followed while a long video is still being transcribed.
+        """
+        with get_writer(output_path, language, flush=True) as writer:
+            for segment in segments:
+                writer.write(segment['start'], segment['end'], segment['text'])
+                yield segment
+
+    def stream_srt(self, segments: Iterable[Dict], output_path: str,
+                   language: Optional[str] = "fa") -> Iterator[Dict]:
+        return self.stream(segments, output_path, language)
+
+    def create_bilingual(self, segments_en: List[Dict],
+                         segments_fa: List[Dict],
+                         output_path: str,
+                         language: str = "fa") -> str:
+        """Generate bilingual subtitle file (English + translation)"""
+        rtl = is_rtl(language)
+
+        with get_writer(output_path) as writer:
+            for seg_en, seg_fa in zip(segments_en, segments_fa):
+                # Display two languages
+                writer.write_blocks(seg_en['start'], seg_en['end'], [(seg_en['text'], False), (seg_fa['text'], rtl)])
+
+        return str(writer.path)
 
     def create_bilingual_srt(self, segments_en: List[Dict],
                              segments_fa: List[Dict],
                              output_path: str) -> str:
         """Generate bilingual SRT file (English + Persian)"""
-        rtl, end = "\u202B", "\u202C"
-
-        srt_content = []
-
-        for i, (seg_en, seg_fa) in enumerate(zip(segments_en, segments_fa), start=1):
-            srt_content.append(str(i))
-
-            start_time = self.format_timestamp(seg_en['start'])
-            end_time = self.format_timestamp(seg_en['end'])
-            srt_content.append(f"{start_time} --> {end_time}")
-
-            # Display two languages
-            srt_content.append(seg_en['text'])
-            srt_content.append(f"{rtl}{seg_fa['text']}{end}")
-            srt_content.append("")
-
-        output_path = Path(output_path)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(output_path, 'w', encoding=SRT_ENCODING) as f:
-            f.write('\n'.join(srt_content))
-
-        return str(output_path)
+        return self.create_bilingual(segments_en, segments_fa, output_path)
@@ -0,0 +1,161 @@
+import html
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ffmpeg
+
+from settings import SRT_ENCODING, SUBTITLE_IMPORT_LANGUAGES
+from exceptions.subtitle_reader_exc import *
+
+# One cue: timing line and the text up to the next blank line (SRT and WebVTT)
+CUE = re.compile(
+    r"^[ \t]*((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})[ \t]*-->[ \t]*((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})[^\n]*\n"
+    r"(.*?)(?=\n[ \t]*\n|\Z)",
+    re.M | re.S
+)
+# HTML-like tags (<i>, <c.yellow>, <00:01.000>) and ASS override blocks ({\an8})
+TAGS = re.compile(r"<[^>\n]*>|\{\\[^}\n]*\}")
+# Direction marks added by subtitle writers
+MARKS = re.compile("[\u200e\u200f\u202a-\u202e]")
+
+# Subtitle codecs that carry text (bitmap subtitles such as PGS cannot be read)
+TEXT_CODECS = {"subrip", "srt", "ass", "ssa", "webvtt", "mov_text", "text"}
+
+# Files next to a video that are tried, in order, for "video.mp4"
+SIDECAR_SUFFIXES = [f".{language}.{ext}" for language in SUBTITLE_IMPORT_LANGUAGES for ext in ("srt", "vtt")] + [
+    ".srt", ".vtt"
+]
+
+
+class SubtitleReader:
+    """Read existing subtitles into segments, the inverse of SubtitleGenerator"""
+
+    @staticmethod
+    def parse_timestamp(value: str) -> float:
+        """Seconds of 00:00:00,000 (SRT), 00:00.000 or 00:00:00.000 (WebVTT)"""
+        clock, _, fraction = value.replace(",", ".").partition(".")
+        seconds = 0
+        for part in clock.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds + int(fraction.ljust(3, "0")[:3]) / 1000
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Plain text of a cue: tags, direction marks and entities removed, one line per line"""
+        text = html.unescape(MARKS.sub("", TAGS.sub("", text)))
+        return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+    def parse(self, content: str) -> List[Dict]:
+        """
+        Segments of an SRT or WebVTT document
+
+        Cue numbers, WEBVTT headers, NOTE/STYLE blocks and cue settings are ignored.
+        """
+        content = content.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")
+
+        segments = []
+        for match in CUE.finditer(content):
+            text = self.clean_text(match.group(3))
+            if not text:
+                continue
+
+            segments.append({
+                'text': text,
+                'start': self.parse_timestamp(match.group(1)),
+                'end': self.parse_timestamp(match.group(2))
+            })
+
+        segments.sort(key=lambda segment: segment['start'])
+        return segments
+
+    def read(self, subtitle_path: str) -> List[Dict]:
+        """Segments of a subtitle file; formats other than SRT/WebVTT are converted by ffmpeg"""
+        path = Path(subtitle_path)
+
+        if path.suffix.lower() not in (".srt", ".vtt"):
+            return self.parse(self._convert(str(path)))
+
+        try:
+            content = path.read_text(encoding=SRT_ENCODING)
+        except UnicodeDecodeError:
+            # Older files are often in a legacy code page
+            content = path.read_text(encoding="cp1252", errors="replace")
+        except OSError as e:
+            raise SubtitleReadError(f"Error reading subtitles {subtitle_path}: {e}")
+
+        return self.parse(content)
+
+    @staticmethod
+    def _convert(source: str, stream: Optional[int] = None) -> str:
+        """Let ffmpeg convert a subtitle file or an embedded stream to SRT text"""
+        try:
+            output_args = {'f': "srt", 'loglevel': "error"}
+            if stream is not None:
+                output_args['map'] = f"0:{stream}"
+
+            out, _ = ffmpeg.run(
+                ffmpeg.input(source).output("pipe:", **output_args),
+                capture_stdout=True,
+                capture_stderr=True
+            )
+            return out.decode("utf-8", errors="replace")
+
+        except ffmpeg.Error as e:
+            error_message = e.stderr.decode() if e.stderr else str(e)
+            raise SubtitleReadError(f"Error converting subtitles of {source}: {error_message}")
+
+    @staticmethod
+    def embedded_streams(video_path: str) -> List[Dict]:
+        """Text subtitle streams of a video as {'index', 'codec', 'language', 'title'}"""
+        try:
+            probe = ffmpeg.probe(video_path)
+        except ffmpeg.Error as e:
+            raise SubtitleReadError(f"Error reading video information: {e}")
+
+        streams = []
+        for stream in probe.get('streams', []):
+            if stream.get('codec_type') != "subtitle" or stream.get('codec_name') not in TEXT_CODECS:
+                continue
+
+            tags = stream.get('tags', {})
+            streams.append({
+                'index': stream['index'],
+                'codec': stream['codec_name'],
+                'language': tags.get('language'),
+                'title': tags.get('title')
+            })
+
+        return streams
+
+    def read_embedded(self, video_path: str, stream: int) -> List[Dict]:
+        """Segments of an embedded subtitle stream (absolute stream index)"""
+        return self.parse(self._convert(video_path, stream))
+
+    def find(self, video_path: str) -> Optional[Dict]:
+        """
+        Existing English subtitles for a video
+
+        A sidecar file (video.en.srt, video.srt, ...) wins over an embedded
+        stream; embedded streams must be tagged with an English language code.
+
+        Returns:
+            {'path': ..., 'stream': index or None} or None
+        """
+        video = Path(video_path)
+        for suffix in SIDECAR_SUFFIXES:
+            candidate = video.with_name(video.stem + suffix)
+            if candidate.is_file():
+                return {'path': str(candidate), 'stream': None}
+
+        for stream in self.embedded_streams(video_path):
+            if stream['language'] in SUBTITLE_IMPORT_LANGUAGES:
+                return {'path': str(video), 'stream': stream['index']}
+
+        return None
+
+    def load(self, source: Dict) -> List[Dict]:
+        """Segments of a source returned by `find`"""
+        if source['stream'] is None:
+            return self.read(source['path'])
+        return self.read_embedded(source['path'], source['stream'])
@@ -0,0 +1,200 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Type
+
+from settings import SRT_ENCODING, RTL_LANGUAGES
+
+# Unicode right-to-left embedding around each line of RTL text
+RTL_START, RTL_END = "\u202B", "\u202C"
+
+# (text, right-to-left) blocks of one cue, e.g. English and Persian in bilingual files
+Block = Tuple[str, bool]
+
+
+def is_rtl(language: Optional[str]) -> bool:
+    """True for languages written right to left"""
+    return bool(language) and language.split("-")[0].lower() in RTL_LANGUAGES
+
+
+def split_ms(seconds: float) -> Tuple[int, int, int, int]:
+    """(hours, minutes, seconds, milliseconds) with integer arithmetic only"""
+    total = max(int(round(seconds * 1000)), 0)
+    hours, total = divmod(total, 3_600_000)
+    minutes, total = divmod(total, 60_000)
+    secs, millis = divmod(total, 1000)
+    return hours, minutes, secs, millis
+
+
+class SubtitleWriter(ABC):
+    """
+    Incremental subtitle writer
+
+    Cues go straight to the file as they are written, so memory does not
+    grow with the number of cues. Use as a context manager:
+
+        with SrtWriter(path, language="fa") as writer:
+            for segment in segments:
+                writer.write(segment['start'], segment['end'], segment['text'])
+    """
+
+    EXTENSION = ""
+
+    def __init__(self, output_path: str, language: Optional[str] = None, flush: bool = False):
+        """
+        Args:
+            output_path: file to create
+            language: language of the text; right-to-left languages get direction marks
+            flush: flush after every cue so the file can be followed while it grows
+        """
+        self.path = Path(output_path)
+        self.rtl = is_rtl(language)
+        self.flush = flush
+        self.count = 0
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> "SubtitleWriter":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding=SRT_ENCODING, newline="\n")
+        self._file.write(self.header())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def header(self) -> str:
+        return ""
+
+    @staticmethod
+    @abstractmethod
+    def timestamp(seconds: float) -> str:
+        """Cue time in the format's notation"""
+
+    def line(self, text: str, rtl: bool) -> str:
+        """One line of text, escaped for the format and embedded when RTL"""
+        return f"{RTL_START}{text}{RTL_END}" if rtl else text
+
+    def lines(self, blocks: List[Block]) -> List[str]:
+        return [self.line(line, rtl) for text, rtl in blocks for line in text.split("\n")]
+
+    @abstractmethod
+    def cue(self, index: int, start: float, end: float, blocks: List[Block]) -> str:
+        """Text of one cue, ready to be written"""
+
+    def write(self, start: float, end: float, text: str, rtl: Optional[bool] = None):
+        """Append a cue in the writer's language direction (or `rtl` if given)"""
+        self.write_blocks(start, end, [(text, self.rtl if rtl is None else rtl)])
+
+    def render(self, segments: Iterable[Dict]) -> Iterator[str]:
+        """Header and cues as text chunks without touching the file, e.g. to feed a pipe"""
+        yield self.header()
+        for index, segment in enumerate(segments, start=1):
+            yield self.cue(index, segment['start'], segment['end'], [(segment['text'], self.rtl)])
+
+    def write_blocks(self, start: float, end: float, blocks: List[Block]):
+        """Append a cue made of several texts with their own direction"""
+        self.count += 1
+        self._file.write(self.cue(self.count, start, end, blocks))
+        if self.flush:
+            self._file.flush()
+
+
+class SrtWriter(SubtitleWriter):
+    """SubRip (.srt)"""
+
+    EXTENSION = "srt"
+
+    @staticmethod
+    def timestamp(seconds: float) -> str:
+        """00:00:00,000"""
+        return "%02d:%02d:%02d,%03d" % split_ms(seconds)
+
+    def cue(self, index: int, start: float, end: float, blocks: List[Block]) -> str:
+        text = "\n".join(self.lines(blocks))
+        return f"{index}\n{self.timestamp(start)} --> {self.timestamp(end)}\n{text}\n\n"
+
+
+class VttWriter(SrtWriter):
+    """WebVTT (.vtt)"""
+
+    EXTENSION = "vtt"
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    @staticmethod
+    def timestamp(seconds: float) -> str:
+        """00:00:00.000"""
+        return "%02d:%02d:%02d.%03d" % split_ms(seconds)
+
+    def line(self, text: str, rtl: bool) -> str:
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        return super().line(text, rtl)
+
+
+class AssWriter(SubtitleWriter):
+    """Advanced SubStation Alpha (.ass) with a single default style"""
+
+    EXTENSION = "ass"
+
+    HEADER = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n"
+        "PlayResX: 1920\n"
+        "PlayResY: 1080\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        "Style: Default,Arial,64,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+        "0,0,0,0,100,100,0,0,1,3,1,2,60,60,50,1\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+
+    def header(self) -> str:
+        return self.HEADER
+
+    @staticmethod
+    def timestamp(seconds: float) -> str:
+        """0:00:00.00 (centiseconds)"""
+        total = max(int(round(seconds * 100)), 0)
+        hours, total = divmod(total, 360_000)
+        minutes, total = divmod(total, 6000)
+        secs, centis = divmod(total, 100)
+        return "%d:%02d:%02d.%02d" % (hours, minutes, secs, centis)
+
+    def line(self, text: str, rtl: bool) -> str:
+        # Braces start override tags in ASS
+        text = text.replace("{", "(").replace("}", ")")
+        return super().line(text, rtl)
+
+    def cue(self, index: int, start: float, end: float, blocks: List[Block]) -> str:
+        text = "\\N".join(self.lines(blocks))
+        return f"Dialogue: 0,{self.timestamp(start)},{self.timestamp(end)},Default,,0,0,0,,{text}\n"
+
+
+WRITERS: Dict[str, Type[SubtitleWriter]] = {
+    writer.EXTENSION: writer for writer in (SrtWriter, VttWriter, AssWriter)
+}
+
+
+def get_writer(output_path: str, language: Optional[str] = None, subtitle_format: Optional[str] = None,
+               flush: bool = False) -> SubtitleWriter:
+    """Writer for a format, chosen from the file extension when not given"""
+    subtitle_format = (subtitle_format or Path(output_path).suffix.lstrip(".") or "srt").lower()
+    if subtitle_format not in WRITERS:
+        raise ValueError(f"Unsupported subtitle format: {subtitle_format} (expected one of {', '.join(WRITERS)})")
+
+    return WRITERS[subtitle_format](output_path, language=language, flush=flush)
@@ -1,9 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 
-import whisper
+import numpy as np
 
-from settings import WHISPER_MODEL, WHISPER_DEVICE, WHISPER_LANGUAGE
+from settings import WHISPER_MODEL, WHISPER_DEVICE, WHISPER_LANGUAGE, WORD_TIMESTAMPS, AUDIO_RATE
+from core.model_registry import ModelRegistry
+from core.vad import VoiceActivityDetector
 from exceptions.transcriber_exc import *
+from utils.metrics import Metrics
 
 
 class Transcriber:
@@ -12,27 +15,72 @@ class Transcriber:
     def __init__(self, model_name: str = WHISPER_MODEL, device: str = WHISPER_DEVICE):
         self.model_name = model_name
         self.device = device
-        self.model = None
+        self.registry = ModelRegistry()
+        self.metrics = Metrics()
+
+    @property
+    def model(self):
+        """Whisper model for the current model name and device, from the shared registry"""
+        return self.registry.get(
+            ("whisper", self.model_name, self.device, "float32"),
+            self._load
+        )
+
+    def _load(self):
+        """Import whisper (and torch) only when a model is actually needed"""
+        import whisper
+        return whisper.load_model(self.model_name, device=self.device)
 
     def load_model(self):
-        """Loading the Whisper model"""
-        if self.model is None:
-            self.model = whisper.load_model(
-                self.model_name,
-                device=self.device
-            )
+        """Loading the Whisper model (again, if model_name or device changed)"""
+        return self.model
+
+    def _run(self, audio: Union[str, np.ndarray], language: str,
+             vad: Optional[VoiceActivityDetector], **options) -> Dict:
+        """Run Whisper, on the speech regions only when a detector is given"""
+        model = self.model
+
+        if vad is not None:
+            if isinstance(audio, str):
+                import whisper
+                audio = whisper.load_audio(audio)
+
+            speech, region_map = vad.compact(audio, vad.detect(audio))
+            if len(speech) == 0:
+                return {'text': "", 'segments': [], 'language': language}
+        else:
+            speech, region_map = audio, None
+
+        with self.metrics.span("whisper.transcribe", model=self.model_name) as span:
+            if not isinstance(speech, str):
+                span['speech_seconds'] = round(len(speech) / AUDIO_RATE, 3)
+            result = model.transcribe(speech, language=language, task="transcribe", **options)
+            self.metrics.add('segments', len(result['segments']))
+
+        if region_map is not None:
+            vad.remap(result['segments'], region_map)
 
-    def transcribe(self, audio_path: str, language: str = WHISPER_LANGUAGE) -> Dict:
-        """Convert voice to text"""
+        return result
+
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = WHISPER_LANGUAGE,
+                   vad: Optional[VoiceActivityDetector] = None,
+                   word_timestamps: bool = WORD_TIMESTAMPS) -> Dict:
+        """
+        Convert voice to text from an audio file or a 16 kHz float32 array
+
+        With a `vad` detector only speech regions are sent to Whisper; the
+        segment timestamps still refer to the original audio. With
+        `word_timestamps` every segment also carries its timed words.
+        """
         try:
             self.load_model()
 
-            result = self.model.transcribe(
-                audio_path,
-                language=language,
-                task="transcribe",
+            result = self._run(
+                audio,
+                language,
+                vad,
                 verbose=False,
-                word_timestamps=False
+                word_timestamps=word_timestamps
             )
 
             return result
@@ -40,15 +88,106 @@ class Transcriber:
         except Exception as e:
             raise TranscriptionError(f"Transcription failed with error: {e}")
 
+    def transcribe_stream(self, windows: Iterable[Tuple[float, np.ndarray]],
+                          language: str = WHISPER_LANGUAGE,
+                          vad: Optional[VoiceActivityDetector] = None,
+                          word_timestamps: bool = WORD_TIMESTAMPS) -> Iterator[Dict]:
+        """
+        Transcribe overlapping audio windows, yielding segments as soon as they are final
+
+        Args:
+            windows: (offset in seconds, samples) pairs, e.g. from `AudioExtractor.iter_windows`
+            language: spoken language
+            vad: optional detector applied to each window
+            word_timestamps: also yield the timed words of every segment
+
+        Yields:
+            segments on the original timeline, in the `get_segments` format
+        """
+        try:
+            self.load_model()
+        except Exception as e:
+            raise TranscriptionError(f"Transcription failed with error: {e}")
+
+        windows = iter(windows)
+        current = next(windows, None)
+        last_end = 0.0
+        prompt = None
+
+        while current is not None:
+            offset, samples = current
+            upcoming = next(windows, None)
+            window_end = offset + len(samples) / AUDIO_RATE
+
+            if len(samples) == 0:
+                current = upcoming
+                continue
+
+            try:
+                result = self._run(
+                    samples,
+                    language,
+                    vad,
+                    verbose=None,
+                    word_timestamps=word_timestamps,
+                    initial_prompt=prompt
+                )
+            except Exception as e:
+                raise TranscriptionError(f"Transcription failed with error: {e}")
+
+            if upcoming is not None:
+                # Segments starting in the second half of the overlap are
+                # transcribed again, with more context, by the next window
+                next_offset = upcoming[0]
+                cutoff = next_offset + (window_end - next_offset) / 2
+            else:
+                cutoff = float("inf")
+
+            for segment in self.get_segments(result):
+                start = offset + segment['start']
+                end = min(offset + segment['end'], window_end)
+
+                # Already emitted by the previous window
+                if (start + end) / 2 <= last_end:
+                    continue
+                if start >= cutoff:
+                    break
+
+                if not segment['text']:
+                    continue
+
+                words = [
+                    {**word, 'start': offset + word['start'], 'end': min(offset + word['end'], window_end)}
+                    for word in segment.get('words', [])
+                ]
+                segment = {'text': segment['text'], 'start': max(start, last_end), 'end': end}
+                if words:
+                    segment['words'] = words
+
+                last_end = end
+                prompt = segment['text']
+                yield segment
+
+            current = upcoming
+
     def get_segments(self, transcription_result: Dict) -> List[Dict]:
         """Extract segments with scheduling"""
         segments = []
 
         for segment in transcription_result['segments']:
-            segments.append({
+            item = {
                 'text': segment['text'].strip(),
                 'start': segment['start'],
                 'end': segment['end']
-            })
+            }
+
+            # Present only when transcribed with word_timestamps
+            if segment.get('words'):
+                item['words'] = [
+                    {'word': word['word'].strip(), 'start': word['start'], 'end': word['end']}
+                    for word in segment['words']
+                ]
+
+            segments.append(item)
 
         return segments
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from settings import TRANSCRIPTION_CACHE_DIR
+
+
+class TranscriptionCache:
+    """Content-addressed store of transcription segments"""
+
+    def __init__(self, directory: Path = TRANSCRIPTION_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(fingerprint: str, model: str, language: str, options: Dict) -> str:
+        """Key of a media fingerprint under a Whisper model, language and transcription options"""
+        payload = json.dumps([fingerprint, model, language, options], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return the stored segments or None"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)['segments']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            # A damaged entry is a miss, it will be written again
+            return None
+
+    def put(self, key: str, segments: List[Dict]):
+        """Store segments atomically so concurrent readers never see a partial file"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({'segments': segments}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from settings import (
+    TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MEMORY_ITEMS, TRANSLATION_CACHE_MAX_MB
+)
+
+
+class TranslationCache:
+    """Translation memory: SQLite on disk with an in-memory LRU in front"""
+
+    def __init__(self,
+                 path: Path = TRANSLATION_CACHE_PATH,
+                 memory_items: int = TRANSLATION_CACHE_MEMORY_ITEMS,
+                 max_mb: float = TRANSLATION_CACHE_MAX_MB):
+        self.path = Path(path)
+        self.memory_items = memory_items
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, source TEXT, translation TEXT, size INTEGER, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._db.commit()
+
+        self._size = self._total_size()
+
+    def _total_size(self) -> int:
+        """Bytes of every stored source and translation"""
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivially different lines share an entry"""
+        return " ".join(text.split())
+
+    @staticmethod
+    def make_key(text: str, model: str, target: str, params: Dict) -> str:
+        """Key of a normalized source text under a model, target language and generation params"""
+        payload = json.dumps([TranslationCache.normalize(text), model, target, params], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, translation: str):
+        """Insert into the in-memory LRU"""
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Return the cached translations of the keys that are known"""
+        found = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+
+                for key, translation in rows:
+                    found[key] = translation
+                    self._remember(key, translation)
+
+            # Hits served from memory count as uses too, or eviction would drop the most used lines first
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE translations SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._db.commit()
+
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a single cached translation or None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: Dict[str, tuple]):
+        """Store {key: (source, translation)} pairs and evict when over the size limit"""
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [
+            (key, source, translation, len(source.encode("utf-8")) + len(translation.encode("utf-8")), now)
+            for key, (source, translation) in entries.items()
+        ]
+
+        with self._lock:
+            for key, _, translation, _, _ in rows:
+                self._remember(key, translation)
+
+            self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+
+            # Other processes (service workers) write to the same file, so the total is read, not tracked
+            self._size = self._total_size()
+            if self._size > self.max_bytes:
+                self._evict()
+
+            self._db.commit()
+
+    def put(self, key: str, source: str, translation: str):
+        """Store a single translation"""
+        self.put_many({key: (source, translation)})
+
+    def _evict(self):
+        """Drop least recently used rows until the cache is at 90% of its limit"""
+        target = int(self.max_bytes * 0.9)
+
+        while self._size > target:
+            rows = self._db.execute(
+                "SELECT key, size FROM translations ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+
+            evicted = []
+            for key, size in rows:
+                evicted.append(key)
+                self._memory.pop(key, None)
+                self._size -= size
+                if self._size <= target:
+                    break
+
+            self._db.executemany("DELETE FROM translations WHERE key = ?", [(key,) for key in evicted])
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM translations")
+            self._db.commit()
+            self._size = 0
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
@@ -1,57 +1,225 @@
-from typing import List
+import math
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
-import torch
-from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
+from core.model_registry import ModelRegistry
+from core.translation_cache import TranslationCache
+from exceptions.translator_exc import UnsupportedModelError, UnsupportedProfileError
+from settings import (
+    TRANSLATION_MODEL, MAX_TRANSLATION_LENGTH, BATCH_SIZE, TRANSLATION_TOKEN_BUDGET, TRANSLATION_CACHE_ENABLED,
+    TRANSLATION_PROFILES, TRANSLATION_PROFILE, TRANSLATION_QUANTIZE, QUANTIZED_MODEL_DIR
+)
+from utils.logger import Logger
+from utils.metrics import Metrics
 
-from exceptions.translator_exc import UnsupportedModelError
-from settings import TRANSLATION_MODEL, MAX_TRANSLATION_LENGTH, BATCH_SIZE
+# torch and transformers take seconds to import, so they are loaded on first use
+if TYPE_CHECKING:
+    from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
 
 
 class Translator:
     """Text translation with HuggingFace Transformers"""
 
-    def __init__(self, model_name: str = TRANSLATION_MODEL):
+    def __init__(self,
+                 model_name: str = TRANSLATION_MODEL,
+                 cache: Optional[TranslationCache] = None,
+                 quantize: bool = TRANSLATION_QUANTIZE,
+                 profile: Union[str, Dict] = TRANSLATION_PROFILE,
+                 device: Optional[str] = None):
         self.model_name = model_name
-        self.model = None
-        self.tokenizer = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-
-    def load_model(self):
-        """Loading translation model"""
-        if self.model is None:
-            if "m2m100_418M" in self.model_name:
-                # M2M100 418M models
-                self.model = M2M100ForConditionalGeneration.from_pretrained("facebook/m2m100_418M")
-                self.tokenizer = M2M100Tokenizer.from_pretrained("facebook/m2m100_418M")
-
-                # Offline Model Setup
-                # self.model = M2M100ForConditionalGeneration.from_pretrained("./models/m2m100", local_files_only=True)
-                # self.tokenizer = M2M100Tokenizer.from_pretrained("./models/m2m100", local_files_only=True)
-
-            elif "m2m100_1.2B" in self.model_name:
-                # M2M100 1.2B models
-                self.model = M2M100ForConditionalGeneration.from_pretrained("facebook/m2m100_1.2B")
-                self.tokenizer = M2M100Tokenizer.from_pretrained("facebook/m2m100_1.2B")
-
-                # Offline Model Setup
-                # self.model = M2M100ForConditionalGeneration.from_pretrained("./models/m2m100", local_files_only=True)
-                # self.tokenizer = M2M100Tokenizer.from_pretrained("./models/m2m100", local_files_only=True)
-
-            else:
-                raise UnsupportedModelError(f"Unsupported model: {self.model_name}")
-
-            self.tokenizer.src_lang = "en"
-            self.model.to(self.device)
-
-    def translate_text(self, text: str) -> str:
-        """Translating a text"""
-        self.load_model()
+        self.quantize = quantize
+        # None picks cuda when available
+        self._device = device
+        self.target_language = "fa"
+        self.registry = ModelRegistry()
+
+        # Default decoding profile; translate_text/translate_batch accept another one per call
+        self.profile = self.resolve_profile(profile)
+
+        if cache is None and TRANSLATION_CACHE_ENABLED:
+            cache = TranslationCache()
+        self.cache = cache
+
+        self.logger = Logger()
+        self.metrics = Metrics()
+
+    @property
+    def device(self) -> str:
+        """cuda when available; torch is imported on first use, not at startup"""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
+    @property
+    def model_id(self) -> str:
+        """HuggingFace id of the selected model"""
+        if "m2m100_418M" in self.model_name:
+            return "facebook/m2m100_418M"
+        if "m2m100_1.2B" in self.model_name:
+            return "facebook/m2m100_1.2B"
+        raise UnsupportedModelError(f"Unsupported model: {self.model_name}")
+
+    @property
+    def quantized(self) -> bool:
+        """int8 inference is used only on CPU; on GPU the float32 model is faster"""
+        return self.quantize and self.device == "cpu"
+
+    @property
+    def dtype(self) -> str:
+        return "qint8" if self.quantized else "float32"
+
+    def _quantized_path(self):
+        """File of the converted weights; torch versions do not share packed weights"""
+        import torch
+        return QUANTIZED_MODEL_DIR / f"{self.model_id.replace('/', '--')}-qint8-torch{torch.__version__}.pt"
+
+    def _load_quantized(self) -> "M2M100ForConditionalGeneration":
+        """
+        Load the model with int8 Linear layers
+
+        The first load converts the float32 weights and saves the result.
+        Later loads build the model from its config without initializing or
+        downloading weights, convert its Linear layers one by one and read
+        the saved int8 weights; the float32 layers are only allocated, never
+        filled with real weights, and freed as each one is replaced.
+        """
+        import torch
+        from transformers import GenerationConfig, M2M100Config, M2M100ForConditionalGeneration
+        from transformers.modeling_utils import no_init_weights
+
+        def quantize(model):
+            model.eval()
+            # In place: a copy would hold every float32 weight twice
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+        path = self._quantized_path()
+        if path.exists():
+            try:
+                # Random initialization would cost as much time as converting the real weights
+                with no_init_weights():
+                    skeleton = M2M100ForConditionalGeneration(M2M100Config.from_pretrained(self.model_id))
+                model = quantize(skeleton)
+                model.load_state_dict(torch.load(path, map_location="cpu"))
+                model.generation_config = GenerationConfig.from_pretrained(self.model_id)
+                return model
+            except Exception as e:
+                self.logger.warning(f"Quantized weights in {path} are unusable, converting again: {e}")
+
+        model = quantize(M2M100ForConditionalGeneration.from_pretrained(self.model_id))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        torch.save(model.state_dict(), temp_path)
+        os.replace(temp_path, path)
+        self.logger.info(f"Saved quantized weights to {path}")
+
+        return model
+
+    def _load(self) -> Tuple["M2M100ForConditionalGeneration", "M2M100Tokenizer"]:
+        """Load model and tokenizer from HuggingFace"""
+        from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
+
+        if self.quantized:
+            model = self._load_quantized()
+        else:
+            model = M2M100ForConditionalGeneration.from_pretrained(self.model_id)
+        tokenizer = M2M100Tokenizer.from_pretrained(self.model_id)
+
+        # Offline Model Setup
+        # model = M2M100ForConditionalGeneration.from_pretrained("./models/m2m100", local_files_only=True)
+        # tokenizer = M2M100Tokenizer.from_pretrained("./models/m2m100", local_files_only=True)
+
+        tokenizer.src_lang = "en"
+        model.to(self.device)
+        return model, tokenizer
+
+    def load_model(self) -> Tuple["M2M100ForConditionalGeneration", "M2M100Tokenizer"]:
+        """Loading translation model (again, if model_name changed)"""
+        return self.registry.get(("m2m100", self.model_id, self.device, self.dtype), self._load)
+
+    @property
+    def model(self) -> "M2M100ForConditionalGeneration":
+        return self.load_model()[0]
+
+    @property
+    def tokenizer(self) -> "M2M100Tokenizer":
+        return self.load_model()[1]
+
+    @staticmethod
+    def resolve_profile(profile: Union[str, Dict, None]) -> Dict:
+        """
+        Decoding parameters of a profile
+
+        Args:
+            profile: a name from TRANSLATION_PROFILES, "greedy", "beam-N" or a dict
+                     with num_beams and optionally length_ratio / length_margin;
+                     length_ratio None keeps the fixed MAX_TRANSLATION_LENGTH budget
+        """
+        if profile is None:
+            profile = TRANSLATION_PROFILE
+
+        if isinstance(profile, dict):
+            params = dict(profile)
+        elif profile in TRANSLATION_PROFILES:
+            params = dict(TRANSLATION_PROFILES[profile])
+        elif profile == "greedy":
+            params = dict(TRANSLATION_PROFILES['draft'], num_beams=1)
+        elif isinstance(profile, str) and profile.startswith("beam-") and profile[5:].isdigit():
+            params = dict(TRANSLATION_PROFILES['quality'], num_beams=int(profile[5:]))
+        else:
+            names = ", ".join([*TRANSLATION_PROFILES, "greedy", "beam-N"])
+            raise UnsupportedProfileError(f"Unsupported decoding profile: {profile} (expected one of {names})")
+
+        params.setdefault('length_ratio', None)
+        params.setdefault('length_margin', 0)
+        if not isinstance(params.get('num_beams'), int) or params['num_beams'] < 1:
+            raise UnsupportedProfileError(f"Decoding profile needs num_beams >= 1: {profile}")
+
+        return params
 
-        if not text.strip():
+    @staticmethod
+    def generation_params(profile: Dict, source_length: int) -> Dict:
+        """Arguments of model.generate for sources of at most `source_length` tokens"""
+        params = {'num_beams': profile['num_beams']}
+        if profile['num_beams'] > 1:
+            params['early_stopping'] = True
+
+        # Short lines get a short budget instead of reserving MAX_TRANSLATION_LENGTH
+        if profile['length_ratio'] is None:
+            params['max_length'] = MAX_TRANSLATION_LENGTH
+        else:
+            budget = math.ceil(source_length * profile['length_ratio'] + profile['length_margin'])
+            params['max_new_tokens'] = max(1, min(budget, MAX_TRANSLATION_LENGTH))
+
+        return params
+
+    def _cache_key(self, text: str, profile: Dict) -> str:
+        """Translation memory key of a source text under the current settings"""
+        # int8 output may differ slightly, so it is cached separately
+        model = f"{self.model_id}@{self.dtype}" if self.quantized else self.model_id
+        return TranslationCache.make_key(text, model, self.target_language, profile)
+
+    def translate_text(self, text: str, profile: Union[str, Dict, None] = None) -> str:
+        """Translating a text"""
+        text = TranslationCache.normalize(text)
+        if not text:
             return ""
 
+        profile = self.profile if profile is None else self.resolve_profile(profile)
+
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(text, profile))
+            if cached is not None:
+                return cached
+
+        import torch
+
+        # Keep the same model for the whole call even if the registry evicts it
+        model, tokenizer = self.load_model()
+
         # Tokenize
-        inputs = self.tokenizer(
+        inputs = tokenizer(
             text,
             return_tensors="pt",
             padding=True,
@@ -60,65 +228,127 @@ class Translator:
         ).to(self.device)
 
         # Translation
-        with torch.no_grad():
-            translated = self.model.generate(
-                **inputs,
-                max_length=MAX_TRANSLATION_LENGTH,
-                num_beams=4,
-                early_stopping=True,
-                forced_bos_token_id=self.tokenizer.get_lang_id("fa")
-            )
+        with self.metrics.span("translate.generate", batch_size=1):
+            with torch.no_grad():
+                translated = model.generate(
+                    **inputs,
+                    **self.generation_params(profile, inputs['input_ids'].shape[1]),
+                    forced_bos_token_id=tokenizer.get_lang_id(self.target_language)
+                )
+            self._count_tokens(inputs['input_ids'], translated, tokenizer.pad_token_id)
 
         # Decode
-        translated_text = self.tokenizer.decode(
+        translated_text = tokenizer.decode(
             translated[0],
             skip_special_tokens=True
-        )
+        ).strip()
+
+        if self.cache is not None:
+            self.cache.put(self._cache_key(text, profile), text, translated_text)
+
+        return translated_text
 
-        return translated_text.strip()
+    def _count_tokens(self, input_ids, output_ids, pad_token_id: int):
+        """Record the real (unpadded) source and generated tokens of a generate call"""
+        self.metrics.add('tokens_in', int((input_ids != pad_token_id).sum()))
+        self.metrics.add('tokens_out', int((output_ids != pad_token_id).sum()))
 
-    def translate_batch(self, texts: List[str]) -> List[str]:
-        """Batch translation of texts"""
-        self.load_model()
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Source token count of every text, without special tokens"""
+        tokenizer = self.load_model()[1]
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
 
-        translations = []
+    @staticmethod
+    def _make_batches(lengths: List[int]) -> List[List[int]]:
+        """
+        Group indices of similar token length into batches
 
-        # Batch processing
-        for i in range(0, len(texts), BATCH_SIZE):
-            batch = texts[i:i + BATCH_SIZE]
+        Indices are sorted by length and a batch is closed as soon as its padded
+        size (longest sequence x number of sequences) would exceed
+        TRANSLATION_TOKEN_BUDGET or it holds BATCH_SIZE sequences.
+        """
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
 
-            # Remove empty text
-            non_empty_batch = [t for t in batch if t.strip()]
+        batches = []
+        current = []
+        for index in order:
+            # Sorted ascending, so the new item is the longest of the batch
+            padded = lengths[index] * (len(current) + 1)
+            if current and (padded > TRANSLATION_TOKEN_BUDGET or len(current) >= BATCH_SIZE):
+                batches.append(current)
+                current = []
+            current.append(index)
 
-            if not non_empty_batch:
-                translations.extend([""] * len(batch))
-                continue
+        if current:
+            batches.append(current)
 
-            # Tokenize
-            inputs = self.tokenizer(
-                non_empty_batch,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=MAX_TRANSLATION_LENGTH
+        return batches
+
+    def translate_batch(self, texts: List[str], profile: Union[str, Dict, None] = None) -> List[str]:
+        """Batch translation of texts, bucketed by token length"""
+        translations = [""] * len(texts)
+        profile = self.profile if profile is None else self.resolve_profile(profile)
+
+        # Identical lines are translated once; empty ones not at all
+        pending = {}
+        for i, text in enumerate(texts):
+            text = TranslationCache.normalize(text)
+            if text:
+                pending.setdefault(text, []).append(i)
+
+        # Translation memory lookup before any tokenization
+        if self.cache is not None and pending:
+            keys = {text: self._cache_key(text, profile) for text in pending}
+            found = self.cache.get_many(keys.values())
+            for text in [t for t in pending if keys[t] in found]:
+                for i in pending.pop(text):
+                    translations[i] = found[keys[text]]
+            self.metrics.add('translation_cache_hits', len(found))
+
+        if not pending:
+            return translations
+
+        import torch
+
+        # Keep the same model for the whole call even if the registry evicts it
+        model, tokenizer = self.load_model()
+        sources = list(pending)
+
+        # Tokenize once without padding to learn the lengths
+        encoded = tokenizer(
+            sources,
+            truncation=True,
+            max_length=MAX_TRANSLATION_LENGTH
+        )['input_ids']
+
+        results = {}
+        for batch in self._make_batches([len(ids) for ids in encoded]):
+            inputs = tokenizer.pad(
+                {'input_ids': [encoded[i] for i in batch]},
+                return_tensors="pt"
             ).to(self.device)
 
             # Translation
-            with torch.no_grad():
-                translated = self.model.generate(
-                    **inputs,
-                    max_length=MAX_TRANSLATION_LENGTH,
-                    num_beams=4,
-                    early_stopping=True,
-                    forced_bos_token_id=self.tokenizer.get_lang_id("fa")
-                )
+            with self.metrics.span("translate.generate", batch_size=len(batch),
+                                   padded_length=inputs['input_ids'].shape[1]):
+                with torch.no_grad():
+                    translated = model.generate(
+                        **inputs,
+                        **self.generation_params(profile, inputs['input_ids'].shape[1]),
+                        forced_bos_token_id=tokenizer.get_lang_id(self.target_language)
+                    )
+                self._count_tokens(inputs['input_ids'], translated, tokenizer.pad_token_id)
 
             # Decode
-            batch_translations = [
-                self.tokenizer.decode(t, skip_special_tokens=True).strip()
-                for t in translated
-            ]
+            for i, t in zip(batch, translated):
+                results[sources[i]] = tokenizer.decode(t, skip_special_tokens=True).strip()
+
+        # Put back in transcript order
+        for text, indices in pending.items():
+            for i in indices:
+                translations[i] = results[text]
 
-            translations.extend(batch_translations)
+        if self.cache is not None:
+            self.cache.put_many({self._cache_key(text, profile): (text, results[text]) for text in results})
 
         return translations
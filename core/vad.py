@@ -0,0 +1,161 @@
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from settings import (
+    AUDIO_RATE, VAD_FRAME_MS, VAD_ENERGY_MARGIN, VAD_MIN_SPEECH, VAD_MIN_SILENCE, VAD_PADDING
+)
+
+# Frames analysed per FFT block, keeps memory bounded on long inputs
+_BLOCK_FRAMES = 4096
+
+# Telephone speech band used for the speech-to-total energy ratio
+_SPEECH_BAND = (300.0, 3400.0)
+
+# Region map entry: (start on the compact timeline, start on the original timeline, duration)
+RegionMap = List[Tuple[float, float, float]]
+
+
+class VoiceActivityDetector:
+    """Energy and spectrum based speech detection on 16 kHz mono audio"""
+
+    def __init__(self,
+                 frame_ms: int = VAD_FRAME_MS,
+                 energy_margin: float = VAD_ENERGY_MARGIN,
+                 min_speech: float = VAD_MIN_SPEECH,
+                 min_silence: float = VAD_MIN_SILENCE,
+                 padding: float = VAD_PADDING):
+        self.frame = int(AUDIO_RATE * frame_ms / 1000)
+        self.energy_margin = energy_margin
+        self.min_speech = min_speech
+        self.min_silence = min_silence
+        self.padding = padding
+
+    def _features(self, audio: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per-frame energy (dBFS), speech band ratio and spectral flatness"""
+        count = len(audio) // self.frame
+        frames = audio[:count * self.frame].reshape(count, self.frame)
+
+        freqs = np.fft.rfftfreq(self.frame, 1 / AUDIO_RATE)
+        band = (freqs >= _SPEECH_BAND[0]) & (freqs <= _SPEECH_BAND[1])
+        window = np.hanning(self.frame).astype(np.float32)
+
+        energy = np.empty(count, dtype=np.float32)
+        band_ratio = np.empty(count, dtype=np.float32)
+        flatness = np.empty(count, dtype=np.float32)
+
+        for start in range(0, count, _BLOCK_FRAMES):
+            block = np.asarray(frames[start:start + _BLOCK_FRAMES], dtype=np.float32)
+            stop = start + len(block)
+
+            energy[start:stop] = 10 * np.log10(np.mean(block ** 2, axis=1) + 1e-10)
+
+            power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2 + 1e-10
+            total = power.sum(axis=1)
+            band_ratio[start:stop] = power[:, band].sum(axis=1) / total
+            flatness[start:stop] = np.exp(np.mean(np.log(power), axis=1)) / (total / power.shape[1])
+
+        return energy, band_ratio, flatness
+
+    def _smooth(self, speech: np.ndarray) -> List[Tuple[float, float]]:
+        """Turn a per-frame decision into padded regions in seconds"""
+        frame_seconds = self.frame / AUDIO_RATE
+
+        # Edges of runs of speech frames
+        padded = np.concatenate(([False], speech, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        runs = [(start * frame_seconds, stop * frame_seconds) for start, stop in zip(edges[::2], edges[1::2])]
+
+        # Bridge short pauses, then drop blips that are too short to be words
+        merged = []
+        for start, end in runs:
+            if merged and start - merged[-1][1] < self.min_silence:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+
+        regions = []
+        for start, end in merged:
+            if end - start < self.min_speech:
+                continue
+
+            start, end = max(0.0, start - self.padding), end + self.padding
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], end)
+            else:
+                regions.append((start, end))
+
+        return regions
+
+    def detect(self, audio: np.ndarray) -> List[Tuple[float, float]]:
+        """
+        Find speech regions
+
+        A frame counts as speech when it is louder than the noise floor by
+        `energy_margin` dB, most of its energy is in the speech band and it is
+        not noise-like (high spectral flatness). Sustained music is rejected
+        because it lacks the syllable-rate loudness modulation of speech.
+
+        Returns:
+            (start, end) pairs in seconds on the original timeline
+        """
+        duration = len(audio) / AUDIO_RATE
+        if len(audio) < self.frame:
+            return []
+
+        energy, band_ratio, flatness = self._features(audio)
+
+        noise_floor = np.percentile(energy, 10)
+        loud = energy > max(noise_floor + self.energy_margin, -60.0)
+
+        # Loudness variation over ~1 s: high for speech, low for steady music or hum
+        context = max(1, int(AUDIO_RATE / self.frame))
+        kernel = np.ones(context) / context
+        mean = np.convolve(energy, kernel, mode="same")
+        modulation = np.sqrt(np.maximum(np.convolve(energy ** 2, kernel, mode="same") - mean ** 2, 0))
+
+        speech = loud & (band_ratio > 0.4) & (flatness < 0.5) & (modulation > 3.0)
+
+        return [(start, min(end, duration)) for start, end in self._smooth(speech)]
+
+    @staticmethod
+    def compact(audio: np.ndarray, regions: List[Tuple[float, float]]) -> Tuple[np.ndarray, RegionMap]:
+        """Concatenate the speech regions and return the map back to the original timeline"""
+        pieces = []
+        region_map = []
+        position = 0.0
+
+        for start, end in regions:
+            piece = audio[int(start * AUDIO_RATE):int(end * AUDIO_RATE)]
+            pieces.append(piece)
+            region_map.append((position, start, len(piece) / AUDIO_RATE))
+            position += len(piece) / AUDIO_RATE
+
+        if not pieces:
+            return np.empty(0, dtype=np.float32), region_map
+
+        return np.concatenate(pieces).astype(np.float32, copy=False), region_map
+
+    @staticmethod
+    def remap(segments: List[Dict], region_map: RegionMap) -> List[Dict]:
+        """Move segment (and word) timestamps back to the original timeline, in place"""
+        starts = [entry[0] for entry in region_map]
+
+        def convert(time: float) -> float:
+            index = max(bisect_right(starts, time) - 1, 0)
+            compact_start, original_start, duration = region_map[index]
+            return original_start + min(max(time - compact_start, 0.0), duration)
+
+        if not region_map:
+            return segments
+
+        for segment in segments:
+            segment['start'] = convert(segment['start'])
+            segment['end'] = max(convert(segment['end']), segment['start'])
+
+            for word in segment.get('words') or []:
+                word['start'] = convert(word['start'])
+                word['end'] = max(convert(word['end']), word['start'])
+
+        return segments
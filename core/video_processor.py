@@ -1,14 +1,37 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Union
 
 import ffmpeg
 
+from core.subtitle_reader import TEXT_CODECS
+from core.subtitle_writers import get_writer
 from exceptions.video_processor_exc import SubtitleAddError
-from settings import OUTPUT_DIR
+from settings import (
+    OUTPUT_DIR, TEMP_DIR, SRT_ENCODING, SUBTITLE_FORMAT, MUX_CONTAINER, MUX_FASTSTART,
+    BURN_CODEC, BURN_PRESET, BURN_CRF, BURN_THREADS, BURN_PARALLEL_SEGMENTS, BURN_MIN_SEGMENT,
+    BURN_FONT, BURN_FONT_SIZE
+)
+from utils.logger import Logger
+
+# Subtitles given as a file path or as segments rendered straight into ffmpeg
+Subtitle = Union[str, Path, List[Dict]]
 
 
 class VideoProcessor:
     """Add subtitles to video with ffmpeg"""
 
+    # ffmpeg demuxer of each subtitle format
+    INPUT_FORMATS = {'srt': 'srt', 'vtt': 'webvtt', 'ass': 'ass'}
+    # Matroska codec of each subtitle format; MP4 only supports mov_text
+    MKV_CODECS = {'srt': 'srt', 'vtt': 'webvtt', 'ass': 'ass'}
+    # Matroska codec for text subtitles already in the file (mov_text cannot be stored there)
+    MKV_TEXT_CODECS = {'ass': 'ass', 'ssa': 'ass', 'webvtt': 'webvtt'}
+
     @staticmethod
     def add_subtitles(video_path: str,
                       subtitle_paths: dict,
@@ -18,59 +41,377 @@ class VideoProcessor:
 
         Args:
             video_path: path to the original video
-            subtitle_paths: dictionary {'en': 'path/to/en.srt', 'fa': 'path/to/fa.srt'}
+            subtitle_paths: dictionary {'eng': 'path/to/en.srt', 'per': 'path/to/fa.srt'}
             output_name: output file name
 
         Returns:
             video path with subtitles
         """
+        container = Path(output_name).suffix.lstrip(".").lower() if output_name else MUX_CONTAINER
+        return VideoProcessor.mux(video_path, subtitle_paths, output_name, container=container or MUX_CONTAINER)['path']
+
+    @staticmethod
+    def _plan_streams(video_path: str, container: str) -> List[Dict]:
+        """
+        Streams of the original file to keep, with the codec to use for each
+
+        Everything is copied; only what the container cannot hold is dropped
+        (data streams, and in MP4 attachments and bitmap subtitles). Text
+        subtitles already in the file are converted to mov_text for MP4 and
+        to srt (ass and webvtt keep their format) for MKV.
+        """
+        try:
+            probe = ffmpeg.probe(video_path)
+        except ffmpeg.Error as e:
+            error_message = e.stderr.decode() if e.stderr else str(e)
+            raise SubtitleAddError(f"Error reading video information: {error_message}")
+
+        plan = []
+        for stream in probe.get('streams', []):
+            kind = stream.get('codec_type')
+            codec = "copy"
+
+            if kind == "data":
+                continue
+            if container == "mp4":
+                if kind == "attachment":
+                    continue
+                if kind == "subtitle":
+                    if stream.get('codec_name') not in TEXT_CODECS:
+                        continue
+                    codec = "mov_text"
+            elif kind == "subtitle" and stream.get('codec_name') in TEXT_CODECS:
+                codec = VideoProcessor.MKV_TEXT_CODECS.get(stream.get('codec_name'), "srt")
+
+            plan.append({'index': stream['index'], 'codec': codec})
+
+        return plan
+
+    @staticmethod
+    def _feed(fd: int, chunks):
+        """Write rendered subtitles into a pipe read by ffmpeg"""
+        try:
+            with os.fdopen(fd, "wb") as pipe:
+                for chunk in chunks:
+                    pipe.write(chunk.encode(SRT_ENCODING))
+        except (BrokenPipeError, OSError):
+            # ffmpeg stopped reading; its exit status reports the error
+            pass
+
+    @staticmethod
+    def mux(video_path: str,
+            subtitles: Dict[str, Subtitle],
+            output_name: str = None,
+            container: str = MUX_CONTAINER,
+            subtitle_format: str = SUBTITLE_FORMAT,
+            faststart: bool = MUX_FASTSTART,
+            work_dir: Optional[Path] = None) -> Dict:
+        """
+        Copy every stream of a video into a new file and add subtitle tracks, in one pass
+
+        Args:
+            video_path: path to the original video
+            subtitles: {language code: subtitle file or list of segments}; segments are
+                       rendered in `subtitle_format` and piped into ffmpeg without a file
+            output_name: output file name (default: <video>_subtitled.<container>)
+            container: "mkv" or "mp4" (mov_text subtitles)
+            faststart: move the MP4 index to the front so playback starts before download ends
+            work_dir: where segments are written on systems without pipes (default: TEMP_DIR)
+
+        Returns:
+            {'path', 'seconds', 'mb', 'mb_per_second'}
+        """
+        container = container.lower()
+        if container not in ("mkv", "mp4"):
+            raise SubtitleAddError(f"Unsupported container: {container}")
+
         if output_name is None:
-            output_name = f"{Path(video_path).stem}_subtitled.mkv"
+            output_name = f"{Path(video_path).stem}_subtitled.{container}"
 
         output_path = OUTPUT_DIR / output_name
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
+        plan = VideoProcessor._plan_streams(video_path, container)
+
+        args = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(video_path)]
+        maps = [arg for stream in plan for arg in ("-map", f"0:{stream['index']}")]
+        codecs = [arg for i, stream in enumerate(plan) for arg in (f"-c:{i}", stream['codec'])]
+        metadata = []
+
+        pass_fds = []
+        feeders = []
+        temp_files = []
+
+        for i, (lang, subtitle) in enumerate(subtitles.items(), start=1):
+            output_index = len(plan) + i - 1
+
+            if isinstance(subtitle, (str, Path)):
+                suffix = Path(subtitle).suffix.lstrip(".").lower()
+                input_format = VideoProcessor.INPUT_FORMATS.get(suffix)
+                source = str(subtitle)
+            else:
+                suffix = subtitle_format
+                input_format = VideoProcessor.INPUT_FORMATS[subtitle_format]
+                chunks = get_writer("", language=lang, subtitle_format=subtitle_format).render(subtitle)
+
+                if os.name == "posix":
+                    read_fd, write_fd = os.pipe()
+                    pass_fds.append(read_fd)
+                    feeders.append((write_fd, chunks))
+                    source = f"pipe:{read_fd}"
+                else:
+                    # No extra pipes for child processes on Windows
+                    temp_path = Path(work_dir or TEMP_DIR) / f"{Path(video_path).stem}_{lang}.{subtitle_format}"
+                    with open(temp_path, "w", encoding=SRT_ENCODING, newline="\n") as f:
+                        f.writelines(chunks)
+                    temp_files.append(temp_path)
+                    source = str(temp_path)
+
+            if input_format:
+                args += ["-f", input_format]
+            args += ["-i", source]
+
+            maps += ["-map", f"{i}:0"]
+            codec = "mov_text" if container == "mp4" else VideoProcessor.MKV_CODECS.get(suffix, "srt")
+            codecs += [f"-c:{output_index}", codec]
+            metadata += [
+                f"-metadata:s:{output_index}", f"language={lang}",
+                f"-metadata:s:{output_index}", f"title={lang.upper()}"
+            ]
+
+        args += maps + ["-map_metadata", "0", "-map_chapters", "0"] + codecs + metadata
+        if container == "mp4" and faststart:
+            args += ["-movflags", "+faststart"]
+        args.append(str(output_path))
+
+        start = time.perf_counter()
+        try:
+            process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, pass_fds=pass_fds)
+        except OSError as e:
+            for fd in pass_fds + [fd for fd, _ in feeders]:
+                os.close(fd)
+            raise SubtitleAddError(f"Error adding subtitle: {e}")
+
         try:
-            # Original video and audio
-            video = ffmpeg.input(video_path)
-
-            # Add subtitles
-            subtitle_inputs = []
-            metadata = []
-
-            for i, (lang, sub_path) in enumerate(subtitle_paths.items()):
-                subtitle_inputs.append(ffmpeg.input(sub_path))
-                metadata.extend([
-                    f'-metadata:s:s:{i}',
-                    f'language={lang}',
-                    f'-metadata:s:s:{i}',
-                    f'title={lang.upper()}'
-                ])
-
-            # Combine all
-            inputs = [video] + subtitle_inputs
-
-            output_args = {
-                'c:v': 'copy',  # Copy video without re-encoding
-                'c:a': 'copy',  # Copy audio without re-encoding
-                'c:s': 'srt'  # Subtitle format
-            }
-
-            stream = ffmpeg.output(
-                *inputs,
-                str(output_path),
-                **output_args
+            # ffmpeg holds its own copies of the read ends now
+            for fd in pass_fds:
+                os.close(fd)
+
+            threads = [
+                threading.Thread(target=VideoProcessor._feed, args=(fd, chunks), daemon=True)
+                for fd, chunks in feeders
+            ]
+            for thread in threads:
+                thread.start()
+
+            _, stderr = process.communicate()
+            for thread in threads:
+                thread.join()
+
+        finally:
+            for temp_path in temp_files:
+                temp_path.unlink(missing_ok=True)
+
+        if process.returncode != 0:
+            error_message = stderr.decode(errors="replace") if stderr else "ffmpeg failed"
+            raise SubtitleAddError(f"Error adding subtitle: {error_message}")
+
+        seconds = time.perf_counter() - start
+        size_mb = output_path.stat().st_size / (1024 * 1024)
+        stats = {
+            'path': str(output_path),
+            'seconds': round(seconds, 3),
+            'mb': round(size_mb, 1),
+            'mb_per_second': round(size_mb / seconds, 1) if seconds > 0 else None
+        }
+
+        Logger().info(f"Muxed {output_path.name}: {stats['mb']} MB in {stats['seconds']}s "
+                      f"({stats['mb_per_second']} MB/s)")
+        return stats
+
+    @staticmethod
+    def _run(args: List[str]):
+        """Run an ffmpeg command, raising SubtitleAddError with its stderr on failure"""
+        try:
+            completed = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise SubtitleAddError(f"Error running ffmpeg: {e}")
+
+        if completed.returncode != 0:
+            error_message = completed.stderr.decode(errors="replace") if completed.stderr else "ffmpeg failed"
+            raise SubtitleAddError(f"Error burning subtitles: {error_message}")
+
+    @staticmethod
+    def _burn_filter(subtitle_path: str) -> str:
+        """subtitles/ass filter for a subtitle file, escaped for the filter graph"""
+        path = str(Path(subtitle_path).resolve()).replace("\\", "/").replace(":", "\\:").replace("'", "'\\''")
+
+        if Path(subtitle_path).suffix.lower() == ".ass":
+            return f"ass=filename='{path}'"
+
+        styles = []
+        if BURN_FONT:
+            styles.append(f"FontName={BURN_FONT}")
+        if BURN_FONT_SIZE:
+            styles.append(f"FontSize={BURN_FONT_SIZE}")
+
+        style = f":force_style='{','.join(styles)}'" if styles else ""
+        return f"subtitles=filename='{path}'{style}"
+
+    @staticmethod
+    def _encoder_args(codec: str, preset: str, crf: int, threads: int) -> List[str]:
+        args = ["-c:v", codec, "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p"]
+        if threads:
+            args += ["-threads", str(threads)]
+        if codec == "libx265":
+            # Plays in Apple players only with the hvc1 tag
+            args += ["-tag:v", "hvc1"]
+        return args
+
+    @staticmethod
+    def keyframes(video_path: str) -> List[float]:
+        """Times of the video keyframes, read from packet flags without decoding"""
+        try:
+            completed = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", str(video_path)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
             )
+        except OSError as e:
+            raise SubtitleAddError(f"Error running ffprobe: {e}")
+
+        if completed.returncode != 0:
+            raise SubtitleAddError(f"Error reading keyframes: {completed.stderr.decode(errors='replace')}")
+
+        times = []
+        for line in completed.stdout.decode(errors="replace").splitlines():
+            pts_time, _, flags = line.partition(",")
+            if "K" in flags and pts_time not in ("", "N/A"):
+                times.append(float(pts_time))
+
+        return sorted(times)
+
+    @staticmethod
+    def split_points(keyframes: List[float], duration: float, segments: int,
+                     min_segment: float = BURN_MIN_SEGMENT) -> List[float]:
+        """
+        Start times of up to `segments` chunks, each cut at the keyframe closest to an equal split
+
+        Chunks shorter than `min_segment` are avoided, so short videos stay in one piece.
+        """
+        segments = min(segments, int(duration // min_segment) if min_segment > 0 else segments)
+        points = [0.0]
+        if segments < 2 or not keyframes:
+            return points
+
+        index = 0
+        for k in range(1, segments):
+            target = duration * k / segments
+            while index + 1 < len(keyframes) and abs(keyframes[index + 1] - target) <= abs(keyframes[index] - target):
+                index += 1
+
+            cut = keyframes[index]
+            if cut - points[-1] >= min_segment and duration - cut >= min_segment:
+                points.append(cut)
 
-            # Execute command
-            ffmpeg.run(
-                stream,
-                overwrite_output=True,
-                capture_stderr=True
+        return points
+
+    @staticmethod
+    def burn_subtitles(video_path: str,
+                       subtitle_path: str,
+                       output_name: str = None,
+                       codec: str = BURN_CODEC,
+                       preset: str = BURN_PRESET,
+                       crf: int = BURN_CRF,
+                       threads: int = BURN_THREADS,
+                       parallel_segments: int = BURN_PARALLEL_SEGMENTS,
+                       work_dir: Optional[Path] = None) -> Dict:
+        """
+        Render subtitles into the picture (hard-sub) and re-encode the video
+
+        libass shapes Persian text correctly when the font has the glyphs
+        (BURN_FONT). Audio is copied. With `parallel_segments` > 1 the video
+        is cut at keyframes, the chunks are encoded concurrently with
+        `threads / parallel_segments` threads each and joined with the concat
+        demuxer, which scales better across many cores than one encoder.
+        Chunks are written to `work_dir` (default: TEMP_DIR).
+
+        Returns:
+            {'path', 'seconds', 'mb', 'mb_per_second', 'segments'}
+        """
+        if output_name is None:
+            output_name = f"{Path(video_path).stem}_hardsub.mp4"
+
+        output_path = OUTPUT_DIR / output_name
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        burn_filter = VideoProcessor._burn_filter(subtitle_path)
+        container_args = ["-movflags", "+faststart"] if output_path.suffix.lower() in (".mp4", ".mov") else []
+
+        start = time.perf_counter()
+
+        points = [0.0]
+        if parallel_segments > 1:
+            try:
+                duration = float(ffmpeg.probe(str(video_path))['format']['duration'])
+            except (ffmpeg.Error, KeyError, ValueError) as e:
+                raise SubtitleAddError(f"Error reading video information: {e}")
+            points = VideoProcessor.split_points(VideoProcessor.keyframes(video_path), duration, parallel_segments)
+
+        if len(points) == 1:
+            VideoProcessor._run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(video_path),
+                 "-map", "0:v:0", "-map", "0:a?", "-vf", burn_filter]
+                + VideoProcessor._encoder_args(codec, preset, crf, threads)
+                + ["-c:a", "copy"] + container_args + [str(output_path)]
             )
+        else:
+            chunk_threads = max(1, (threads or os.cpu_count() or 1) // len(points))
+            bounds = list(zip(points, points[1:] + [None]))
+            work_dir = Path(work_dir or TEMP_DIR)
+            chunk_paths = [work_dir / f"{output_path.stem}_part{i:03d}.mkv" for i in range(len(bounds))]
+            list_path = work_dir / f"{output_path.stem}_parts.txt"
 
-            return str(output_path)
+            def encode(i: int):
+                chunk_start, chunk_end = bounds[i]
+                args = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                        "-ss", f"{chunk_start:.6f}", "-i", str(video_path)]
+                if chunk_end is not None:
+                    args += ["-t", f"{chunk_end - chunk_start:.6f}"]
 
-        except ffmpeg.Error as e:
-            error_message = e.stderr.decode() if e.stderr else str(e)
-            raise SubtitleAddError(f"Error adding subtitle: {error_message}")
+                # Seeking restarts timestamps at 0; shift them back so the cues line up
+                chunk_filter = f"setpts=PTS+{chunk_start:.6f}/TB,{burn_filter},setpts=PTS-STARTPTS"
+                VideoProcessor._run(
+                    args + ["-map", "0:v:0", "-an", "-vf", chunk_filter]
+                    + VideoProcessor._encoder_args(codec, preset, crf, chunk_threads)
+                    + [str(chunk_paths[i])]
+                )
+
+            try:
+                with ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+                    list(executor.map(encode, range(len(bounds))))
+
+                with open(list_path, "w", encoding="utf-8") as f:
+                    f.writelines(f"file '{path.as_posix()}'\n" for path in chunk_paths)
+
+                VideoProcessor._run(
+                    ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                     "-f", "concat", "-safe", "0", "-i", str(list_path), "-i", str(video_path),
+                     "-map", "0:v:0", "-map", "1:a?", "-c", "copy"] + container_args + [str(output_path)]
+                )
+            finally:
+                for path in chunk_paths + [list_path]:
+                    path.unlink(missing_ok=True)
+
+        seconds = time.perf_counter() - start
+        size_mb = output_path.stat().st_size / (1024 * 1024)
+        stats = {
+            'path': str(output_path),
+            'seconds': round(seconds, 3),
+            'mb': round(size_mb, 1),
+            'mb_per_second': round(size_mb / seconds, 1) if seconds > 0 else None,
+            'segments': len(points)
+        }
+
+        Logger().info(f"Burned subtitles into {output_path.name} with {codec} {preset} CRF {crf} "
+                      f"in {stats['seconds']}s ({len(points)} segment(s))")
+        return stats
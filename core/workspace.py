@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, IO, Optional, Union
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from settings import (
+    PROJECT_NAME, TEMP_DIR, WORKSPACE_TMPFS, WORKSPACE_TMPFS_DIR, WORKSPACE_STALE_HOURS, DISK_SPACE_MARGIN_MB
+)
+from exceptions.pipeline_exc import InsufficientSpaceError
+from utils.file_handler import FileHandler
+
+# Workspaces in RAM get a project directory, so /dev/shm stays tidy
+TMPFS_ROOT = WORKSPACE_TMPFS_DIR / FileHandler.get_safe_filename(PROJECT_NAME)
+
+
+class Workspace:
+    """
+    Private scratch directory of one job
+
+    Intermediates (WAV audio, memory-mapped buffers, subtitle files, encoder
+    chunks) of concurrent jobs never share a directory, so equal video names
+    cannot collide and removing a workspace deletes only that job's files.
+    With WORKSPACE_TMPFS the directory is created in RAM when it fits.
+
+    The creating process holds a lock on `.lock` until cleanup, so other
+    processes never remove a workspace that is still in use.
+
+    Layout:
+        <TEMP_DIR or TMPFS_ROOT>/job-<video name>-<random>/
+        <TEMP_DIR or TMPFS_ROOT>/job-<video name>-<random>/.lock
+    """
+
+    PREFIX = "job-"
+    LOCK_NAME = ".lock"
+
+    def __init__(self, directory: Union[str, Path], lock_file: Optional[IO] = None):
+        self.directory = Path(directory)
+        self._lock_file = lock_file
+
+    @classmethod
+    def create(cls, name: str, size: int = 0, tmpfs: bool = WORKSPACE_TMPFS) -> "Workspace":
+        """
+        Create a workspace for a job
+
+        Args:
+            name: readable part of the directory name, e.g. the video name
+            size: bytes the job is expected to write; decides whether tmpfs is used
+            tmpfs: prefer WORKSPACE_TMPFS_DIR when it has room for `size`
+        """
+        root = cls.root(size) if tmpfs else TEMP_DIR
+        root.mkdir(parents=True, exist_ok=True)
+
+        name = FileHandler.get_safe_filename(name)[:40]
+        directory = Path(tempfile.mkdtemp(prefix=f"{cls.PREFIX}{name}-", dir=root))
+
+        lock_file = open(directory / cls.LOCK_NAME, "a+b")
+        cls._lock(lock_file)
+        return cls(directory, lock_file)
+
+    @staticmethod
+    def _lock(lock_file: IO):
+        """Take the lock without waiting; OSError when another open file holds it"""
+        if os.name == "nt":
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    @classmethod
+    def in_use(cls, directory: Union[str, Path]) -> bool:
+        """True while the process that created the workspace has not cleaned it up"""
+        try:
+            with open(Path(directory) / cls.LOCK_NAME, "a+b") as lock_file:
+                cls._lock(lock_file)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return True
+
+        # Closing the file released the lock again
+        return False
+
+    @staticmethod
+    def root(size: int = 0) -> Path:
+        """Directory in RAM when it exists and has room for `size` bytes, TEMP_DIR otherwise"""
+        if WORKSPACE_TMPFS_DIR.is_dir() and Workspace.free_bytes(WORKSPACE_TMPFS_DIR) >= size:
+            return TMPFS_ROOT
+
+        return TEMP_DIR
+
+    def path(self, name: str) -> Path:
+        """A file inside the workspace"""
+        return self.directory / name
+
+    def cleanup(self):
+        """Delete the workspace and everything in it"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+        # Windows keeps memory-mapped files locked; remove_stale deletes them later
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+    @staticmethod
+    def free_bytes(directory: Union[str, Path]) -> int:
+        """Free bytes on the disk of a directory, minus DISK_SPACE_MARGIN_MB"""
+        return shutil.disk_usage(directory).free - DISK_SPACE_MARGIN_MB * 1024 * 1024
+
+    @staticmethod
+    def check_space(needs: Dict[Union[str, Path], int]):
+        """
+        Fail early when a job would fill a disk
+
+        Args:
+            needs: {directory: bytes to be written there}; directories on
+                   the same disk are added up
+
+        Raises:
+            InsufficientSpaceError
+        """
+        devices = {}
+        for directory, size in needs.items():
+            device = os.stat(directory).st_dev
+            total, _ = devices.get(device, (0, directory))
+            devices[device] = (total + size, directory)
+
+        for size, directory in devices.values():
+            free = Workspace.free_bytes(directory)
+            if size > free:
+                raise InsufficientSpaceError(
+                    f"Not enough disk space in {directory}: {FileHandler.format_size(int(size))} needed, "
+                    f"{FileHandler.format_size(max(free, 0))} available"
+                )
+
+    @classmethod
+    def remove_stale(cls, max_age_hours: float = WORKSPACE_STALE_HOURS) -> int:
+        """Delete workspaces older than `max_age_hours` left behind by interrupted runs, unless still in use"""
+        roots = [TEMP_DIR, TMPFS_ROOT]
+        limit = time.time() - max_age_hours * 3600
+
+        removed = 0
+        for root in roots:
+            if not root.is_dir():
+                continue
+            for directory in root.glob(f"{cls.PREFIX}*"):
+                try:
+                    if directory.is_dir() and directory.stat().st_mtime < limit and not cls.in_use(directory):
+                        shutil.rmtree(directory, ignore_errors=True)
+                        removed += 1
+                except OSError:
+                    continue
+
+        return removed
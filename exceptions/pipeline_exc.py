@@ -0,0 +1,22 @@
+class PipelineError(RuntimeError):
+    pass
+
+
+class ManifestError(PipelineError):
+    pass
+
+
+class JobNotFoundError(PipelineError):
+    pass
+
+
+class JobOptionsError(PipelineError):
+    pass
+
+
+class InsufficientSpaceError(PipelineError):
+    pass
+
+
+class JobCancelledError(PipelineError):
+    pass
@@ -0,0 +1,2 @@
+class SubtitleReadError(RuntimeError):
+    pass
@@ -1,2 +1,6 @@
 class UnsupportedModelError(RuntimeError):
     pass
+
+
+class UnsupportedProfileError(ValueError):
+    pass
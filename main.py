@@ -5,6 +5,7 @@ SUMO.AI - Automated Subtitle Generation Application
 Version: 1.0.0
 """
 
+import importlib.util
 import sys
 from pathlib import Path
 
@@ -43,12 +44,12 @@ def check_requirements():
         'ffmpeg'
     ]
 
+    # Only locate the modules; importing torch and friends here would cost seconds
     missing = []
     for module in required_modules:
-        try:
-            __import__(module)
+        if importlib.util.find_spec(module) is not None:
             logger.info(f"Module {module} found ✓")
-        except ImportError:
+        else:
             missing.append(module)
             logger.error(f"Module {module} not found!")
 
@@ -88,6 +89,7 @@ def main():
 
     finally:
         logger.info("Application closed")
+        logger.close()
 
 
 if __name__ == "__main__":
@@ -9,29 +9,156 @@ PROJECT_VERSION = "1.0.0-rc"
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = BASE_DIR / "output"
 TEMP_DIR = OUTPUT_DIR / "temp"
+CACHE_DIR = OUTPUT_DIR / "cache"
+JOBS_DIR = OUTPUT_DIR / "jobs"
 
 # If DEBUG is False, disable logging completely
 DEBUG = True
 
+# Logging (written by a background thread; the daily log rotates by size)
+LOG_LEVEL = "DEBUG"  # Lowest level recorded; the console shows INFO and above
+LOG_MAX_MB = 10  # Size of log_YYYYMMDD.log before it is rotated
+LOG_BACKUP_COUNT = 5  # Rotated files kept per day
+LOG_PROGRESS_INTERVAL = 1.0  # Seconds between two logged updates of the same progress message
+
+# Loaded models kept warm (least recently used are unloaded first)
+MODEL_REGISTRY_MAX_MODELS = 3
+MODEL_REGISTRY_MAX_MB = 8192  # Total weights in memory, 0 = no limit
+
+# Load the selected models in the background while the user picks a file
+PRELOAD_MODELS = True
+
 # Whisper settings
 WHISPER_MODEL = "base"  # tiny, base, small, medium, large
 WHISPER_DEVICE = "cpu"  # or "cuda" for GPU
 WHISPER_LANGUAGE = "en"
+WORD_TIMESTAMPS = False  # Slower, but cues are cut at exact word times
+
+# Use existing English subtitles (video.en.srt, video.srt or an embedded stream) instead of Whisper
+SUBTITLE_IMPORT = False
+SUBTITLE_IMPORT_LANGUAGES = ("en", "eng")
+
+# Transcription cache (reruns of the same media skip speech recognition)
+TRANSCRIPTION_CACHE_ENABLED = True
+TRANSCRIPTION_CACHE_DIR = CACHE_DIR / "transcriptions"
+
+# Streaming transcription windows (seconds)
+STREAM_WINDOW = 30.0
+STREAM_OVERLAP = 5.0
+
+# Voice activity detection (skip silence and music before Whisper)
+VAD_ENABLED = False
+VAD_FRAME_MS = 30
+VAD_ENERGY_MARGIN = 12.0  # dB above the noise floor
+VAD_MIN_SPEECH = 0.25  # Seconds; shorter bursts are ignored
+VAD_MIN_SILENCE = 0.5  # Seconds; shorter pauses stay inside a region
+VAD_PADDING = 0.2  # Seconds kept around each region
+
+# Parallel transcription of long audio (CPU)
+PARALLEL_TRANSCRIBE_WORKERS = 0  # Worker processes, 0 = cores / threads per worker
+PARALLEL_TRANSCRIBE_THREADS = 4  # torch intra-op threads per worker
+PARALLEL_CHUNK_SECONDS = 300.0  # Target chunk length, cut at the nearest silence
 
 # Translate settings
 TRANSLATION_MODEL = "facebook/m2m100_418M"
 MAX_TRANSLATION_LENGTH = 512
-BATCH_SIZE = 8
+BATCH_SIZE = 32  # Maximum sentences in one batch
+TRANSLATION_TOKEN_BUDGET = 1024  # Maximum padded tokens (longest x sentences) in one batch
+
+# Merge fragments of one sentence before translation, then split the translation
+# back over the original cues in proportion to their length
+SENTENCE_MERGE_ENABLED = True
+SENTENCE_MERGE_MAX_TOKENS = 96  # Source tokens of one merged sentence
+SENTENCE_MERGE_MAX_GAP = 1.5  # Seconds; fragments separated by a longer pause are not merged
+
+# Decoding profiles for translation, selectable per job
+# num_beams 1 is greedy decoding; the generation budget of a batch is
+# max_new_tokens = longest source x length_ratio + length_margin (at most MAX_TRANSLATION_LENGTH).
+# "greedy" and "beam-N" are also accepted as profile names.
+TRANSLATION_PROFILES = {
+    'draft': {'num_beams': 1, 'length_ratio': 1.6, 'length_margin': 8},
+    'balanced': {'num_beams': 2, 'length_ratio': 2.0, 'length_margin': 10},
+    'quality': {'num_beams': 4, 'length_ratio': 2.5, 'length_margin': 16}
+}
+TRANSLATION_PROFILE = "quality"
+
+# Dynamic int8 quantization of the translation model's Linear layers (CPU only)
+TRANSLATION_QUANTIZE = False
+QUANTIZED_MODEL_DIR = CACHE_DIR / "quantized"  # Converted weights, reused on the next start
+
+# Translation memory (repeated lines are looked up instead of translated)
+TRANSLATION_CACHE_ENABLED = True
+TRANSLATION_CACHE_PATH = CACHE_DIR / "translations.sqlite"
+TRANSLATION_CACHE_MEMORY_ITEMS = 10000  # Entries kept in the in-memory LRU
+TRANSLATION_CACHE_MAX_MB = 256  # Least recently used entries are evicted above this size
 
 # FFmpeg settings
 AUDIO_FORMAT = "wav"
 AUDIO_CODEC = "pcm_s16le"
 AUDIO_RATE = 16000
+# "pipe" decodes into memory, "wav" writes a temporary file,
+# "stream" decodes and transcribes window by window (flat memory for long videos)
+AUDIO_MODE = "pipe"
+AUDIO_MEMMAP_THRESHOLD = 2 * 3600  # Seconds; longer audio is buffered in a memory-mapped file
 
 # Subtitle settings
-SRT_ENCODING = "utf-8"
+SUBTITLE_FORMAT = "srt"  # srt, vtt or ass
+SRT_ENCODING = "utf-8"  # Encoding of every subtitle file
+# Lines get right-to-left embedding (ISO 639-1 and 639-2 codes)
+RTL_LANGUAGES = {"fa", "per", "fas", "ar", "ara", "he", "heb", "ur", "urd", "ps", "pus", "ckb", "yi", "yid", "dv", "div"}
 MAX_SUBTITLE_LENGTH = 42  # Maximum character in a line
+SUBTITLE_MAX_LINES = 2
+SUBTITLE_MIN_DURATION = 1.0  # Seconds a cue stays on screen at least
+SUBTITLE_MAX_DURATION = 7.0  # Seconds; longer cues are split
+SUBTITLE_BREAK_GAP = 1.0  # Seconds of silence that always start a new cue
+SUBTITLE_RESEGMENT = True  # Re-cut Whisper segments into cues that respect the limits above
+
+# Muxing (subtitles are added in one pass, every original stream is kept)
+MUX_CONTAINER = "mkv"  # or "mp4" (mov_text subtitles)
+MUX_FASTSTART = True  # MP4 index at the front of the file, so playback can start while downloading
+
+# Burned-in (hard) subtitles, for targets without soft subtitle support
+BURN_CODEC = "libx264"  # or "libx265"
+BURN_PRESET = "veryfast"  # x264/x265 preset: ultrafast ... veryslow
+BURN_CRF = 23  # Lower is better quality and larger files (x265: ~28 is similar to x264 23)
+BURN_THREADS = 0  # Encoder threads, 0 = all cores
+BURN_PARALLEL_SEGMENTS = 0  # >1 encodes that many keyframe-aligned chunks concurrently, then concatenates
+BURN_MIN_SEGMENT = 30.0  # Seconds; shorter videos are not split
+BURN_FONT = ""  # Font with Persian glyphs, e.g. "Vazirmatn"; empty uses the libass default
+BURN_FONT_SIZE = 0  # 0 keeps the default size
+
+# Run metrics (stage timers, audio seconds, token counts, peak memory)
+METRICS_ENABLED = True
+METRICS_DIR = OUTPUT_DIR / "metrics"  # JSON-lines report, Prometheus textfile and Chrome trace
+METRICS_MAX_SPANS = 100_000  # Oldest spans are dropped beyond this
+
+# Job workspaces (private scratch directory of every job, removed when the job ends)
+WORKSPACE_TMPFS = False  # Create workspaces in RAM (WORKSPACE_TMPFS_DIR) when they fit
+WORKSPACE_TMPFS_DIR = Path("/dev/shm")
+WORKSPACE_STALE_HOURS = 24  # Workspaces left behind by crashed runs are removed after this
+DISK_SPACE_MARGIN_MB = 512  # Free space left on every disk a job writes to
+
+# Pipeline settings
+# Worker threads per stage; model stages share one model instance
+PIPELINE_STAGE_WORKERS = {
+    'extract': 2,
+    'transcribe': 1,
+    'translate': 1,
+    'mux': 2
+}
+PIPELINE_QUEUE_SIZE = 2  # Videos waiting between two stages (back-pressure)
+JOB_CHECKPOINTS = True  # Save stage outputs in JOBS_DIR so failed jobs can be resumed
+
+# Local job service (python -m core.service)
+SERVICE_HOST = "127.0.0.1"  # Local tools only; use 0.0.0.0 to accept other hosts
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 1  # Worker processes, each keeping its own models loaded
+SERVICE_THREADS_PER_WORKER = 0  # torch threads per worker, 0 = cores / workers
+SERVICE_QUEUE_PATH = JOBS_DIR / "service.sqlite"
+SERVICE_MAX_BODY_KB = 64  # Largest accepted request body
 
 # Create directories
 OUTPUT_DIR.mkdir(exist_ok=True)
 TEMP_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
+JOBS_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,27 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import settings  # noqa: E402
+
+# Point every output path at a temporary directory before the project modules
+# import them, so caches, logs, jobs and workspaces never land in the working tree
+_OUTPUT_DIR = Path(tempfile.mkdtemp(prefix="ziro-tests-"))
+_PROJECT_OUTPUT_DIR = settings.OUTPUT_DIR
+
+for _name, _value in list(vars(settings).items()):
+    if isinstance(_value, Path) and (_value == _PROJECT_OUTPUT_DIR or _PROJECT_OUTPUT_DIR in _value.parents):
+        _path = _OUTPUT_DIR / _value.relative_to(_PROJECT_OUTPUT_DIR)
+        setattr(settings, _name, _path)
+        # settings creates its directories on import; do the same for the temporary ones
+        if _value.is_dir():
+            _path.mkdir(parents=True, exist_ok=True)
+
+settings.WORKSPACE_TMPFS_DIR = _OUTPUT_DIR / "shm"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_OUTPUT_DIR, ignore_errors=True)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import core.audio_extractor
+from core.audio_extractor import AudioExtractor
+from settings import AUDIO_RATE
+
+
+def test_memory_mapped_buffer_grows_and_is_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.audio_extractor, "TEMP_DIR", tmp_path)
+
+    buffer = AudioExtractor._allocate("talk.mp4", 4, memmap=True)
+    buffer[:] = [1, 2, 3, 4]
+    buffer = AudioExtractor._grow(buffer, 8)
+
+    assert isinstance(buffer, np.memmap)
+    assert len(buffer) == 8
+    assert list(buffer[:4]) == [1, 2, 3, 4]
+
+    path = tmp_path / "talk_audio.f32"
+    assert path.exists()
+    del buffer
+    AudioExtractor.cleanup(np.memmap(path, dtype=np.float32, mode="r"))
+    assert not path.exists()
+
+
+def test_buffer_in_memory_keeps_samples_when_grown():
+    buffer = AudioExtractor._allocate("talk.mp4", 2, memmap=False)
+    buffer[:] = [0.5, -0.5]
+
+    assert list(AudioExtractor._grow(buffer, 4)[:2]) == [0.5, -0.5]
+
+
+def windows_of(audio, chunk_size, monkeypatch, **kwargs):
+    """Windows of `audio` as decoded from a video, arriving in chunks of `chunk_size` samples"""
+    chunks = [audio[i:i + chunk_size] for i in range(0, len(audio), chunk_size)]
+    monkeypatch.setattr(AudioExtractor, "_iter_pcm", staticmethod(lambda video_path: iter(chunks)))
+    return list(AudioExtractor.iter_windows("talk.mp4", **kwargs))
+
+
+@pytest.mark.parametrize("seconds", [10, 11, 2])
+def test_streamed_windows_match_array_windows(monkeypatch, seconds):
+    audio = np.arange(seconds * AUDIO_RATE, dtype=np.float32)
+    expected = list(AudioExtractor.iter_windows(audio, window=4, overlap=1))
+
+    for chunk_size in (1000, 3 * AUDIO_RATE + 7):
+        windows = windows_of(audio, chunk_size, monkeypatch, window=4, overlap=1)
+        assert [offset for offset, _ in windows] == [offset for offset, _ in expected]
+        for (offset, samples), (_, array_samples) in zip(windows, expected):
+            assert np.array_equal(samples, array_samples)
+            assert samples[0] == offset * AUDIO_RATE
+
+
+def test_windows_overlap_and_cover_the_audio():
+    audio = np.arange(11 * AUDIO_RATE, dtype=np.float32)
+    windows = list(AudioExtractor.iter_windows(audio, window=4, overlap=1))
+
+    assert [offset for offset, _ in windows] == [0.0, 3.0, 6.0, 9.0]
+    assert all(len(samples) == 4 * AUDIO_RATE for _, samples in windows[:-1])
+    assert windows[-1][1][-1] == audio[-1]
+
+
+def test_overlap_must_be_shorter_than_the_window():
+    with pytest.raises(ValueError):
+        list(AudioExtractor.iter_windows(np.zeros(AUDIO_RATE, dtype=np.float32), window=2, overlap=2))
@@ -0,0 +1,59 @@
+from core.cue_segmenter import CueSegmenter
+
+
+def test_wrap_balances_two_lines():
+    segmenter = CueSegmenter(max_chars=20)
+    text = segmenter.wrap("one two three four five six")
+
+    first, second = text.split("\n")
+    assert len(first) <= 20 and len(second) <= 20
+    assert abs(len(first) - len(second)) <= 6
+
+
+def test_short_text_is_not_wrapped():
+    assert CueSegmenter(max_chars=42).wrap("  short   line ") == "short line"
+
+
+def test_words_share_the_segment_time_without_word_timestamps():
+    words = CueSegmenter.words({'text': "aa bbbb", 'start': 1.0, 'end': 2.0})
+
+    assert [word['word'] for word in words] == ["aa", "bbbb"]
+    assert words[0]['start'] == 1.0
+    assert words[-1]['end'] == 2.0
+    assert words[0]['end'] == words[1]['start']
+
+
+def test_long_segment_is_cut_into_cues_within_limits():
+    segmenter = CueSegmenter(max_chars=20, max_lines=2, min_duration=0.5, max_duration=4.0)
+    text = " ".join(f"word{i}" for i in range(40))
+    cues = segmenter.resegment([{'text': text, 'start': 0.0, 'end': 20.0}])
+
+    assert len(cues) > 1
+    assert " ".join(cue['text'].replace("\n", " ") for cue in cues) == text
+    for cue in cues:
+        lines = cue['text'].split("\n")
+        assert len(lines) <= 2 and all(len(line) <= 20 for line in lines)
+        assert cue['end'] - cue['start'] <= 4.0
+    assert all(a['end'] <= b['start'] for a, b in zip(cues, cues[1:]))
+
+
+def test_short_cue_is_merged_or_extended():
+    segmenter = CueSegmenter(max_chars=42, min_duration=1.0, max_duration=7.0)
+    cues = segmenter.resegment([
+        {'text': "Hi.", 'start': 0.0, 'end': 0.2},
+        {'text': "How are you?", 'start': 0.3, 'end': 1.5}
+    ])
+    assert cues == [{'text': "Hi. How are you?", 'start': 0.0, 'end': 1.5}]
+
+    # The last cue is stretched to the minimum duration
+    cues = segmenter.resegment([{'text': "Bye.", 'start': 5.0, 'end': 5.2}])
+    assert cues == [{'text': "Bye.", 'start': 5.0, 'end': 6.0}]
+
+
+def test_pause_starts_a_new_cue():
+    segmenter = CueSegmenter(break_gap=1.0, min_duration=0.0)
+    cues = segmenter.resegment([
+        {'text': "first part", 'start': 0.0, 'end': 1.0},
+        {'text': "second part", 'start': 3.0, 'end': 4.0}
+    ])
+    assert [cue['text'] for cue in cues] == ["first part", "second part"]
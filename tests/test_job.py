@@ -0,0 +1,41 @@
+import pytest
+
+from core.job import JobManifest
+from exceptions.pipeline_exc import JobNotFoundError
+
+
+def test_complete_and_load_artifacts(tmp_path):
+    manifest = JobManifest.create(str(tmp_path / "talk.mp4"), {'decoding': "balanced"}, jobs_dir=tmp_path)
+    segments = [{'text': "Hello.", 'start': 0.0, 'end': 1.0}]
+    manifest.complete('transcribe', {'segments_en': segments, 'srt_en': "/tmp/talk_en.srt"})
+
+    loaded = JobManifest.load(manifest.id, jobs_dir=tmp_path)
+    assert loaded.is_completed('transcribe')
+    assert not loaded.is_completed('translate')
+    assert loaded.artifacts('transcribe') == {'segments_en': segments, 'srt_en': "/tmp/talk_en.srt"}
+    assert (manifest.directory / "segments_en.json").exists()
+    assert loaded.data['options'] == {'decoding': "balanced"}
+
+
+def test_status_and_find(tmp_path):
+    first = JobManifest.create("a.mp4", jobs_dir=tmp_path)
+    second = JobManifest.create("b.mp4", jobs_dir=tmp_path)
+
+    first.fail('translate', RuntimeError("out of memory"))
+    second.finish()
+
+    assert [m.id for m in JobManifest.find(status="failed", jobs_dir=tmp_path)] == [first.id]
+    assert not second.directory.exists()
+    assert [m.id for m in JobManifest.find(jobs_dir=tmp_path)] == [first.id]
+
+    failed = JobManifest.load(first.directory)
+    assert failed.data['error'] == {'stage': "translate", 'message': "RuntimeError: out of memory"}
+
+    # Completing a stage again clears the failure
+    failed.complete('translate')
+    assert failed.status == "running" and failed.data['error'] is None
+
+
+def test_unknown_job(tmp_path):
+    with pytest.raises(JobNotFoundError):
+        JobManifest.load("missing", jobs_dir=tmp_path)
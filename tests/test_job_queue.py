@@ -0,0 +1,72 @@
+from core.job_queue import JobQueue
+
+
+def test_jobs_are_taken_in_submission_order(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    first = queue.submit("/videos/a.mp4", {'decoding': "draft"})
+    second = queue.submit("/videos/b.mp4")
+
+    job = queue.take()
+    assert job['id'] == first['id']
+    assert job['status'] == "running"
+    assert job['options'] == {'decoding': "draft"}
+    assert queue.take()['id'] == second['id']
+    assert queue.take() is None
+
+
+def test_finish_and_counts(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    job = queue.submit("/videos/a.mp4")
+    queue.take()
+    queue.finish(job['id'], "done", result={'output_video': "out.mkv"}, progress=1.0)
+
+    done = queue.get(job['id'])
+    assert done['status'] == "done"
+    assert done['result'] == {'output_video': "out.mkv"}
+    assert done['progress'] == 1.0
+    assert queue.counts() == {'done': 1}
+    assert [j['id'] for j in queue.list(status="done")] == [job['id']]
+
+
+def test_cancel(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    queued = queue.submit("/videos/a.mp4")
+    running = queue.submit("/videos/b.mp4")
+    queue.finish(queued['id'], "failed", error="boom")
+
+    assert queue.cancel("missing") is None
+    assert queue.cancel(queued['id']) == "failed"
+
+    queued = queue.submit("/videos/c.mp4")
+    queue.take()
+    assert queue.cancel(running['id']) == "running"
+    assert queue.cancel(queued['id']) == "cancelled"
+    assert queue.get(queued['id'])['status'] == "cancelled"
+
+
+def test_running_jobs_are_queued_again_after_restart(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    job = queue.submit("/videos/a.mp4")
+    queue.take()
+    queue.close()
+
+    reopened = JobQueue(tmp_path / "q.sqlite")
+    assert reopened.get(job['id'])['status'] == "queued"
+    assert reopened.take()['id'] == job['id']
+
+
+def test_requeued_job_is_taken_first(tmp_path):
+    queue = JobQueue(tmp_path / "q.sqlite")
+    first = queue.submit("/videos/a.mp4")
+    second = queue.submit("/videos/b.mp4")
+    queue.take()
+
+    queue.requeue(first['id'], "Worker stopped")
+    job = queue.get(first['id'])
+    assert job['status'] == "queued" and job['message'] == "Worker stopped"
+    assert queue.take()['id'] == first['id']
+
+    # Only running jobs go back to the queue
+    queue.finish(second['id'], "cancelled")
+    queue.requeue(second['id'])
+    assert queue.get(second['id'])['status'] == "cancelled"
@@ -0,0 +1,58 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+import utils.logger
+from utils.logger import Logger
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def progress_log(monkeypatch):
+    monkeypatch.setattr(utils.logger, "LOG_PROGRESS_INTERVAL", 60.0)
+    logger = Logger("progress-test")
+    records = Records()
+    logger.logger.addHandler(records)
+    yield logger, records.messages
+    logger.logger.removeHandler(records)
+    logger._progress_message = None
+    logger._progress_skipped = 0
+
+
+def test_repeated_progress_is_throttled_until_completion(progress_log):
+    logger, messages = progress_log
+    for value in (0.1, 0.2, 0.3, 1.0):
+        logger.progress("Translating", value)
+
+    assert messages == ["Translating 10%", "Translating 100% (2 similar messages suppressed)"]
+
+
+def test_suppressed_updates_are_reported_before_the_next_message(progress_log):
+    logger, messages = progress_log
+    for value in (0.1, 0.2, 0.3):
+        logger.progress("Translating", value)
+    logger.progress("Muxing", 0.5)
+
+    assert messages == ["Translating 10%", "Translating (2 similar messages suppressed)", "Muxing 50%"]
+
+
+def test_messages_reach_the_log_file_through_the_writer_thread():
+    logger = Logger("writer-test")
+    logger.info("Batch %d: %d tokens", 3, 120)
+    logger.debug("Details")
+    handlers = logger.listener.handlers
+    logger.close()
+
+    log_file = next(handler for handler in handlers if isinstance(handler, logging.FileHandler))
+    content = Path(log_file.baseFilename).read_text(encoding="utf-8")
+    assert "writer-test - INFO - Batch 3: 120 tokens" in content
+    assert "writer-test - DEBUG - Details" in content
@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from utils.metrics import PROMETHEUS_PREFIX, Metrics
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    enabled = metrics.enabled
+    metrics.enabled = True
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+    metrics.enabled = enabled
+
+
+def record_run(metrics):
+    with metrics.span("transcribe", job="talk"):
+        metrics.add("audio_seconds", 20)
+    with metrics.span("translate", job="talk") as span:
+        with metrics.span("translate.generate"):
+            metrics.add("tokens_out", 30)
+        span['note'] = "a \"quoted\"\nvalue"
+    metrics.add("queue_wait_seconds", 0.5, stage="mux")
+
+
+def test_counters_are_added_to_the_open_spans(metrics):
+    record_run(metrics)
+    spans = {span['name']: span for span in metrics.spans}
+
+    assert spans['translate']['tokens_out'] == 30
+    assert spans['translate.generate']['tokens_out'] == 30
+    assert 'tokens_out' not in spans['transcribe']
+    assert spans['transcribe']['job'] == "talk"
+    assert {'name': "queue_wait_seconds", 'labels': {'stage': "mux"}, 'value': 0.5} in metrics.counters
+
+    summary = metrics.summary()
+    assert summary['spans']['translate']['count'] == 1
+    assert summary['rtf'] == pytest.approx(spans['transcribe']['seconds'] / 20, abs=1e-4)
+
+
+def test_failed_span_records_the_error(metrics):
+    with pytest.raises(KeyError):
+        with metrics.span("mux"):
+            raise KeyError("stream")
+
+    assert metrics.spans[0]['error'] == "KeyError"
+
+
+def test_export_writes_report_prometheus_and_trace(metrics, tmp_path):
+    record_run(metrics)
+    paths = metrics.export(tmp_path, run_id="test")
+
+    lines = [json.loads(line) for line in Path(paths['report']).read_text(encoding="utf-8").splitlines()]
+    assert [line['type'] for line in lines].count("span") == 3
+    assert lines[-1]['type'] == "summary"
+
+    prometheus = Path(paths['prometheus']).read_text(encoding="utf-8")
+    assert f'{PROMETHEUS_PREFIX}_span_count_total{{span="translate"}} 1' in prometheus
+    assert f'{PROMETHEUS_PREFIX}_tokens_out_total 30' in prometheus
+    assert f'{PROMETHEUS_PREFIX}_queue_wait_seconds_total{{stage="mux"}} 0.5' in prometheus
+    assert f"# TYPE {PROMETHEUS_PREFIX}_real_time_factor gauge" in prometheus
+
+    trace = json.loads(Path(paths['trace']).read_text(encoding="utf-8"))
+    events = [event for event in trace['traceEvents'] if event['ph'] == "X"]
+    assert {event['name'] for event in events} == {"transcribe", "translate", "translate.generate"}
+    assert next(event for event in events if event['name'] == "translate")['args']['note'] == "a \"quoted\"\nvalue"
+    assert any(event['ph'] == "M" for event in trace['traceEvents'])
+
+
+def test_disabled_metrics_record_nothing(metrics):
+    metrics.enabled = False
+    record_run(metrics)
+
+    assert metrics.spans == [] and metrics.counters == []
@@ -0,0 +1,77 @@
+import pytest
+
+from core.model_registry import ModelRegistry
+
+
+class Weights:
+    """Stands in for a tensor: `numel` float32 values at a fixed address"""
+
+    def __init__(self, numel, address):
+        self._numel = numel
+        self._address = address
+
+    def numel(self):
+        return self._numel
+
+    def element_size(self):
+        return 4
+
+    def data_ptr(self):
+        return self._address
+
+
+class Model:
+    def __init__(self, *weights):
+        self.weights = weights
+
+    def state_dict(self):
+        return {f"layer{i}": value for i, value in enumerate(self.weights)}
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    limits = registry.max_models, registry.max_bytes
+    registry.clear()
+    yield registry
+    registry.clear()
+    registry.max_models, registry.max_bytes = limits
+
+
+def test_models_are_loaded_once_per_key(registry):
+    loads = []
+
+    def loader(name):
+        return lambda: loads.append(name) or Model(Weights(1, id(name)))
+
+    first = registry.get(("whisper", "base", "cpu", "float32"), loader("base"))
+    assert registry.get(("whisper", "base", "cpu", "float32"), loader("base")) is first
+    assert registry.get(("whisper", "small", "cpu", "float32"), loader("small")) is not first
+    assert registry.get(("whisper", "base", "cpu", "int8"), loader("base-int8")) is not first
+
+    assert loads == ["base", "small", "base-int8"]
+
+
+def test_least_recently_used_model_is_evicted_first(registry):
+    registry.max_models, registry.max_bytes = 2, 0
+    registry.get(("a",), lambda: Model())
+    registry.get(("b",), lambda: Model())
+    registry.get(("a",), lambda: Model())
+    registry.get(("c",), lambda: Model())
+
+    assert [model['key'] for model in registry.stats()['models']] == [["a"], ["c"]]
+
+
+def test_size_limit_evicts_but_keeps_the_new_model(registry):
+    registry.max_models, registry.max_bytes = 10, 1000
+    registry.get(("a",), lambda: Model(Weights(100, 1)))
+    registry.get(("b",), lambda: Model(Weights(100, 2)))
+    registry.get(("big",), lambda: Model(Weights(500, 3)))
+
+    assert [model['key'] for model in registry.stats()['models']] == [["big"]]
+
+
+def test_shared_weights_are_counted_once():
+    shared = Weights(10, 1)
+    assert ModelRegistry.measure((Model(shared, shared, [Weights(5, 2)]), "tokenizer")) == 60
+    assert ModelRegistry.measure(object()) == 0
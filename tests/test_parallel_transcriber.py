@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from core.parallel_transcriber import ParallelTranscriber
+from settings import AUDIO_RATE
+
+rng = np.random.default_rng(0)
+
+
+def quiet(seconds):
+    return (1e-4 * rng.standard_normal(int(seconds * AUDIO_RATE))).astype(np.float32)
+
+
+def syllables(seconds):
+    """A 500 Hz tone pulsed three times per second, which the VAD takes for speech"""
+    t = np.arange(int(seconds * AUDIO_RATE)) / AUDIO_RATE
+    return (0.3 * np.sin(2 * np.pi * 500 * t) * np.clip(np.sin(2 * np.pi * 3 * t), 0, None)).astype(np.float32)
+
+
+def test_cuts_are_placed_in_pauses():
+    audio = np.concatenate([syllables(3), quiet(1.5), syllables(3), quiet(2), syllables(3), quiet(6), syllables(2)])
+    transcriber = ParallelTranscriber(chunk_seconds=5, vad=True, workers=1)
+    regions = transcriber.detector.detect(audio)
+    chunks = transcriber.split(audio)
+
+    assert len(chunks) > 1
+    assert chunks[0][0] == 0.0 and chunks[-1][1] == len(audio) / AUDIO_RATE
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    for _, cut in chunks[:-1]:
+        assert any(end < cut < start for (_, end), (start, _) in zip(regions, regions[1:]))
+
+
+def test_vad_drops_chunks_without_speech():
+    audio = np.concatenate([syllables(3), quiet(14), syllables(3)])
+    chunks = ParallelTranscriber(chunk_seconds=5, vad=True, workers=1).split(audio)
+
+    assert len(chunks) == 2
+    assert chunks[0][0] == 0.0 and chunks[-1][1] == 20.0
+    assert ParallelTranscriber(chunk_seconds=5, vad=True, workers=1).split(quiet(20)) == []
+
+
+def test_without_vad_all_audio_is_kept():
+    audio = np.concatenate([syllables(3), quiet(14), syllables(3)])
+    transcriber = ParallelTranscriber(chunk_seconds=5, vad=False, workers=1)
+
+    for samples in (audio, quiet(20)):
+        chunks = transcriber.split(samples)
+        assert len(chunks) == 4
+        assert chunks[0][0] == 0.0 and chunks[-1][1] == 20.0
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from core.job import JobManifest
+from core.pipeline import Pipeline, main
+from exceptions.pipeline_exc import JobOptionsError, ManifestError
+from utils.metrics import Metrics
+
+
+def test_collect_videos_reads_manifests_and_drops_duplicates(tmp_path):
+    (tmp_path / "a.mp4").write_bytes(b"")
+    (tmp_path / "b.txt").write_text("# comment\na.mp4\nc.mkv\n", encoding="utf-8")
+
+    videos = Pipeline.collect_videos([str(tmp_path / "b.txt"), str(tmp_path / "a.mp4")])
+    assert videos == [str((tmp_path / "a.mp4").resolve()), str((tmp_path / "c.mkv").resolve())]
+
+
+def test_collect_videos_lists_directories(tmp_path):
+    for name in ("b.mkv", "a.MP4", "notes.txt", "nested/c.mp4"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+
+    assert Pipeline.collect_videos([str(tmp_path)]) == [str(tmp_path / "a.MP4"), str(tmp_path / "b.mkv")]
+    assert Pipeline.collect_videos([str(tmp_path)], recursive=True)[-1] == str(tmp_path / "nested" / "c.mp4")
+
+
+def test_json_manifest(tmp_path):
+    (tmp_path / "list.json").write_text(json.dumps(["a.mp4", "/videos/b.mp4"]), encoding="utf-8")
+    assert Pipeline.read_manifest(str(tmp_path / "list.json")) == [str(tmp_path / "a.mp4"), "/videos/b.mp4"]
+
+    (tmp_path / "bad.json").write_text('{"video": "a.mp4"}', encoding="utf-8")
+    with pytest.raises(ManifestError):
+        Pipeline.read_manifest(str(tmp_path / "bad.json"))
+
+
+def test_no_videos_is_an_error(tmp_path, capsys):
+    assert main(["run", str(tmp_path)]) == 2
+    assert "no videos found" in capsys.readouterr().err
+
+
+def test_resumed_job_restores_completed_stages(tmp_path):
+    pipeline = Pipeline(checkpoints=False, transcription_cache=False)
+    manifest = JobManifest.create(str(tmp_path / "talk.mp4"), jobs_dir=tmp_path)
+    manifest.complete('extract')
+    manifest.complete('transcribe', {'segments_en': [{'text': "Hi.", 'start': 0.0, 'end': 1.0}]})
+
+    job = pipeline.load_job(JobManifest.load(manifest.directory))
+    assert job['video'] == str((tmp_path / "talk.mp4").resolve())
+    assert job['segments_en'] == [{'text': "Hi.", 'start': 0.0, 'end': 1.0}]
+    assert 'segments_fa' not in job
+
+
+def test_stage_outputs_and_failures_are_recorded(tmp_path):
+    pipeline = Pipeline(checkpoints=False, transcription_cache=False)
+    manifest = JobManifest.create(str(tmp_path / "talk.mp4"), jobs_dir=tmp_path)
+    job = pipeline.new_job(manifest.video, manifest=manifest)
+    segments = [{'text': "Hi.", 'start': 0.0, 'end': 1.0}]
+
+    job = pipeline._checkpointed('transcribe', lambda job: {**job, 'segments_en': segments, 'srt_en': None})(job)
+    assert JobManifest.load(manifest.directory).artifacts('transcribe') == {'segments_en': segments}
+
+    def translate(job):
+        raise RuntimeError("out of memory")
+
+    with pytest.raises(RuntimeError):
+        pipeline._checkpointed('translate', translate)(job)
+    assert JobManifest.load(manifest.directory).status == "failed"
+
+
+def test_finished_job_directory_is_removed(tmp_path):
+    pipeline = Pipeline(checkpoints=False, transcription_cache=False)
+    manifest = JobManifest.create(str(tmp_path / "talk.mp4"), jobs_dir=tmp_path)
+    job = pipeline.new_job(manifest.video, manifest=manifest)
+
+    pipeline._checkpointed('mux', lambda job: {**job, 'output_video': str(tmp_path / "talk.mkv")})(job)
+    assert not manifest.directory.exists()
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    pipeline = Pipeline(burn_in=True, bilingual=True, checkpoints=False, transcription_cache=False)
+    manifest = JobManifest.create(str(tmp_path / "talk.mp4"),
+                                  {**pipeline.job_options, 'decoding': "draft", 'subtitles': None},
+                                  jobs_dir=tmp_path)
+    manifest.complete('transcribe', {'segments_en': [{'text': "Hi.", 'start': 0.0, 'end': 1.0}]})
+    return manifest
+
+
+def test_resume_refuses_other_options(manifest):
+    pipeline = Pipeline(checkpoints=False, transcription_cache=False)
+    with pytest.raises(JobOptionsError, match="burn_in"):
+        pipeline.load_job(manifest)
+
+
+def test_resume_with_recorded_options(manifest):
+    options = Pipeline.options_from_manifest(manifest)
+    assert options['burn_in'] is True and options['bilingual'] is True
+
+    pipeline = Pipeline(**options, checkpoints=False, transcription_cache=False)
+    job = pipeline.load_job(manifest)
+
+    assert job['decoding'] == "draft"
+    assert job['segments_en'] == [{'text': "Hi.", 'start': 0.0, 'end': 1.0}]
+
+
+def test_metrics_of_every_resumed_batch_are_exported(manifest, tmp_path, monkeypatch):
+    plain = JobManifest.create(str(tmp_path / "plain.mp4"), jobs_dir=tmp_path)
+    metrics = Metrics()
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+
+    def resume(self, job_refs, queue_size):
+        with self.metrics.span("translate", jobs=len(job_refs)):
+            pass
+        return [{'video': ref, 'timings': {}} for ref in job_refs]
+
+    # The two jobs were started with different options, so each gets its own pipeline
+    monkeypatch.setattr(Pipeline, "resume", resume)
+    try:
+        assert main(["resume", str(manifest.directory), str(plain.directory), "--metrics", str(tmp_path)]) == 0
+    finally:
+        metrics.reset()
+
+    report = next(tmp_path.glob("*.jsonl")).read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)['type'] for line in report].count("span") == 2
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from core.scheduler import Stage, StageScheduler
+
+
+def test_results_keep_input_order():
+    def slow_when_even(item):
+        time.sleep(0.01 if item % 2 == 0 else 0)
+        return item * 10
+
+    scheduler = StageScheduler([Stage('a', slow_when_even, workers=3), Stage('b', lambda item: item + 1)])
+    records = scheduler.run(range(8))
+
+    assert [record['item'] for record in records] == [i * 10 + 1 for i in range(8)]
+    assert all(record['error'] is None for record in records)
+    assert set(records[0]['queue_wait']) == {'a', 'b'}
+
+
+def test_failed_item_stops_at_its_stage_and_others_continue():
+    failed = []
+
+    def check(item):
+        if item == 2:
+            raise ValueError("bad item")
+        return item
+
+    scheduler = StageScheduler(
+        [Stage('check', check), Stage('double', lambda item: item * 2)],
+        on_error=lambda item, stage, e: failed.append((item, stage))
+    )
+    records = scheduler.run([1, 2, 3])
+
+    assert [record['item'] for record in records] == [2, 2, 6]
+    assert records[1]['stage'] == "check"
+    assert isinstance(records[1]['error'], ValueError)
+    assert failed == [(2, "check")]
+
+
+def test_queue_size_bounds_items_between_stages():
+    release = threading.Event()
+    started = []
+
+    def first(item):
+        started.append(item)
+        return item
+
+    def blocked(item):
+        release.wait()
+        return item
+
+    scheduler = StageScheduler([Stage('first', first), Stage('blocked', blocked)], queue_size=1)
+    thread = threading.Thread(target=scheduler.run, args=(range(10),))
+    thread.start()
+    time.sleep(0.2)
+
+    # One item in the blocked stage, one in the queue, one waiting to be put
+    assert len(started) <= 3
+    release.set()
+    thread.join(timeout=5)
+    assert len(started) == 10
+
+
+def test_empty_input():
+    assert StageScheduler([Stage('a', lambda item: item)]).run([]) == []
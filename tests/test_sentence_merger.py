@@ -0,0 +1,48 @@
+from core.sentence_merger import SentenceMerger
+
+
+def segment(text, start, end):
+    return {'text': text, 'start': start, 'end': end}
+
+
+def test_fragments_are_grouped_into_sentences():
+    segments = [
+        segment("The quick brown fox", 0.0, 1.0),
+        segment("jumps over the dog.", 1.1, 2.0),
+        segment("It runs away!", 2.1, 3.0),
+        segment("Then", 3.1, 3.5)
+    ]
+    assert SentenceMerger().group(segments) == [[0, 1], [2], [3]]
+
+
+def test_long_pause_and_token_limit_close_a_group():
+    segments = [segment("one two", 0.0, 1.0), segment("three four", 5.0, 6.0), segment("five six", 6.1, 7.0)]
+
+    assert SentenceMerger(max_gap=1.5).group(segments) == [[0], [1, 2]]
+    assert SentenceMerger(max_tokens=3, max_gap=10).group(segments) == [[0], [1], [2]]
+
+
+def test_sentence_end_with_closing_quote():
+    assert SentenceMerger.is_sentence_end('He said "stop."')
+    assert SentenceMerger.is_sentence_end("Really?)")
+    assert not SentenceMerger.is_sentence_end("and then")
+
+
+def test_merge_text_skips_empty_fragments():
+    segments = [segment(" Hello ", 0, 1), segment("  ", 1, 2), segment("world.", 2, 3)]
+    assert SentenceMerger.merge_text(segments, [0, 1, 2]) == "Hello world."
+
+
+def test_split_follows_weights_and_keeps_every_word():
+    text = "یک دو سه چهار پنج شش"
+    parts = SentenceMerger.split(text, [1, 2])
+
+    assert len(parts) == 2
+    assert " ".join(parts) == text
+    assert len(parts[0]) < len(parts[1])
+
+
+def test_split_gives_each_part_a_word_when_possible():
+    assert SentenceMerger.split("a b c", [100, 0, 0]) == ["a", "b", "c"]
+    assert SentenceMerger.split("a", [1, 1]) == ["a", ""]
+    assert SentenceMerger.split("", [1, 1]) == ["", ""]
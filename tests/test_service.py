@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from core.service import JobService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = JobService(queue_path=tmp_path / "q.sqlite")
+    yield service
+    service.queue.close()
+
+
+def request(service, raw: bytes) -> bytes:
+    """Send a raw request to the HTTP handler and return the response"""
+    async def exchange():
+        server = await asyncio.start_server(service._handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    return asyncio.run(exchange())
+
+
+@pytest.mark.parametrize("length", ["-5", "abc"])
+def test_bad_content_length_is_rejected(service, length):
+    response = request(service, f"POST /jobs HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+    assert response.startswith(b"HTTP/1.1 400 ")
+
+
+def test_too_large_body_is_rejected(service):
+    response = request(service, b"POST /jobs HTTP/1.1\r\nContent-Length: 999999999\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 413 ")
+
+
+def test_invalid_submissions(service):
+    body = b'{"video": "/no/such/video.mp4"}'
+    response = request(service, b"POST /jobs HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+    assert response.startswith(b"HTTP/1.1 400 ")
+
+    response = request(service, b"POST /jobs HTTP/1.1\r\nContent-Length: 3\r\n\r\n[1]")
+    assert response.startswith(b"HTTP/1.1 400 ")
+
+
+def test_unknown_job_and_route(service):
+    assert request(service, b"GET /jobs/missing HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 404 ")
+    assert request(service, b"GET /nothing HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 404 ")
+    assert request(service, b"PUT /jobs HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 405 ")
+
+
+@pytest.mark.parametrize("subtitles", [5, ["talk.srt"], ""])
+def test_subtitles_must_be_a_path(service, tmp_path, subtitles):
+    video = tmp_path / "talk.mp4"
+    video.write_bytes(b"video")
+
+    status, body = service.submit({'video': str(video), 'subtitles': subtitles})
+    assert status == 400 and "subtitles" in body['error']
@@ -0,0 +1,54 @@
+import pytest
+
+from core.subtitle_generator import SubtitleGenerator
+from core.subtitle_reader import SubtitleReader
+
+SEGMENTS = [
+    {'text': "Hello & you", 'start': 0.0, 'end': 1.5},
+    {'text': "Second line", 'start': 3661.25, 'end': 3662.0}
+]
+
+
+@pytest.mark.parametrize("subtitle_format", ["srt", "vtt"])
+def test_written_files_read_back(tmp_path, subtitle_format):
+    path = SubtitleGenerator().generate(SEGMENTS, str(tmp_path / f"out.{subtitle_format}"))
+    assert SubtitleReader().read(path) == SEGMENTS
+
+
+def test_vtt_markup_is_unescaped(tmp_path):
+    path = SubtitleGenerator().generate([{'text': "a <b> & c", 'start': 0, 'end': 1}], str(tmp_path / "out.vtt"))
+    assert SubtitleReader().read(path)[0]['text'] == "a <b> & c"
+
+
+def test_direction_marks_are_removed(tmp_path):
+    path = SubtitleGenerator().generate([{'text': "سلام", 'start': 0, 'end': 1}], str(tmp_path / "fa.srt"),
+                                        language="fa")
+    assert SubtitleReader().read(path)[0]['text'] == "سلام"
+
+
+def test_bilingual_cue_keeps_both_lines(tmp_path):
+    path = SubtitleGenerator().create_bilingual(
+        [{'text': "Hi", 'start': 0, 'end': 1}], [{'text': "سلام", 'start': 0, 'end': 1}], str(tmp_path / "bi.srt")
+    )
+    assert SubtitleReader().read(path)[0]['text'] == "Hi\nسلام"
+
+
+def test_parse_ignores_headers_tags_and_settings():
+    content = (
+        "﻿WEBVTT\n\nNOTE a comment\n\n"
+        "2\n00:00:02.000 --> 00:00:03.000 align:start\n<i>Second</i> {\\an8}cue\n\n"
+        "1\n00:01.000 --> 00:01.500\nFirst &amp; only\n\n"
+        "3\n00:00:04,000 --> 00:00:05,000\n\n"
+    )
+    assert SubtitleReader().parse(content) == [
+        {'text': "First & only", 'start': 1.0, 'end': 1.5},
+        {'text': "Second cue", 'start': 2.0, 'end': 3.0}
+    ]
+
+
+def test_sidecar_file_is_found(tmp_path):
+    video = tmp_path / "talk.mp4"
+    video.write_bytes(b"")
+    (tmp_path / "talk.en.srt").write_text("1\n00:00:00,000 --> 00:00:01,000\nHi\n", encoding="utf-8")
+
+    assert SubtitleReader().find(str(video)) == {'path': str(tmp_path / "talk.en.srt"), 'stream': None}
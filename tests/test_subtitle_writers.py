@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+
+from core.subtitle_generator import SubtitleGenerator
+from core.subtitle_writers import RTL_START, RTL_END, SubtitleWriter, get_writer
+
+
+def test_timestamps():
+    assert get_writer("a.srt").timestamp(3661.25) == "01:01:01,250"
+    assert get_writer("a.vtt").timestamp(3661.25) == "01:01:01.250"
+    assert get_writer("a.ass").timestamp(3661.256) == "1:01:01.26"
+    assert get_writer("a.srt").timestamp(-1) == "00:00:00,000"
+
+
+def test_srt_cues_are_numbered(tmp_path):
+    segments = [{'text': "One", 'start': 0, 'end': 1.5}, {'text': "Two\nlines", 'start': 2, 'end': 3}]
+    SubtitleGenerator().generate(segments, str(tmp_path / "out.srt"))
+
+    assert (tmp_path / "out.srt").read_text(encoding="utf-8") == (
+        "1\n00:00:00,000 --> 00:00:01,500\nOne\n\n"
+        "2\n00:00:02,000 --> 00:00:03,000\nTwo\nlines\n\n"
+    )
+
+
+def test_rtl_lines_are_embedded(tmp_path):
+    SubtitleGenerator().generate([{'text': "سلام\nدنیا", 'start': 0, 'end': 1}], str(tmp_path / "fa.srt"),
+                                 language="fa")
+    content = (tmp_path / "fa.srt").read_text(encoding="utf-8")
+
+    assert f"{RTL_START}سلام{RTL_END}\n{RTL_START}دنیا{RTL_END}" in content
+
+
+def test_vtt_escapes_markup(tmp_path):
+    SubtitleGenerator().generate([{'text': "a <b> & c", 'start': 0, 'end': 1}], str(tmp_path / "out.vtt"))
+    content = (tmp_path / "out.vtt").read_text(encoding="utf-8")
+
+    assert content.startswith("WEBVTT\n\n")
+    assert "a &lt;b&gt; &amp; c" in content
+
+
+def test_ass_escapes_override_braces(tmp_path):
+    SubtitleGenerator().generate([{'text': "a {b}\nc", 'start': 0, 'end': 1}], str(tmp_path / "out.ass"))
+    content = (tmp_path / "out.ass").read_text(encoding="utf-8")
+
+    assert content.startswith("[Script Info]")
+    assert content.endswith("Dialogue: 0,0:00:00.00,0:00:01.00,Default,,0,0,0,,a (b)\\Nc\n")
+
+
+def test_bilingual_cue_has_both_languages(tmp_path):
+    SubtitleGenerator().create_bilingual(
+        [{'text': "Hi", 'start': 0, 'end': 1}], [{'text': "سلام", 'start': 0, 'end': 1}], str(tmp_path / "bi.srt")
+    )
+    assert f"Hi\n{RTL_START}سلام{RTL_END}\n" in (tmp_path / "bi.srt").read_text(encoding="utf-8")
+
+
+def test_streamed_cues_are_on_disk_before_the_next_segment(tmp_path):
+    path = tmp_path / "live.srt"
+    segments = [{'text': "First", 'start': 0, 'end': 1}, {'text': "Second", 'start': 1, 'end': 2}]
+    stream = SubtitleGenerator().stream(segments, str(path))
+
+    next(stream)
+    assert path.read_text(encoding="utf-8").endswith("First\n\n")
+    assert [segment['text'] for segment in stream] == ["Second"]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_writer("out.txt")
+
+
+def test_render_matches_the_written_file(tmp_path):
+    segments = [{'text': "سلام", 'start': 0, 'end': 1}, {'text': "دنیا", 'start': 1, 'end': 2}]
+    path = SubtitleGenerator().generate(segments, str(tmp_path / "fa.vtt"), language="fa")
+
+    assert "".join(get_writer("pipe.vtt", language="fa").render(segments)) == Path(path).read_text(encoding="utf-8")
+
+
+def test_writer_must_implement_timestamp_and_cue():
+    class Incomplete(SubtitleWriter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("out.x")
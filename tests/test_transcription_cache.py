@@ -0,0 +1,25 @@
+from core.transcription_cache import TranscriptionCache
+
+
+def test_round_trip_and_settings_in_the_key(tmp_path):
+    cache = TranscriptionCache(tmp_path)
+    key = TranscriptionCache.make_key("fingerprint", "base", "en", {'vad': False})
+    segments = [{'text': "Hello", 'start': 0.0, 'end': 1.0}]
+
+    assert cache.get(key) is None
+    cache.put(key, segments)
+    assert cache.get(key) == segments
+    assert TranscriptionCache(tmp_path).get(key) == segments
+
+    assert key != TranscriptionCache.make_key("fingerprint", "base", "en", {'vad': True})
+    assert key != TranscriptionCache.make_key("fingerprint", "small", "en", {'vad': False})
+    assert key != TranscriptionCache.make_key("other", "base", "en", {'vad': False})
+
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    cache = TranscriptionCache(tmp_path)
+    key = TranscriptionCache.make_key("fingerprint", "base", "en", {})
+    cache.put(key, [])
+
+    cache._path(key).write_text("{", encoding="utf-8")
+    assert cache.get(key) is None
@@ -0,0 +1,87 @@
+import time
+
+from core.translation_cache import TranslationCache
+
+# Every entry in these tests is 20 bytes; the limit holds two of them
+TWO_ENTRIES_MB = 45 / (1024 * 1024)
+
+
+def last_used(cache, key):
+    return cache._db.execute("SELECT last_used FROM translations WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_round_trip_and_normalized_keys(tmp_path):
+    cache = TranslationCache(tmp_path / "t.sqlite")
+    key = TranslationCache.make_key("Hello   world", "m2m100", "fa", {'num_beams': 1})
+
+    assert key == TranslationCache.make_key(" Hello world ", "m2m100", "fa", {'num_beams': 1})
+    assert key != TranslationCache.make_key("Hello world", "m2m100", "fa", {'num_beams': 4})
+
+    cache.put(key, "Hello world", "سلام دنیا")
+    assert cache.get(key) == "سلام دنیا"
+    assert cache.get("missing") is None
+
+    # A new instance reads from SQLite
+    cache.close()
+    assert TranslationCache(tmp_path / "t.sqlite").get(key) == "سلام دنیا"
+
+
+def test_get_many_and_put_many(tmp_path):
+    cache = TranslationCache(tmp_path / "t.sqlite")
+    cache.put_many({'a': ("one", "یک"), 'b': ("two", "دو")})
+
+    assert cache.get_many(["a", "b", "c"]) == {'a': "یک", 'b': "دو"}
+    assert cache.get_many([]) == {}
+
+
+def test_oldest_entry_is_evicted_above_the_limit(tmp_path):
+    cache = TranslationCache(tmp_path / "t.sqlite", max_mb=TWO_ENTRIES_MB)
+    for key in "abc":
+        cache.put(key, key * 10, key.upper() * 10)
+        time.sleep(0.01)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "B" * 10
+    assert cache.get("c") == "C" * 10
+
+
+def test_memory_hits_refresh_last_used(tmp_path):
+    cache = TranslationCache(tmp_path / "t.sqlite")
+    cache.put("a", "source", "translation")
+    before = last_used(cache, "a")
+
+    time.sleep(0.01)
+    assert cache.get("a") == "translation"
+    assert last_used(cache, "a") > before
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = TranslationCache(tmp_path / "t.sqlite", memory_items=10, max_mb=TWO_ENTRIES_MB)
+    cache.put("a", "a" * 10, "A" * 10)
+    time.sleep(0.01)
+    cache.put("b", "b" * 10, "B" * 10)
+    time.sleep(0.01)
+
+    # "a" is used from memory, so "b" is now the oldest
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", "c" * 10, "C" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" * 10
+    assert cache.get("c") == "C" * 10
+
+
+def test_eviction_counts_entries_of_other_instances(tmp_path):
+    path = tmp_path / "t.sqlite"
+    first = TranslationCache(path, max_mb=TWO_ENTRIES_MB)
+    second = TranslationCache(path, max_mb=TWO_ENTRIES_MB)
+
+    first.put("a", "a" * 10, "A" * 10)
+    time.sleep(0.01)
+    second.put("b", "b" * 10, "B" * 10)
+    time.sleep(0.01)
+    first.put("c", "c" * 10, "C" * 10)
+
+    keys = [row[0] for row in first._db.execute("SELECT key FROM translations ORDER BY key")]
+    assert keys == ["b", "c"]
@@ -0,0 +1,52 @@
+import pytest
+
+import core.translator
+from core.translator import Translator
+from exceptions.translator_exc import UnsupportedProfileError
+from settings import MAX_TRANSLATION_LENGTH, TRANSLATION_PROFILE
+
+
+def test_batches_group_similar_lengths(monkeypatch):
+    monkeypatch.setattr(core.translator, "TRANSLATION_TOKEN_BUDGET", 40)
+    monkeypatch.setattr(core.translator, "BATCH_SIZE", 3)
+    lengths = [10, 2, 9, 3, 20, 1, 2]
+
+    batches = Translator._make_batches(lengths)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    assert batches == [[5, 1, 6], [3, 2, 0], [4]]
+    for batch in batches:
+        assert len(batch) <= 3
+        assert max(lengths[i] for i in batch) * len(batch) <= 40
+
+
+def test_long_line_gets_a_batch_of_its_own(monkeypatch):
+    monkeypatch.setattr(core.translator, "TRANSLATION_TOKEN_BUDGET", 16)
+
+    assert Translator._make_batches([100, 4, 4]) == [[1, 2], [0]]
+    assert Translator._make_batches([]) == []
+
+
+def test_profiles_by_name_and_as_dict():
+    assert Translator.resolve_profile("draft") == {'num_beams': 1, 'length_ratio': 1.6, 'length_margin': 8}
+    assert Translator.resolve_profile(None) == Translator.resolve_profile(TRANSLATION_PROFILE)
+    assert Translator.resolve_profile({'num_beams': 3}) == {'num_beams': 3, 'length_ratio': None, 'length_margin': 0}
+    assert Translator.resolve_profile("greedy")['num_beams'] == 1
+    assert Translator.resolve_profile("beam-6")['num_beams'] == 6
+
+
+@pytest.mark.parametrize("profile", ["fastest", "beam-", "beam-x", {'num_beams': 0}, {'length_ratio': 2.0}])
+def test_unknown_profiles_are_rejected(profile):
+    with pytest.raises(UnsupportedProfileError):
+        Translator.resolve_profile(profile)
+
+
+def test_generation_budget_follows_the_source_length():
+    draft = Translator.resolve_profile("draft")
+    assert Translator.generation_params(draft, 10) == {'num_beams': 1, 'max_new_tokens': 24}
+    assert Translator.generation_params(draft, 10_000) == {'num_beams': 1, 'max_new_tokens': MAX_TRANSLATION_LENGTH}
+
+    fixed = Translator.resolve_profile({'num_beams': 4})
+    assert Translator.generation_params(fixed, 10) == {
+        'num_beams': 4, 'early_stopping': True, 'max_length': MAX_TRANSLATION_LENGTH
+    }
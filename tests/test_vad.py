@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from core.vad import VoiceActivityDetector
+from settings import AUDIO_RATE
+
+rng = np.random.default_rng(0)
+
+
+def quiet(seconds):
+    return (1e-4 * rng.standard_normal(int(seconds * AUDIO_RATE))).astype(np.float32)
+
+
+def syllables(seconds):
+    """A 500 Hz tone pulsed three times per second, loud and modulated like speech"""
+    t = np.arange(int(seconds * AUDIO_RATE)) / AUDIO_RATE
+    return (0.3 * np.sin(2 * np.pi * 500 * t) * np.clip(np.sin(2 * np.pi * 3 * t), 0, None)).astype(np.float32)
+
+
+def test_speech_regions_are_found_between_silences():
+    audio = np.concatenate([quiet(2), syllables(2), quiet(2), syllables(1.5), quiet(2)])
+    regions = VoiceActivityDetector().detect(audio)
+
+    assert len(regions) == 2
+    assert regions[0] == pytest.approx((2.0, 4.0), abs=0.3)
+    assert regions[1] == pytest.approx((6.0, 7.5), abs=0.3)
+
+
+def test_silence_noise_and_steady_tones_are_not_speech():
+    detector = VoiceActivityDetector()
+    t = np.arange(5 * AUDIO_RATE) / AUDIO_RATE
+
+    assert detector.detect(quiet(3)) == []
+    assert detector.detect(np.zeros(10, dtype=np.float32)) == []
+    assert detector.detect(np.concatenate([quiet(1), 0.3 * rng.standard_normal(5 * AUDIO_RATE).astype(np.float32),
+                                           quiet(1)])) == []
+
+    # A sustained tone lacks the loudness modulation of speech
+    tone = np.concatenate([quiet(1), (0.3 * np.sin(2 * np.pi * 500 * t)).astype(np.float32), quiet(1)])
+    assert not any(start < 3.5 < end for start, end in detector.detect(tone))
+
+
+def test_compact_and_remap_restore_the_original_timeline():
+    audio = np.arange(10 * AUDIO_RATE, dtype=np.float32)
+    compact, region_map = VoiceActivityDetector.compact(audio, [(1.0, 2.0), (5.0, 7.0)])
+
+    assert len(compact) == 3 * AUDIO_RATE
+    assert compact[AUDIO_RATE] == audio[5 * AUDIO_RATE]
+    assert region_map == [(0.0, 1.0, 1.0), (1.0, 5.0, 2.0)]
+
+    segments = [
+        {'text': "a", 'start': 0.5, 'end': 1.5, 'words': [{'word': "a", 'start': 0.5, 'end': 1.5}]},
+        {'text': "b", 'start': 2.0, 'end': 4.0}
+    ]
+    VoiceActivityDetector.remap(segments, region_map)
+
+    assert (segments[0]['start'], segments[0]['end']) == (1.5, 5.5)
+    assert segments[0]['words'][0] == {'word': "a", 'start': 1.5, 'end': 5.5}
+    # Times past the last region stay inside it
+    assert (segments[1]['start'], segments[1]['end']) == (6.0, 7.0)
+
+
+def test_no_regions():
+    compact, region_map = VoiceActivityDetector.compact(np.ones(AUDIO_RATE, dtype=np.float32), [])
+    assert len(compact) == 0 and region_map == []
+
+    segments = [{'text': "a", 'start': 1.0, 'end': 2.0}]
+    assert VoiceActivityDetector.remap(segments, []) == [{'text': "a", 'start': 1.0, 'end': 2.0}]
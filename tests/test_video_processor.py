@@ -0,0 +1,20 @@
+from core.video_processor import VideoProcessor
+
+KEYFRAMES = [0.0, 2.0, 4.0, 10.0, 31.0, 33.0, 58.0, 61.0, 89.0, 92.0, 120.0]
+
+
+def test_cuts_are_at_the_keyframes_closest_to_an_equal_split():
+    assert VideoProcessor.split_points(KEYFRAMES, 120.0, 4, min_segment=20) == [0.0, 31.0, 61.0, 89.0]
+    assert VideoProcessor.split_points(KEYFRAMES, 120.0, 2, min_segment=20) == [0.0, 61.0]
+
+
+def test_short_videos_and_missing_keyframes_stay_in_one_piece():
+    assert VideoProcessor.split_points(KEYFRAMES, 120.0, 1, min_segment=20) == [0.0]
+    assert VideoProcessor.split_points(KEYFRAMES, 50.0, 4, min_segment=30) == [0.0]
+    assert VideoProcessor.split_points([], 120.0, 4, min_segment=20) == [0.0]
+
+
+def test_cuts_that_would_leave_a_short_chunk_are_skipped():
+    # The only keyframes are at the very start and end
+    assert VideoProcessor.split_points([0.0, 1.0, 2.0, 118.0], 120.0, 4, min_segment=20) == [0.0]
+    assert VideoProcessor.split_points([0.0, 25.0, 105.0], 120.0, 3, min_segment=20) == [0.0, 25.0]
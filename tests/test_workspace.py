@@ -0,0 +1,65 @@
+import os
+import time
+
+import pytest
+
+import core.workspace
+from core.workspace import Workspace
+from exceptions.pipeline_exc import InsufficientSpaceError
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.workspace, "TEMP_DIR", tmp_path / "temp")
+    monkeypatch.setattr(core.workspace, "TMPFS_ROOT", tmp_path / "shm")
+    return tmp_path / "temp"
+
+
+def age(directory, hours):
+    past = time.time() - hours * 3600
+    os.utime(directory, (past, past))
+
+
+def test_workspaces_are_private_and_removed_on_exit(temp_dir):
+    with Workspace.create("my talk.mp4", tmpfs=False) as first, Workspace.create("my talk.mp4", tmpfs=False) as second:
+        assert first.directory != second.directory
+        assert first.directory.parent == temp_dir
+        assert first.directory.name.startswith(Workspace.PREFIX)
+        first.path("audio.wav").write_bytes(b"data")
+
+    assert not first.directory.exists() and not second.directory.exists()
+
+
+def test_only_old_workspaces_are_stale(temp_dir):
+    temp_dir.mkdir()
+    old = temp_dir / f"{Workspace.PREFIX}old"
+    new = temp_dir / f"{Workspace.PREFIX}new"
+    other = temp_dir / "other"
+    for directory in (old, new, other):
+        directory.mkdir()
+    age(old, 48)
+    age(other, 48)
+
+    assert Workspace.remove_stale(max_age_hours=24) == 1
+    assert not old.exists() and new.exists() and other.exists()
+
+
+def test_space_check(tmp_path):
+    Workspace.check_space({tmp_path: 0})
+    with pytest.raises(InsufficientSpaceError):
+        Workspace.check_space({tmp_path: 1 << 60})
+
+
+def test_workspace_in_use_is_never_stale(temp_dir):
+    workspace = Workspace.create("talk", tmpfs=False)
+    age(workspace.directory, 48)
+
+    assert Workspace.in_use(workspace.directory)
+    assert Workspace.remove_stale(max_age_hours=24) == 0
+    assert workspace.directory.exists()
+
+    # The lock goes away with the process that held it
+    workspace._lock_file.close()
+    assert not Workspace.in_use(workspace.directory)
+    assert Workspace.remove_stale(max_age_hours=24) == 1
+    assert not workspace.directory.exists()
@@ -4,13 +4,8 @@ from tkinter import filedialog, messagebox
 
 import customtkinter as ctk
 
-from settings import PROJECT_NAME, TEMP_DIR
-from core.audio_extractor import AudioExtractor
-from core.subtitle_generator import SubtitleGenerator
-from core.transcriber import Transcriber
-from core.translator import Translator
-from core.video_processor import VideoProcessor
-from utils.file_handler import FileHandler
+from settings import PROJECT_NAME, PRELOAD_MODELS, TRANSLATION_PROFILES, TRANSLATION_PROFILE
+from core.pipeline import Pipeline
 from utils.logger import Logger
 
 
@@ -34,17 +29,16 @@ class MainWindow(ctk.CTk):
         self.processing = False
 
         # Main components
-        self.audio_extractor = AudioExtractor()
-        self.transcriber = Transcriber()
-        self.translator = Translator()
-        self.subtitle_gen = SubtitleGenerator()
-        self.video_processor = VideoProcessor()
+        self.pipeline = Pipeline()
 
         # Logger
         self.logger = Logger()
 
         self.setup_ui()
 
+        if PRELOAD_MODELS:
+            self.warm_up_models()
+
     def setup_ui(self):
         """Building the user interface"""
 
@@ -100,7 +94,8 @@ class MainWindow(ctk.CTk):
         self.whisper_model = ctk.CTkOptionMenu(
             whisper_frame,
             values=["tiny", "base", "small", "medium", "large"],
-            width=150
+            width=150,
+            command=self.on_model_change
         )
         self.whisper_model.set("base")
         self.whisper_model.pack(side="right", padx=10)
@@ -121,11 +116,30 @@ class MainWindow(ctk.CTk):
                 "M2M100 418M (m2m100_418M)",
                 "M2M100 1.2B (m2m100_1.2B)"
             ],
-            width=250
+            width=250,
+            command=self.on_model_change
         )
         self.translation_model.set("M2M100 418M (m2m100_418M)")
         self.translation_model.pack(side="right", padx=10)
 
+        # Choosing a decoding profile (draft is fastest, quality is best)
+        decoding_frame = ctk.CTkFrame(settings_frame)
+        decoding_frame.pack(pady=10, padx=20, fill="x")
+
+        ctk.CTkLabel(
+            decoding_frame,
+            text="Translation quality:",
+            font=ctk.CTkFont(size=12)
+        ).pack(side="left", padx=10)
+
+        self.decoding_profile = ctk.CTkOptionMenu(
+            decoding_frame,
+            values=list(TRANSLATION_PROFILES),
+            width=150
+        )
+        self.decoding_profile.set(TRANSLATION_PROFILE)
+        self.decoding_profile.pack(side="right", padx=10)
+
         # Checkboxes
         options_frame = ctk.CTkFrame(settings_frame)
         options_frame.pack(pady=10, padx=20, fill="x")
@@ -146,6 +160,13 @@ class MainWindow(ctk.CTk):
         self.embed_subtitles.pack(pady=5)
         self.embed_subtitles.select()
 
+        self.import_subtitles = ctk.CTkCheckBox(
+            options_frame,
+            text="Use existing English subtitles",
+            font=ctk.CTkFont(size=12)
+        )
+        self.import_subtitles.pack(pady=5)
+
         # Progress bar
         self.progress_bar = ctk.CTkProgressBar(self, width=260)
         self.progress_bar.pack(pady=10)
@@ -186,6 +207,29 @@ class MainWindow(ctk.CTk):
             self.file_label.configure(text=Path(file_path).name)
             self.process_btn.configure(state="normal")
 
+    def on_model_change(self, _value: str):
+        """Preload a newly selected model"""
+        if PRELOAD_MODELS and not self.processing:
+            self.warm_up_models()
+
+    def warm_up_models(self):
+        """Load the selected models on a background thread while the user picks a file"""
+        self.pipeline.transcriber.model_name = self.whisper_model.get()
+        self.pipeline.translator.model_name = self.translation_model.get()
+
+        self.status_label.configure(text="Loading models in background ...")
+        self.pipeline.warm_up(on_done=lambda error: self.after(0, self._warm_up_done, error))
+
+    def _warm_up_done(self, error):
+        """Update UI from main thread once the models are loaded"""
+        if self.processing:
+            return
+
+        if error is None:
+            self.status_label.configure(text="Ready")
+        else:
+            self.status_label.configure(text="Models will be loaded when processing starts")
+
     def update_status(self, message: str, progress: float):
         """Status and progress updates"""
         self.after(0, self._update_status_ui, message, progress)
@@ -197,7 +241,7 @@ class MainWindow(ctk.CTk):
 
         progress_percent = int(progress * 100)
         self.title(f"{PROJECT_NAME} - {progress_percent}%")
-        self.logger.info(message)
+        self.logger.progress(message, progress)
 
     def start_processing(self):
         """Start processing in a separate thread"""
@@ -228,75 +272,18 @@ class MainWindow(ctk.CTk):
     def process_video(self):
         """Full video processing"""
         try:
-            video_name = Path(self.video_path).stem
-
-            # 1. Sound extraction (0-20%)
-            self.update_status("Extracting audio ...", 0.0)
-            audio_path = self.audio_extractor.extract(self.video_path)
-            self.update_status("Audio extracted", 0.2)
-
-            # 2. Transcription (20-50%)
-            self.update_status("Converting speech to text ...", 0.2)
-            self.transcriber.model_name = self.whisper_model.get()
-            transcription = self.transcriber.transcribe(audio_path)
-            segments_en = self.transcriber.get_segments(transcription)
-            self.update_status("Transcription completed", 0.5)
-
-            # 3. Save English subtitles
-            srt_en_path = TEMP_DIR / f"{video_name}_en.srt"
-            self.subtitle_gen.generate_srt(segments_en, str(srt_en_path))
-
-            # 4. Translation (50-80%)
-            self.update_status("Translating into Persian ...", 0.5)
-            self.translator.model_name = self.translation_model.get()
-
-            texts_en = [seg['text'] for seg in segments_en]
-            texts_fa = self.translator.translate_batch(texts_en)
-
-            # Creating Persian segments
-            segments_fa = []
-            for seg_en, text_fa in zip(segments_en, texts_fa):
-                segments_fa.append({
-                    'text': text_fa,
-                    'start': seg_en['start'],
-                    'end': seg_en['end']
-                })
-
-            self.update_status("Translation completed", 0.8)
-
-            # 5. Save Persian subtitles
-            srt_fa_path = TEMP_DIR / f"{video_name}_fa.srt"
-            self.subtitle_gen.generate_srt(segments_fa, str(srt_fa_path))
-
-            # 6. Bilingual subtitles (optional)
-            if self.create_bilingual.get():
-                srt_bilingual_path = TEMP_DIR / f"{video_name}_bilingual.srt"
-                self.subtitle_gen.create_bilingual_srt(
-                    segments_en,
-                    segments_fa,
-                    str(srt_bilingual_path)
-                )
-
-            # 7. Add subtitles to the video (80-100%)
-            output_video = ""
-            if self.embed_subtitles.get():
-                self.update_status("Adding subtitles to video ...", 0.8)
-
-                subtitle_paths = {
-                    'eng': str(srt_en_path),
-                    'per': str(srt_fa_path)
-                }
-
-                output_video = self.video_processor.add_subtitles(
-                    self.video_path,
-                    subtitle_paths,
-                    f"{video_name}_subtitled.mkv"
-                )
-
-            self.update_status("Processing complete! ✓", 1.0)
+            self.pipeline.transcriber.model_name = self.whisper_model.get()
+            self.pipeline.translator.model_name = self.translation_model.get()
+            self.pipeline.bilingual = bool(self.create_bilingual.get())
+            self.pipeline.embed_subtitles = bool(self.embed_subtitles.get())
+            self.pipeline.import_subtitles = bool(self.import_subtitles.get())
+
+            result = self.pipeline.process(self.video_path, progress=self.update_status,
+                                           decoding=self.decoding_profile.get())
 
             # Show success message
-            self.after(100, self._show_success, srt_en_path, srt_fa_path, Path(output_video))
+            self.after(100, self._show_success,
+                       Path(result['srt_en']), Path(result['srt_fa']), Path(result['output_video'] or ""))
 
         except RuntimeError as e:
             self.update_status(f"Error: Please try again", 0.0)
@@ -314,10 +301,6 @@ class MainWindow(ctk.CTk):
             self.processing = False
             self.process_btn.configure(state="normal")
             self.disable_controls(False)
-            try:
-                FileHandler.clean_temp_files()
-            except RuntimeError as e:
-                self.logger.error(str(e))
 
     def disable_controls(self, disabled: bool):
         """Enable/disable UI controls during processing"""
@@ -327,7 +310,9 @@ class MainWindow(ctk.CTk):
             self.select_btn,
             self.whisper_model,
             self.translation_model,
-            self.embed_subtitles
+            self.decoding_profile,
+            self.embed_subtitles,
+            self.import_subtitles
         ]
 
         for control in controls:
@@ -1,9 +1,8 @@
+import hashlib
 import shutil
 from pathlib import Path
 from typing import Union, List
 
-from settings import TEMP_DIR
-
 
 class FileHandler:
     """File management utilities for temporary files and file operations"""
@@ -34,23 +33,27 @@ class FileHandler:
         return f"{size:.2f} {units[unit_index]}"
 
     @staticmethod
-    def clean_temp_files() -> int:
-        """Clear all temporary files and directories"""
-        if not TEMP_DIR.exists():
-            return 0
-
-        deleted_count = 0
-        for item in TEMP_DIR.glob("*"):
-            try:
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    shutil.rmtree(item)
-                deleted_count += 1
-            except Exception as e:
-                raise RuntimeError(f"Error deleting {item}: {e}")
-
-        return deleted_count
+    def fingerprint(file_path: Union[str, Path], sample_size: int = 1 << 20) -> str:
+        """
+        Fast content fingerprint of a file
+
+        Hashes the size plus samples from the start, middle and end, so large
+        videos are identified without reading them fully and copies of the
+        same file get the same fingerprint.
+        """
+        path = Path(file_path)
+        size = FileHandler.get_file_size(path)
+
+        digest = hashlib.sha256(str(size).encode())
+        with open(path, 'rb') as f:
+            if size <= 3 * sample_size:
+                digest.update(f.read())
+            else:
+                for offset in (0, size // 2 - sample_size // 2, size - sample_size):
+                    f.seek(offset)
+                    digest.update(f.read(sample_size))
+
+        return digest.hexdigest()
 
     @staticmethod
     def ensure_directory(path: Union[str, Path]) -> Path:
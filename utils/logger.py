@@ -1,11 +1,52 @@
+import atexit
+import copy
 import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from settings import PROJECT_NAME, OUTPUT_DIR, DEBUG
+from settings import (
+    PROJECT_NAME, OUTPUT_DIR, DEBUG, LOG_LEVEL, LOG_MAX_MB, LOG_BACKUP_COUNT, LOG_PROGRESS_INTERVAL
+)
+
+# Log queue of the parent process, set in worker processes by Logger.connect
+_parent_queue = None
+
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that leaves formatting (time, level, name) to the writer thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the arguments are merged here, since they may change after the call
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 
 class Logger:
-    """Logging system"""
+    """
+    Logging system
+
+    Messages are put on a queue and written to the console and the daily log
+    file by a background thread, so callers never wait for disk or terminal
+    I/O. The log file is rotated by size. Pass arguments separately to skip
+    formatting when the level is disabled:
+
+        logger.debug("Batch %d: %d tokens", index, tokens)
+
+    Only one process may rotate the file, so worker processes send their
+    records to the parent: pass `Logger().process_queue()` to the worker and
+    call `Logger.connect(queue)` there first. Child processes that are not
+    connected write to a file of their own.
+    """
 
     _instances = {}
 
@@ -19,21 +60,39 @@ class Logger:
             return
 
         self.logger = logging.getLogger(name)
+        self.listener = None
+        self._handlers = ()
+        self._process_queue = None
+        self._process_listener = None
+
+        # Progress updates are logged at most every LOG_PROGRESS_INTERVAL seconds
+        self._progress_lock = threading.Lock()
+        self._progress_message = None
+        self._progress_time = 0.0
+        self._progress_skipped = 0
 
         if not DEBUG:
             self.logger.disabled = True
             self._initialized = True
             return
 
-        if not self.logger.handlers:
-            self.logger.setLevel(logging.DEBUG)
+        if not self.logger.handlers and _parent_queue is not None:
+            # Worker process: the parent writes the records
+            self.logger.setLevel(LOG_LEVEL)
+            self.logger.addHandler(_QueueHandler(_parent_queue))
+            self.logger.propagate = False
+
+        elif not self.logger.handlers:
+            self.logger.setLevel(LOG_LEVEL)
 
             # Log directory
             log_dir = OUTPUT_DIR / "logs"
             log_dir.mkdir(exist_ok=True)
 
-            # Log file with date
+            # Log file with date; unconnected child processes must not rotate the parent's file
             log_file = log_dir / f"log_{datetime.now().strftime('%Y%m%d')}.log"
+            if multiprocessing.parent_process() is not None:
+                log_file = log_file.with_name(f"{log_file.stem}_{os.getpid()}.log")
 
             # Format
             formatter = logging.Formatter(
@@ -41,8 +100,13 @@ class Logger:
                 datefmt='%Y-%m-%d %H:%M:%S'
             )
 
-            # File Handler
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            # File Handler, rotated to log_YYYYMMDD.log.1, .2, ... when full
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=int(LOG_MAX_MB * 1024 * 1024),
+                backupCount=LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
             file_handler.setLevel(logging.DEBUG)
             file_handler.setFormatter(formatter)
 
@@ -51,26 +115,106 @@ class Logger:
             console_handler.setLevel(logging.INFO)
             console_handler.setFormatter(formatter)
 
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+            # Both handlers run on the listener thread
+            self._handlers = (file_handler, console_handler)
+            log_queue = queue.SimpleQueue()
+            self.listener = QueueListener(log_queue, *self._handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.close)
+
+            self.logger.addHandler(_QueueHandler(log_queue))
 
             # Prevent propagation to root logger to avoid duplicate messages
             self.logger.propagate = False
 
         self._initialized = True
 
-    def info(self, message: str):
-        if DEBUG:
-            self.logger.info(message)
-
-    def error(self, message: str):
-        if DEBUG:
-            self.logger.error(message)
-
-    def warning(self, message: str):
-        if DEBUG:
-            self.logger.warning(message)
+    @staticmethod
+    def connect(log_queue):
+        """
+        Send the records of this worker process to the parent's log queue
+
+        Call it first in the worker (e.g. as the process pool initializer),
+        before anything logs; None keeps a log file of its own.
+        """
+        global _parent_queue
+        _parent_queue = log_queue
+
+    def process_queue(self):
+        """
+        Queue that worker processes log to; their records are written by this process
+
+        Returns None when logging is disabled. Pass it to `Logger.connect` in the worker.
+        """
+        if not self._handlers:
+            return None
+
+        with self._progress_lock:
+            if self._process_queue is None:
+                self._process_queue = multiprocessing.get_context("spawn").Queue()
+                self._process_listener = QueueListener(self._process_queue, *self._handlers,
+                                                       respect_handler_level=True)
+                self._process_listener.start()
+
+        return self._process_queue
+
+    def close(self):
+        """Write the queued messages and stop the writer threads"""
+        if self._process_listener is not None:
+            self._process_listener.stop()
+            self._process_listener = None
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def is_enabled(self, level: int) -> bool:
+        return DEBUG and self.logger.isEnabledFor(level)
+
+    def info(self, message: str, *args):
+        if self.is_enabled(logging.INFO):
+            self.logger.info(message, *args)
+
+    def error(self, message: str, *args):
+        if self.is_enabled(logging.ERROR):
+            self.logger.error(message, *args)
+
+    def warning(self, message: str, *args):
+        if self.is_enabled(logging.WARNING):
+            self.logger.warning(message, *args)
+
+    def debug(self, message: str, *args):
+        if self.is_enabled(logging.DEBUG):
+            self.logger.debug(message, *args)
+
+    def progress(self, message: str, value: float):
+        """
+        Log a progress update without flooding the log
+
+        A new message, completion and the first update after
+        LOG_PROGRESS_INTERVAL seconds are logged; repeats in between are only
+        counted and reported with the next logged update, or before the next
+        message when the message changes.
+        """
+        if not self.is_enabled(logging.INFO):
+            return
 
-    def debug(self, message: str):
-        if DEBUG:
-            self.logger.debug(message)
+        now = time.monotonic()
+        with self._progress_lock:
+            repeated = message == self._progress_message
+            if repeated and value < 1.0 and now - self._progress_time < LOG_PROGRESS_INTERVAL:
+                self._progress_skipped += 1
+                return
+
+            suppressed = (self._progress_message, self._progress_skipped) if self._progress_skipped else None
+            self._progress_message = message
+            self._progress_time = now
+            self._progress_skipped = 0
+
+        if suppressed and suppressed[0] != message:
+            self.logger.info("%s (%d similar messages suppressed)", *suppressed)
+            suppressed = None
+
+        if suppressed:
+            self.logger.info("%s %d%% (%d similar messages suppressed)", message, int(value * 100), suppressed[1])
+        else:
+            self.logger.info("%s %d%%", message, int(value * 100))
@@ -0,0 +1,272 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from settings import PROJECT_NAME, METRICS_ENABLED, METRICS_MAX_SPANS
+
+# Prefix of the Prometheus metric names, e.g. ziro_ai_span_seconds_total
+PROMETHEUS_PREFIX = re.sub(r"\W+", "_", PROJECT_NAME.lower()).strip("_")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process, None where `resource` is missing (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Metrics:
+    """
+    Timers and counters of the pipeline
+
+    Stages and model calls are recorded as spans: name, start, duration,
+    thread, peak RSS and attributes such as the job name. Counters added while
+    spans are open on the same thread are also added to those spans, so a
+    stage span carries the segments and tokens of the model calls it made:
+
+        with metrics.span("translate", job="talk"):
+            ...
+            metrics.add("tokens_out", 120)
+
+    A run is exported as JSON lines, a Prometheus textfile and a Chrome trace.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.enabled = METRICS_ENABLED
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+        self._initialized = True
+
+    def reset(self):
+        """Forget every span and counter; the trace clock restarts"""
+        with self._lock:
+            self._spans = deque(maxlen=METRICS_MAX_SPANS)
+            self._counters: Dict[Tuple[str, Tuple], float] = {}
+            self.started = datetime.now()
+            self._origin = time.perf_counter()
+
+    def _stack(self) -> List[Dict]:
+        """Spans open on the current thread, innermost last"""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict]:
+        """
+        Time a block of code
+
+        Yields the span record; attributes set on it are exported with the span.
+        """
+        record = {'name': name, **attributes}
+        if not self.enabled:
+            yield record
+            return
+
+        stack = self._stack()
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+
+            record.update(
+                start=round(start - self._origin, 6),
+                seconds=round(seconds, 6),
+                pid=os.getpid(),
+                thread=threading.current_thread().name,
+                thread_id=threading.get_ident(),
+                peak_rss_mb=peak_rss_mb()
+            )
+            with self._lock:
+                self._spans.append(record)
+
+    def add(self, name: str, value: float = 1, **labels):
+        """Increase a counter and the same attribute of every open span of this thread"""
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+        for record in self._stack():
+            record[name] = record.get(name, 0) + value
+
+    @property
+    def spans(self) -> List[Dict]:
+        with self._lock:
+            return list(self._spans)
+
+    @property
+    def counters(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in self._counters.items()
+            ]
+
+    def summary(self) -> Dict:
+        """
+        Totals per span name and the derived rates
+
+        rtf: transcription seconds per second of audio (below 1 is faster than real time)
+        tokens_per_second: generated tokens per second of translation
+        """
+        spans = {}
+        for record in self.spans:
+            total = spans.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            total['max_seconds'] = max(total['max_seconds'], record['seconds'])
+            for name, value in record.items():
+                if name in ('audio_seconds', 'segments', 'cues', 'tokens_in', 'tokens_out', 'output_bytes'):
+                    total[name] = total.get(name, 0) + value
+
+        for total in spans.values():
+            total['seconds'] = round(total['seconds'], 6)
+
+        transcribe = spans.get('transcribe', {})
+        translate = spans.get('translate', {})
+
+        return {
+            'started': self.started.isoformat(timespec="seconds"),
+            'spans': spans,
+            'peak_rss_mb': peak_rss_mb(),
+            'rtf': (round(transcribe['seconds'] / transcribe['audio_seconds'], 4)
+                    if transcribe.get('audio_seconds') else None),
+            'tokens_per_second': (round(translate['tokens_out'] / translate['seconds'], 1)
+                                  if translate.get('tokens_out') and translate['seconds'] else None)
+        }
+
+    def write_jsonl(self, path: Path) -> Path:
+        """One JSON object per span and counter, then the summary"""
+        lines = [{'type': "span", **record} for record in self.spans]
+        lines += [{'type': "counter", **counter} for counter in self.counters]
+        lines.append({'type': "summary", **self.summary()})
+
+        return self._write(path, "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+
+    def write_prometheus(self, path: Path) -> Path:
+        """Prometheus text format, e.g. for the node_exporter textfile collector"""
+        summary = self.summary()
+        prefix = PROMETHEUS_PREFIX
+        out = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[Dict, float]]):
+            if not samples:
+                return
+            out.append(f"# HELP {prefix}_{name} {help_text}")
+            out.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{self._escape(val)}"' for key, val in sorted(labels.items()))
+                out.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+        spans = summary['spans']
+        metric("span_seconds_total", "counter", "Wall time spent in each stage or model call",
+               [({'span': name}, total['seconds']) for name, total in spans.items()])
+        metric("span_count_total", "counter", "Number of times each stage or model call ran",
+               [({'span': name}, total['count']) for name, total in spans.items()])
+        metric("span_seconds_max", "gauge", "Longest single run of each stage or model call",
+               [({'span': name}, total['max_seconds']) for name, total in spans.items()])
+
+        by_name: Dict[str, List[Tuple[Dict, float]]] = {}
+        for counter in self.counters:
+            by_name.setdefault(counter['name'], []).append((counter['labels'], counter['value']))
+        for name, samples in sorted(by_name.items()):
+            metric(f"{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total", "counter", f"Total {name.replace('_', ' ')}",
+                   samples)
+
+        if summary['peak_rss_mb'] is not None:
+            metric("peak_rss_bytes", "gauge", "Peak resident memory of the process",
+                   [({}, int(summary['peak_rss_mb'] * 1024 * 1024))])
+        if summary['rtf'] is not None:
+            metric("real_time_factor", "gauge", "Transcription seconds per second of audio", [({}, summary['rtf'])])
+        if summary['tokens_per_second'] is not None:
+            metric("tokens_per_second", "gauge", "Generated translation tokens per second",
+                   [({}, summary['tokens_per_second'])])
+
+        return self._write(path, "\n".join(out) + "\n")
+
+    def write_chrome_trace(self, path: Path) -> Path:
+        """Trace event file for chrome://tracing or https://ui.perfetto.dev"""
+        events = []
+        threads = {}
+        for record in self.spans:
+            threads[(record['pid'], record['thread_id'])] = record['thread']
+            events.append({
+                'name': record['name'],
+                'cat': record['name'].split(".")[0],
+                'ph': "X",
+                'ts': round(record['start'] * 1e6),
+                'dur': round(record['seconds'] * 1e6),
+                'pid': record['pid'],
+                'tid': record['thread_id'],
+                'args': {
+                    name: value for name, value in record.items()
+                    if name not in ('name', 'start', 'seconds', 'pid', 'thread', 'thread_id')
+                }
+            })
+
+        for (pid, thread_id), thread in threads.items():
+            events.append({'name': "thread_name", 'ph': "M", 'pid': pid, 'tid': thread_id, 'args': {'name': thread}})
+
+        return self._write(path, json.dumps({'traceEvents': events, 'displayTimeUnit': "ms"}, ensure_ascii=False))
+
+    def export(self, directory: Path, run_id: Optional[str] = None) -> Dict[str, str]:
+        """Write the JSON-lines report, Prometheus textfile and Chrome trace of the run"""
+        directory = Path(directory)
+        run_id = run_id or self.started.strftime("%Y%m%d-%H%M%S")
+
+        return {
+            'report': str(self.write_jsonl(directory / f"run-{run_id}.jsonl")),
+            'prometheus': str(self.write_prometheus(directory / f"run-{run_id}.prom")),
+            'trace': str(self.write_chrome_trace(directory / f"run-{run_id}.trace.json"))
+        }
+
+    @staticmethod
+    def _escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    @staticmethod
+    def _write(path: Path, text: str) -> Path:
+        """Replace the file atomically, so scrapers never read half a file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + ".tmp")
+        temp.write_text(text, encoding="utf-8")
+        os.replace(temp, path)
+        return path